@@ -39,6 +39,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost so its timings cover the whole request; inactive unless enabled below
+    'elections.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -94,6 +96,49 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Seconds between coalesced live results broadcasts (0 sends every vote immediately)
+RESULTS_BROADCAST_INTERVAL = float(os.getenv('RESULTS_BROADCAST_INTERVAL', 0.25))
+
+# Longest sleep, in seconds, before the election scheduler notices an edited election
+ELECTION_SCHEDULER_INTERVAL = float(os.getenv('ELECTION_SCHEDULER_INTERVAL', 5))
+
+# Cache shared by all workers (results versions and cached results payloads)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CACHE_URL', 'redis://localhost:6379/1'),
+    },
+}
+
+# Seconds a rendered results payload stays cached for a given results version
+RESULTS_CACHE_TIMEOUT = int(os.getenv('RESULTS_CACHE_TIMEOUT', 60 * 60))
+
+# Audit log writer: entries are buffered and bulk-inserted in the background.
+# archive_audit_logs moves whole months older than RETENTION_MONTHS out of the
+# table into compressed files under ARCHIVE_DIR.
+AUDIT_LOG = {
+    'BUFFERED': os.getenv('AUDIT_LOG_BUFFERED', 'True') == 'True',
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 1.0,
+    'MAX_BUFFER': 10000,
+    'BLOCK_TIMEOUT': 0.5,
+    'ARCHIVE_DIR': os.getenv('AUDIT_ARCHIVE_DIR', os.path.join(BASE_DIR, 'audit_archive')),
+    'RETENTION_MONTHS': int(os.getenv('AUDIT_LOG_RETENTION_MONTHS', 3)),
+}
+
+# Per-view SQL query and latency profiling, served at /profiling/requests/.
+# Requests over either budget are logged by elections.middleware.
+REQUEST_PROFILING = {
+    'ENABLED': os.getenv('REQUEST_PROFILING', 'False') == 'True',
+    'WINDOW': 1000,
+    'QUERY_BUDGET': int(os.getenv('REQUEST_QUERY_BUDGET', 50)),
+    'LATENCY_BUDGET_MS': int(os.getenv('REQUEST_LATENCY_BUDGET_MS', 500)),
+}
+
+# Prometheus metrics at /metrics; when set, scrapers must send this bearer token.
+# Set PROMETHEUS_MULTIPROC_DIR when running several worker processes.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -141,6 +186,11 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Default page size of the keyset-paginated list endpoints. Kept out of
+# REST_FRAMEWORK, where a PAGE_SIZE without a default pagination class
+# triggers a system check warning.
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 50))
+
 # JWT settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -189,6 +239,7 @@ SPECTACULAR_SETTINGS = {
         {'name': 'voting', 'description': 'Voting endpoints'},
         {'name': 'users', 'description': 'User management endpoints'},
         {'name': 'audit', 'description': 'Audit log endpoints'},
+        {'name': 'monitoring', 'description': 'Performance monitoring endpoints'},
     ],
     'SWAGGER_UI_SETTINGS': {
         'deepLinking': True,
@@ -1,7 +1,20 @@
-from django.contrib import admin
+import io
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect, render
+from django.urls import path
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
-from .models import User, Election, Position, Candidate, EligibleVoter, Vote, AuditLog
+from .importers import import_students, read_student_csv
+from .scheduler import close_election, start_election
+from .models import User, Election, Position, Candidate, EligibleVoter, EligibilityRule, Vote, VoteTally, TurnoutTally, ResultsSnapshot, AuditLog, AuditLogArchive
+
+# Status changes made in the election form that are lifecycle transitions
+ELECTION_TRANSITIONS = {
+    (Election.UPCOMING, Election.ACTIVE): start_election,
+    (Election.ACTIVE, Election.CLOSED): close_election,
+}
 
 class CustomUserCreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
@@ -40,19 +53,46 @@ class PositionInline(admin.TabularInline):
     model = Position
     extra = 1
 
+class EligibilityRuleInline(admin.TabularInline):
+    model = EligibilityRule
+    extra = 0
+
 @admin.register(Election)
 class ElectionAdmin(admin.ModelAdmin):
     list_display = ('title', 'status', 'start_datetime', 'end_datetime', 'created_by')
     list_filter = ('status', 'created_at')
     search_fields = ('title', 'description')
     date_hierarchy = 'start_datetime'
-    inlines = [PositionInline]
+    inlines = [PositionInline, EligibilityRuleInline]
     
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         if request.user.is_superuser:
             return qs
         return qs.filter(created_by=request.user)
+    
+    def save_model(self, request, obj, form, change):
+        # Starting or closing goes through the same compare-and-set as the
+        # scheduler, so the transition's hooks run and it applies only once
+        transition = None
+        if change and 'status' in form.changed_data:
+            transition = ELECTION_TRANSITIONS.get((form.initial.get('status'), obj.status))
+        if transition is None:
+            return super().save_model(request, obj, form, change)
+        
+        # Save the other fields without writing the status back, in case the
+        # scheduler changed it since the form was loaded
+        new_status, obj.status = obj.status, form.initial['status']
+        obj.save(update_fields=[
+            field.name for field in obj._meta.concrete_fields
+            if not field.primary_key and field.name != 'status'
+        ])
+        if not transition(obj, request.user, request):
+            self.message_user(
+                request,
+                f'{obj.title} was not set to {new_status}: its status changed in the meantime',
+                level=messages.WARNING
+            )
 
 class CandidateInline(admin.TabularInline):
     model = Candidate
@@ -71,11 +111,65 @@ class CandidateAdmin(admin.ModelAdmin):
     list_filter = ('position__election', 'position')
     search_fields = ('name', 'bio')
 
+class StudentImportForm(forms.Form):
+    election = forms.ModelChoiceField(
+        queryset=Election.objects.all(),
+        required=False,
+        help_text='Imported students become eligible voters for this election'
+    )
+    csv_file = forms.FileField(help_text='CSV with student_id, username and email columns')
+
 @admin.register(EligibleVoter)
 class EligibleVoterAdmin(admin.ModelAdmin):
     list_display = ('student', 'election', 'has_voted')
     list_filter = ('election', 'has_voted')
     search_fields = ('student__username', 'student__email', 'student__student_id')
+    change_list_template = 'admin/elections/eligiblevoter/change_list.html'
+    
+    def get_urls(self):
+        return [
+            path(
+                'import-csv/',
+                self.admin_site.admin_view(self.import_csv),
+                name='elections_eligiblevoter_import_csv'
+            ),
+        ] + super().get_urls()
+    
+    def import_csv(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        
+        form = StudentImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            election = form.cleaned_data['election']
+            # Stream the upload row by row instead of reading it into memory
+            stream = io.TextIOWrapper(form.cleaned_data['csv_file'].file, encoding='utf-8-sig', newline='')
+            try:
+                stats = import_students(
+                    read_student_csv(stream),
+                    election_id=election.id if election else None
+                )
+            except (UnicodeDecodeError, ValueError) as e:
+                self.message_user(request, f'Import failed: {e}', level=messages.ERROR)
+            else:
+                for error in stats['errors']:
+                    self.message_user(request, f'Skipped {error}', level=messages.WARNING)
+                self.message_user(request, (
+                    f"Imported {stats['rows']} rows in {stats['seconds']:.1f}s "
+                    f"({stats['rows_per_second']:.0f} rows/s): "
+                    f"{stats['users_created']} users created, {stats['users_updated']} updated, "
+                    f"{stats['users_unchanged']} unchanged, {stats['skipped']} skipped, "
+                    f"{stats['eligible_added']} eligible voters added"
+                ))
+                return redirect('admin:elections_eligiblevoter_changelist')
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import students',
+            'form': form,
+        }
+        return render(request, 'admin/elections/eligiblevoter/import_csv.html', context)
 
 @admin.register(Vote)
 class VoteAdmin(admin.ModelAdmin):
@@ -87,13 +181,53 @@ class VoteAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         return False  # Votes can only be created through the API
 
+@admin.register(VoteTally)
+class VoteTallyAdmin(admin.ModelAdmin):
+    list_display = ('candidate', 'position', 'election', 'vote_count')
+    list_filter = ('election',)
+    readonly_fields = ('election', 'position', 'candidate', 'vote_count')
+    
+    def has_add_permission(self, request):
+        return False  # Tallies are maintained by the voting API and rebuild_vote_tallies
+
+@admin.register(TurnoutTally)
+class TurnoutTallyAdmin(admin.ModelAdmin):
+    list_display = ('election', 'voters_started', 'voters_completed')
+    readonly_fields = ('election', 'voters_started', 'voters_completed')
+    
+    def has_add_permission(self, request):
+        return False  # Maintained by the voting API and rebuild_turnout
+
+@admin.register(ResultsSnapshot)
+class ResultsSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('election', 'created_at', 'checksum')
+    readonly_fields = ('election', 'results', 'turnout', 'checksum', 'created_at')
+    
+    def has_add_permission(self, request):
+        return False  # Frozen when an election closes, or by freeze_results
+    
+    def has_change_permission(self, request, obj=None):
+        return False  # Snapshots are immutable; delete one to freeze it again
+
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
     list_display = ('action', 'user', 'timestamp', 'ip_address')
-    list_filter = ('timestamp', 'user')
+    list_filter = ('action', 'timestamp', 'user')
     search_fields = ('action', 'user__username')
     date_hierarchy = 'timestamp'
     readonly_fields = ('user', 'action', 'details', 'timestamp', 'ip_address')
     
     def has_add_permission(self, request):
-        return False  # Audit logs can only be created through the system 
\ No newline at end of file
+        return False  # Audit logs can only be created through the system
+
+@admin.register(AuditLogArchive)
+class AuditLogArchiveAdmin(admin.ModelAdmin):
+    list_display = ('period_start', 'period_end', 'row_count', 'path', 'created_at')
+    readonly_fields = ('period_start', 'period_end', 'path', 'row_count', 'checksum', 'created_at')
+    
+    def has_add_permission(self, request):
+        return False  # Created by archive_audit_logs, removed by restore_audit_archive
+    
+    def has_delete_permission(self, request, obj=None):
+        return False  # Deleting the record would orphan the archive file
+
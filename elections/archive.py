@@ -0,0 +1,214 @@
+import gzip
+import hashlib
+import json
+import os
+from array import array
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .audit import get_audit_setting
+from .models import AuditLog, AuditLogArchive, User
+
+ARCHIVE_FIELDS = ('id', 'user_id', 'action', 'details', 'timestamp', 'ip_address')
+
+# Entries read, deleted or restored per statement
+ARCHIVE_BATCH_SIZE = 5000
+
+
+def get_archive_dir() -> str:
+    return os.path.join(settings.BASE_DIR, get_audit_setting('ARCHIVE_DIR'))
+
+
+def month_start(value: datetime) -> datetime:
+    """
+    Return the start of the month containing value, in the current time zone.
+    """
+    value = timezone.localtime(value)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(start: datetime) -> datetime:
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def parse_period(period: str) -> datetime:
+    """
+    Parse a 'YYYY-MM' period into the start of that month.
+    """
+    try:
+        start = datetime.strptime(period, '%Y-%m')
+    except ValueError:
+        raise ValueError(f'{period!r} is not a YYYY-MM period')
+    return timezone.make_aware(start)
+
+
+def get_retention_cutoff(retention_months: Optional[int] = None) -> datetime:
+    """
+    Return the start of the oldest month kept in the AuditLog table.
+    """
+    if retention_months is None:
+        retention_months = get_audit_setting('RETENTION_MONTHS')
+    cutoff = month_start(timezone.now())
+    for _ in range(max(retention_months, 1) - 1):
+        cutoff = month_start(cutoff - timedelta(days=1))
+    return cutoff
+
+
+def find_archivable_periods(cutoff: datetime) -> List[datetime]:
+    """
+    Return the starts of the months before cutoff that still have entries in AuditLog.
+    """
+    oldest = AuditLog.objects.filter(timestamp__lt=cutoff).order_by('timestamp').values_list(
+        'timestamp', flat=True
+    ).first()
+    periods = []
+    if oldest is None:
+        return periods
+    start = month_start(oldest)
+    while start < cutoff:
+        if AuditLog.objects.filter(timestamp__gte=start, timestamp__lt=next_month(start)).exists():
+            periods.append(start)
+        start = next_month(start)
+    return periods
+
+
+def _file_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as stream:
+        for block in iter(lambda: stream.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def archive_period(start: datetime) -> AuditLogArchive:
+    """
+    Move the audit log entries of the month starting at start into a
+    gzip-compressed NDJSON file and record it as an AuditLogArchive.
+
+    The file is written and synced before any entry is deleted, and only the
+    entries written to it are deleted, so a failure at any point leaves
+    every entry in the table or in a complete archive.
+    """
+    end = next_month(start)
+    if AuditLogArchive.objects.filter(period_start=start).exists():
+        raise ValueError(f'{start:%Y-%m} is already archived; restore it before archiving it again')
+
+    archive_dir = get_archive_dir()
+    os.makedirs(archive_dir, exist_ok=True)
+    filename = f'audit-{start:%Y-%m}.ndjson.gz'
+    path = os.path.join(archive_dir, filename)
+    partial_path = path + '.partial'
+
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    archived_ids = array('q')
+    rows = (
+        AuditLog.objects.filter(timestamp__gte=start, timestamp__lt=end)
+        .order_by('id')
+        .values_list(*ARCHIVE_FIELDS)
+        .iterator(chunk_size=ARCHIVE_BATCH_SIZE)
+    )
+    with gzip.open(partial_path, 'wt', encoding='utf-8') as stream:
+        for row in rows:
+            stream.write(encoder.encode(dict(zip(ARCHIVE_FIELDS, row))) + '\n')
+            archived_ids.append(row[0])
+        stream.flush()
+        os.fsync(stream.fileno())
+    os.replace(partial_path, path)
+
+    with transaction.atomic():
+        archive = AuditLogArchive.objects.create(
+            period_start=start,
+            period_end=end,
+            path=filename,
+            row_count=len(archived_ids),
+            checksum=_file_checksum(path)
+        )
+        ids = iter(archived_ids)
+        while True:
+            batch = list(islice(ids, ARCHIVE_BATCH_SIZE))
+            if not batch:
+                break
+            AuditLog.objects.filter(id__in=batch).delete()
+    return archive
+
+
+def read_archive(archive: AuditLogArchive) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the entries stored in an archive file after verifying its checksum.
+    """
+    path = os.path.join(get_archive_dir(), archive.path)
+    if _file_checksum(path) != archive.checksum:
+        raise ValueError(f'Archive {archive.path} does not match its checksum')
+    with gzip.open(path, 'rt', encoding='utf-8') as stream:
+        for line in stream:
+            entry = json.loads(line)
+            entry['timestamp'] = parse_datetime(entry['timestamp'])
+            yield entry
+
+
+def restore_archive(archive: AuditLogArchive) -> int:
+    """
+    Insert the entries of an archive back into AuditLog, with their original
+    ids, and delete the archive. Returns the number of entries restored.
+    """
+    entries = read_archive(archive)
+    restored = 0
+    with transaction.atomic():
+        while True:
+            batch = [AuditLog(**entry) for entry in islice(entries, ARCHIVE_BATCH_SIZE)]
+            if not batch:
+                break
+            # Users deleted since the entries were archived are set to null,
+            # as they would have been in the table
+            existing_users = set(User.objects.filter(
+                id__in={entry.user_id for entry in batch if entry.user_id is not None}
+            ).values_list('id', flat=True))
+            for entry in batch:
+                if entry.user_id not in existing_users:
+                    entry.user_id = None
+            AuditLog.objects.bulk_create(batch, ignore_conflicts=True)
+            restored += len(batch)
+        path = os.path.join(get_archive_dir(), archive.path)
+        archive.delete()
+        transaction.on_commit(lambda: os.remove(path))
+    return restored
+
+
+def entry_matches(entry: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    """
+    Check an archived entry against filters parsed by parse_audit_filters.
+    """
+    details = entry['details'] if isinstance(entry['details'], dict) else {}
+    return (
+        ('action' not in filters or entry['action'] == filters['action'])
+        and ('user' not in filters or entry['user_id'] == filters['user'])
+        and ('ip' not in filters or entry['ip_address'] == filters['ip'])
+        and ('election' not in filters or str(details.get('election_id')) == str(filters['election']))
+        and ('since' not in filters or entry['timestamp'] >= filters['since'])
+        and ('until' not in filters or entry['timestamp'] < filters['until'])
+    )
+
+
+def search_archives(filters: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the archived entries matching filters parsed by parse_audit_filters,
+    oldest month first. Only archives overlapping the since/until range are read.
+    """
+    archives = AuditLogArchive.objects.order_by('period_start')
+    if 'since' in filters:
+        archives = archives.filter(period_end__gt=filters['since'])
+    if 'until' in filters:
+        archives = archives.filter(period_start__lt=filters['until'])
+    for archive in archives:
+        for entry in read_archive(archive):
+            if entry_matches(entry, filters):
+                yield entry
@@ -0,0 +1,255 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_ipv46_address
+from django.db import InterfaceError, OperationalError, connection
+from django.db.models.fields.json import KeyTextTransform
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Queue entries and insert them from a background thread
+    'BUFFERED': True,
+    # Entries inserted per bulk_create
+    'BATCH_SIZE': 200,
+    # Seconds an entry may wait in the buffer before it is flushed
+    'FLUSH_INTERVAL': 1.0,
+    # Entries the buffer holds before writers have to wait
+    'MAX_BUFFER': 10000,
+    # Seconds a writer waits for room in a full buffer before writing synchronously
+    'BLOCK_TIMEOUT': 0.5,
+    # Directory archived months are written to, relative to BASE_DIR unless absolute
+    'ARCHIVE_DIR': 'audit_archive',
+    # Months, counting the current one, kept in the AuditLog table
+    'RETENTION_MONTHS': 3,
+}
+
+# Put in the queue to make the writer thread exit
+_STOP = object()
+
+def get_audit_setting(name):
+    return getattr(settings, 'AUDIT_LOG', {}).get(name, DEFAULTS[name])
+
+class AuditLogWriter:
+    """
+    Buffers audit log entries in process and inserts them in batches.
+
+    Entries are flushed with bulk_create once BATCH_SIZE entries are waiting
+    or the oldest has waited FLUSH_INTERVAL seconds. When the buffer is full,
+    writers wait up to BLOCK_TIMEOUT for room and then fall back to a
+    synchronous insert, so entries are never dropped. A batch that fails is
+    retried on a fresh connection and then entry by entry; entries that
+    could not be written because the database was unavailable go back into
+    the buffer. Whatever is still buffered is flushed when the worker exits.
+    """
+    def __init__(self):
+        self._queue = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def write(self, entry, strict=False):
+        """
+        Record an unsaved AuditLog entry.
+
+        Strict entries, and every entry when buffering is disabled, are
+        inserted before this returns.
+        """
+        if strict or not get_audit_setting('BUFFERED'):
+            entry.save()
+            return
+
+        self._start()
+        try:
+            self._queue.put(entry, timeout=get_audit_setting('BLOCK_TIMEOUT'))
+        except queue.Full:
+            logger.warning('Audit log buffer is full, writing entry synchronously')
+            entry.save()
+
+    def flush(self):
+        """
+        Insert every buffered entry from the calling thread.
+        """
+        if self._queue is None:
+            return
+        batch = []
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not _STOP:
+                batch.append(entry)
+        for entry in self._insert(batch):
+            logger.error('Lost audit log entry, the database is unavailable: %s %r', entry.action, entry.details)
+
+    def close(self):
+        """
+        Stop the writer thread after it inserts what it holds, then flush the rest.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=get_audit_setting('BLOCK_TIMEOUT'))
+            except queue.Full:
+                pass
+            else:
+                self._thread.join(timeout=10)
+        self.flush()
+
+    def _start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._queue is None:
+                self._queue = queue.Queue(maxsize=get_audit_setting('MAX_BUFFER'))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            entry = self._queue.get()
+            if entry is _STOP:
+                return
+            batch = [entry]
+            deadline = time.monotonic() + get_audit_setting('FLUSH_INTERVAL')
+            batch_size = get_audit_setting('BATCH_SIZE')
+            while len(batch) < batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+            unwritten = self._insert(batch)
+            if unwritten:
+                self._requeue(unwritten)
+                # Give the database time to come back before the next batch
+                time.sleep(get_audit_setting('FLUSH_INTERVAL'))
+
+    def _insert(self, batch):
+        """
+        Insert a batch of entries.
+
+        A failed batch is retried once on a fresh connection, then entry by
+        entry so one bad entry cannot lose the rest. Entries that fail on
+        their own are logged and dropped. Returns the entries that were not
+        written because the database was unavailable.
+        """
+        if not batch:
+            return []
+        for attempt in range(2):
+            try:
+                AuditLog.objects.bulk_create(batch, batch_size=get_audit_setting('BATCH_SIZE'))
+                return []
+            except Exception:
+                logger.warning(
+                    'Failed to write %d buffered audit log entries (attempt %d)',
+                    len(batch), attempt + 1, exc_info=True
+                )
+                # Drop a possibly broken connection so the next attempt reconnects
+                connection.close()
+
+        for index, entry in enumerate(batch):
+            try:
+                entry.save()
+            except (InterfaceError, OperationalError):
+                logger.exception('Database unavailable, keeping %d audit log entries', len(batch) - index)
+                connection.close()
+                return batch[index:]
+            except Exception:
+                logger.exception('Dropped audit log entry that cannot be written: %s %r', entry.action, entry.details)
+        return []
+
+    def _requeue(self, entries):
+        for entry in entries:
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                logger.error('Lost audit log entry, the buffer is full: %s %r', entry.action, entry.details)
+
+audit_log_writer = AuditLogWriter()
+
+# Write whatever is still buffered when the worker shuts down
+atexit.register(audit_log_writer.close)
+
+def parse_audit_filters(params):
+    """
+    Validate the audit log search filters in params.
+
+    Supported filters are action, user (id), ip, election (id, matched
+    against details['election_id']), since and until (ISO 8601 datetimes,
+    since inclusive, until exclusive). Returns a dict holding the filters
+    that were given, converted to their types. Raises ValueError on an
+    invalid value.
+    """
+    filters = {}
+    if params.get('action'):
+        filters['action'] = params['action']
+    if params.get('user'):
+        try:
+            filters['user'] = int(params['user'])
+        except ValueError:
+            raise ValueError('user must be a user ID')
+    if params.get('ip'):
+        try:
+            validate_ipv46_address(params['ip'])
+        except ValidationError:
+            raise ValueError('ip must be an IPv4 or IPv6 address')
+        filters['ip'] = params['ip']
+    if params.get('election'):
+        try:
+            filters['election'] = int(params['election'])
+        except ValueError:
+            raise ValueError('election must be an election ID')
+    for name in ('since', 'until'):
+        if params.get(name):
+            try:
+                value = parse_datetime(params[name])
+            except ValueError:
+                value = None
+            if value is None:
+                raise ValueError(f'{name} must be an ISO 8601 datetime')
+            if timezone.is_naive(value):
+                value = timezone.make_aware(value)
+            filters[name] = value
+    return filters
+
+def filter_audit_logs(queryset, params):
+    """
+    Apply the audit log search filters in params to queryset.
+
+    Each filter maps onto an index that ends in timestamp. Raises
+    ValueError on an invalid value.
+    """
+    filters = parse_audit_filters(params)
+    if 'action' in filters:
+        queryset = queryset.filter(action=filters['action'])
+    if 'user' in filters:
+        queryset = queryset.filter(user_id=filters['user'])
+    if 'ip' in filters:
+        queryset = queryset.filter(ip_address=filters['ip'])
+    if 'election' in filters:
+        # Compared as text to match the expression index on details->>'election_id'
+        queryset = queryset.alias(
+            election_id=KeyTextTransform('election_id', 'details')
+        ).filter(election_id=str(filters['election']))
+    if 'since' in filters:
+        queryset = queryset.filter(timestamp__gte=filters['since'])
+    if 'until' in filters:
+        queryset = queryset.filter(timestamp__lt=filters['until'])
+    return queryset
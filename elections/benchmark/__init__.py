@@ -0,0 +1,11 @@
+"""
+Election-day load benchmark: seeds a synthetic election and drives votes,
+results polling and live results websockets through the ASGI application
+in process. Run it with the benchmark_election_day management command.
+"""
+from .runner import ElectionDayBenchmark, summarize
+from .seed import SeededElection, remove_seeded_election, seed_election
+
+__all__ = [
+    'ElectionDayBenchmark', 'SeededElection', 'remove_seeded_election', 'seed_election', 'summarize',
+]
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+from asgiref.testing import ApplicationCommunicator
+from channels.layers import InMemoryChannelLayer
+from django.conf import settings
+
+# Seconds to wait for a response before counting the request as failed
+REQUEST_TIMEOUT = 30
+
+
+def _host() -> bytes:
+    hosts = [host.lstrip('.') for host in settings.ALLOWED_HOSTS if host not in ('', '*')]
+    return (hosts[0] if hosts else 'localhost').encode()
+
+
+def _scope(scope_type: str, path: str, headers: List[Tuple[bytes, bytes]]) -> Dict:
+    path, _, query = path.partition('?')
+    return {
+        'type': scope_type,
+        'scheme': 'https' if scope_type == 'http' else 'wss',
+        'http_version': '1.1',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', _host())] + headers,
+        'client': ('127.0.0.1', 0),
+        'server': (_host().decode(), 443),
+        'subprotocols': [],
+    }
+
+
+async def asgi_request(application, method: str, path: str, body: Optional[dict] = None,
+                       token: Optional[str] = None, headers: Optional[List[Tuple[bytes, bytes]]] = None):
+    """
+    Send one HTTP request through an ASGI application in process, the way a
+    server would. Returns (status, response headers, body bytes).
+
+    Requests are made over https so the production security settings apply unchanged.
+    """
+    headers = list(headers or [])
+    payload = b''
+    if body is not None:
+        payload = json.dumps(body).encode()
+        headers.append((b'content-type', b'application/json'))
+        headers.append((b'content-length', str(len(payload)).encode()))
+    if token:
+        headers.append((b'authorization', f'Bearer {token}'.encode()))
+    scope = dict(_scope('http', path, headers), method=method.upper())
+
+    communicator = ApplicationCommunicator(application, scope)
+    await communicator.send_input({'type': 'http.request', 'body': payload})
+    start = await communicator.receive_output(REQUEST_TIMEOUT)
+    content = b''
+    while True:
+        message = await communicator.receive_output(REQUEST_TIMEOUT)
+        content += message.get('body', b'')
+        if not message.get('more_body', False):
+            break
+    await communicator.wait()
+    headers = {name.lower(): value for name, value in start.get('headers', [])}
+    return start['status'], headers, content
+
+
+class WebsocketClient:
+    """
+    A websocket connection to an ASGI application, made in process.
+    """
+    def __init__(self, application, path: str):
+        self.communicator = ApplicationCommunicator(application, _scope('websocket', path, []))
+
+    async def connect(self) -> bool:
+        await self.communicator.send_input({'type': 'websocket.connect'})
+        message = await self.communicator.receive_output(REQUEST_TIMEOUT)
+        return message['type'] == 'websocket.accept'
+
+    async def receive(self, timeout: float) -> str:
+        # Read the queue directly: receive_output() cancels the consumer on a timeout
+        message = await asyncio.wait_for(self.communicator.output_queue.get(), timeout)
+        if message['type'] != 'websocket.send':
+            raise ConnectionError(f'Websocket closed: {message}')
+        return message['text']
+
+    async def close(self) -> None:
+        await self.communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await self.communicator.wait(REQUEST_TIMEOUT)
+
+
+class TimedChannelLayer(InMemoryChannelLayer):
+    """
+    In-memory channel layer remembering when each live results delta was
+    sent, so subscribers can measure how long its delivery took.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent_at: Dict[int, float] = {}
+
+    async def group_send(self, group, message):
+        if message.get('type') == 'election_results_delta':
+            self.sent_at[json.loads(message['text'])['seq']] = time.perf_counter()
+        await super().group_send(group, message)
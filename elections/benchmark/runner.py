@@ -0,0 +1,226 @@
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from channels.layers import get_channel_layer
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ..models import User
+from ..utils import percentile
+from .client import WebsocketClient, asgi_request
+from .seed import SeededElection
+
+# Quiet period after the last vote before subscribers stop waiting for deltas
+DRAIN_SECONDS = 1.0
+
+BENCHMARK_CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'elections.benchmark.client.TimedChannelLayer',
+        # Room for every delta of a run, so a slow subscriber never drops one
+        'CONFIG': {'capacity': 100000},
+    }
+}
+
+
+def summarize(seconds: List[float]) -> Dict[str, Any]:
+    """
+    Summarize latencies given in seconds as milliseconds.
+    """
+    if not seconds:
+        return {'count': 0}
+    ordered = sorted(seconds)
+    return {
+        'count': len(ordered),
+        'mean': round(sum(ordered) / len(ordered) * 1000, 2),
+        'p50': round(percentile(ordered, 0.50) * 1000, 2),
+        'p95': round(percentile(ordered, 0.95) * 1000, 2),
+        'p99': round(percentile(ordered, 0.99) * 1000, 2),
+        'max': round(ordered[-1] * 1000, 2),
+    }
+
+
+class ElectionDayBenchmark:
+    """
+    Drives a seeded election through the ASGI application in process.
+
+    Websocket subscribers connect first and receive their snapshot. Voters
+    then cast their votes from `concurrency` concurrent workers while
+    pollers read the public results and subscribers receive every delta.
+
+    Everything shares one event loop, so the numbers describe what one ASGI
+    worker can serve. Each request runs its view in its own thread, so
+    concurrent votes contend for database locks as they would in production;
+    SQLite serializes writers and reports some of them as 500s under load.
+    """
+
+    def __init__(self, seeded: SeededElection, concurrency: int, subscribers: int, pollers: int,
+                 poll_interval: float, vote_endpoint: str):
+        self.seeded = seeded
+        self.concurrency = concurrency
+        self.subscribers = subscribers
+        self.pollers = pollers
+        self.poll_interval = poll_interval
+        self.vote_endpoint = vote_endpoint
+        # Seeded so every run casts the same votes
+        self.random = random.Random(0)
+
+        self.vote_seconds: List[float] = []
+        self.vote_statuses = Counter()
+        self.votes_cast = 0
+        self.poll_seconds: List[float] = []
+        self.poll_statuses = Counter()
+        self.connect_seconds: List[float] = []
+        self.delivery_seconds: List[float] = []
+        self.failed_connections = 0
+
+    def issue_tokens(self) -> List[str]:
+        users = User.objects.filter(id__in=self.seeded.student_ids).order_by('id')
+        return [str(AccessToken.for_user(user)) for user in users]
+
+    def ballot_requests(self):
+        """
+        Return the (path, body) of the requests a voter sends to vote once
+        for every position, each for a random candidate.
+        """
+        election_id = self.seeded.election_id
+        choices = [
+            (position_id, self.random.choice(candidates))
+            for position_id, candidates in self.seeded.positions
+        ]
+        if self.vote_endpoint == 'ballot':
+            return [('/api/api/votes/ballot/', {
+                'election': election_id,
+                'votes': [{'position': position, 'candidate': candidate} for position, candidate in choices]
+            })]
+        return [
+            ('/api/api/votes/', {'election': election_id, 'position': position, 'candidate': candidate})
+            for position, candidate in choices
+        ]
+
+    async def vote_worker(self, application, tokens: asyncio.Queue):
+        while not tokens.empty():
+            token = tokens.get_nowait()
+            for path, body in self.ballot_requests():
+                start = time.perf_counter()
+                status, _, _ = await asgi_request(application, 'POST', path, body, token=token)
+                self.vote_seconds.append(time.perf_counter() - start)
+                self.vote_statuses[status] += 1
+                if status == 201:
+                    self.votes_cast += len(body.get('votes', [body]))
+
+    async def poller(self, application, voting_done: asyncio.Event):
+        path = f'/elections/{self.seeded.election_id}/results/'
+        etag = None
+        while not voting_done.is_set():
+            # Clients send back the ETag of the results they already have
+            headers = [(b'if-none-match', etag)] if etag else []
+            start = time.perf_counter()
+            status, response_headers, _ = await asgi_request(application, 'GET', path, headers=headers)
+            self.poll_seconds.append(time.perf_counter() - start)
+            self.poll_statuses[status] += 1
+            etag = response_headers.get(b'etag', etag)
+            if self.poll_interval:
+                await asyncio.sleep(self.poll_interval)
+
+    async def connect_subscriber(self, application):
+        client = WebsocketClient(
+            application, f'/ws/public/elections/{self.seeded.election_id}/live-results/'
+        )
+        start = time.perf_counter()
+        if not await client.connect():
+            self.failed_connections += 1
+            return None
+        # The snapshot frame follows the accept
+        await client.receive(timeout=30)
+        self.connect_seconds.append(time.perf_counter() - start)
+        return client
+
+    async def subscriber(self, client: WebsocketClient, voting_done: asyncio.Event):
+        sent_at = get_channel_layer().sent_at
+        while True:
+            try:
+                frame = json.loads(await client.receive(timeout=DRAIN_SECONDS))
+            except asyncio.TimeoutError:
+                if voting_done.is_set():
+                    break
+                continue
+            if frame.get('type') == 'delta' and frame['seq'] in sent_at:
+                self.delivery_seconds.append(time.perf_counter() - sent_at[frame['seq']])
+        await client.close()
+
+    async def drive(self, application, tokens: List[str]) -> float:
+        clients = await asyncio.gather(*(
+            self.connect_subscriber(application) for _ in range(self.subscribers)
+        ))
+        clients = [client for client in clients if client is not None]
+
+        queue = asyncio.Queue()
+        for token in tokens:
+            queue.put_nowait(token)
+        voting_done = asyncio.Event()
+        listeners = [asyncio.ensure_future(self.subscriber(client, voting_done)) for client in clients]
+        pollers = [asyncio.ensure_future(self.poller(application, voting_done)) for _ in range(self.pollers)]
+
+        start = time.perf_counter()
+        await asyncio.gather(*(self.vote_worker(application, queue) for _ in range(self.concurrency)))
+        voting_seconds = time.perf_counter() - start
+        voting_done.set()
+        await asyncio.gather(*pollers, *listeners)
+        return voting_seconds
+
+    def run(self) -> Dict[str, Any]:
+        tokens = self.issue_tokens()
+        with override_settings(CHANNEL_LAYERS=BENCHMARK_CHANNEL_LAYERS):
+            # Imported here: building the application loads the URL configuration
+            from election_portal.asgi import application
+            sent_at = get_channel_layer().sent_at
+            voting_seconds = asyncio.run(self.drive(application, tokens))
+            deltas_sent = len(sent_at)
+
+        frames_expected = deltas_sent * len(self.connect_seconds)
+        return {
+            'timestamp': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'election': {
+                'students': len(self.seeded.student_ids),
+                'positions': len(self.seeded.positions),
+                'candidates_per_position': len(self.seeded.positions[0][1]) if self.seeded.positions else 0,
+            },
+            'config': {
+                'concurrency': self.concurrency,
+                'subscribers': self.subscribers,
+                'pollers': self.pollers,
+                'poll_interval': self.poll_interval,
+                'vote_endpoint': self.vote_endpoint,
+            },
+            'voting': {
+                'seconds': round(voting_seconds, 3),
+                'requests': len(self.vote_seconds),
+                'requests_per_second': round(len(self.vote_seconds) / voting_seconds, 1),
+                'votes_cast': self.votes_cast,
+                'votes_per_second': round(self.votes_cast / voting_seconds, 1),
+                'statuses': {str(code): count for code, count in sorted(self.vote_statuses.items())},
+                'latency_ms': summarize(self.vote_seconds),
+            },
+            'results_polling': {
+                'requests': len(self.poll_seconds),
+                'requests_per_second': round(len(self.poll_seconds) / voting_seconds, 1),
+                'statuses': {str(code): count for code, count in sorted(self.poll_statuses.items())},
+                'latency_ms': summarize(self.poll_seconds),
+            },
+            'websocket': {
+                'subscribers': len(self.connect_seconds),
+                'failed_connections': self.failed_connections,
+                'connect_ms': summarize(self.connect_seconds),
+                'deltas_sent': deltas_sent,
+                'frames_delivered': len(self.delivery_seconds),
+                'frames_expected': frames_expected,
+                'delivery_ms': summarize(self.delivery_seconds),
+            },
+        }
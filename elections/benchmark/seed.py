@@ -0,0 +1,99 @@
+import secrets
+from datetime import timedelta
+from typing import List, Tuple
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from ..eligibility import invalidate_eligibility_index
+from ..models import AuditLog, Candidate, Election, EligibleVoter, Position, User
+
+# Rows inserted per statement while seeding
+SEED_BATCH_SIZE = 1000
+
+
+class SeededElection:
+    """
+    A synthetic active election and the users created for it.
+    """
+    def __init__(self, tag: str, election_id: int, admin_id: int):
+        self.tag = tag
+        self.election_id = election_id
+        self.admin_id = admin_id
+        self.student_ids: List[int] = []
+        # (position_id, [candidate_id, ...]) in ballot order
+        self.positions: List[Tuple[int, List[int]]] = []
+
+
+@transaction.atomic
+def seed_election(students: int, positions: int, candidates: int) -> SeededElection:
+    """
+    Create an active election with the given number of positions and
+    candidates per position, and that many eligible students.
+
+    Every row is named after a random tag so several runs can share a
+    database, and remove_seeded_election() deletes exactly what was created.
+    """
+    tag = secrets.token_hex(4)
+    # Seeded users cannot log in; the benchmark authenticates with tokens
+    password = make_password(None)
+    now = timezone.now()
+
+    admin = User.objects.create(
+        username=f'bench-{tag}-admin', role=User.ADMIN, password=password
+    )
+    election = Election.objects.create(
+        title=f'Benchmark {tag}',
+        description='Synthetic election created by the benchmark_election_day command',
+        start_datetime=now - timedelta(hours=1),
+        end_datetime=now + timedelta(hours=1),
+        status=Election.ACTIVE,
+        created_by=admin
+    )
+
+    seeded = SeededElection(tag, election.id, admin.id)
+    position_objects = Position.objects.bulk_create([
+        Position(election=election, title=f'Position {index + 1}', order=index)
+        for index in range(positions)
+    ])
+    candidate_objects = Candidate.objects.bulk_create([
+        Candidate(position=position, name=f'Candidate {index + 1}', order=index)
+        for position in position_objects
+        for index in range(candidates)
+    ])
+    for position in position_objects:
+        seeded.positions.append((position.id, [
+            candidate.id for candidate in candidate_objects if candidate.position_id == position.id
+        ]))
+
+    for start in range(0, students, SEED_BATCH_SIZE):
+        batch = User.objects.bulk_create([
+            User(
+                username=f'bench-{tag}-{index}',
+                student_id=f'bench-{tag}-{index}',
+                role=User.STUDENT,
+                password=password
+            )
+            for index in range(start, min(start + SEED_BATCH_SIZE, students))
+        ])
+        EligibleVoter.objects.bulk_create([
+            EligibleVoter(election=election, student=student) for student in batch
+        ])
+        seeded.student_ids.extend(student.id for student in batch)
+
+    # bulk_create sends no signals
+    transaction.on_commit(lambda: invalidate_eligibility_index(election.id))
+    return seeded
+
+
+@transaction.atomic
+def remove_seeded_election(seeded: SeededElection) -> None:
+    """
+    Delete a seeded election, its users and the audit log entries they produced.
+    """
+    user_ids = seeded.student_ids + [seeded.admin_id]
+    AuditLog.objects.filter(user_id__in=user_ids).delete()
+    Election.objects.filter(id=seeded.election_id).delete()
+    for start in range(0, len(user_ids), SEED_BATCH_SIZE):
+        User.objects.filter(id__in=user_ids[start:start + SEED_BATCH_SIZE]).delete()
@@ -0,0 +1,167 @@
+import atexit
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from django.conf import settings
+from django.db import connection
+
+from .metrics import GROUP_SEND_SECONDS
+from .models import VoteTally
+from .results import next_results_sequence
+from .turnout import get_turnout_counts
+
+logger = logging.getLogger(__name__)
+
+
+def results_group_name(election_id) -> str:
+    """
+    Name of the channel layer group live results subscribers of an election join.
+    """
+    return f'election_{election_id}_results'
+
+
+def encode_frame(frame: Dict[str, Any]) -> str:
+    """
+    Encode a live results frame as compact JSON.
+    """
+    return json.dumps(frame, separators=(',', ':'))
+
+
+def build_results_delta(election_id, candidate_ids: Iterable[int]) -> Dict[str, Any]:
+    """
+    Build a delta frame carrying the current vote counts of the given
+    candidates and the election's current turnout.
+
+    Counts are absolute, so a frame can be applied more than once. The counts
+    are read before the sequence number is allocated: any snapshot tagged with
+    a sequence number at or above this frame's already includes these counts.
+    """
+    counts = VoteTally.objects.filter(candidate_id__in=list(candidate_ids)).values_list(
+        'candidate_id', 'vote_count'
+    )
+    changes = [
+        {'candidate_id': candidate_id, 'vote_count': vote_count}
+        for candidate_id, vote_count in counts
+    ]
+    turnout = get_turnout_counts(election_id)
+    return {
+        'type': 'delta',
+        'seq': next_results_sequence(election_id),
+        'changes': changes,
+        'turnout': turnout
+    }
+
+
+def broadcast_results_delta(election_id, candidate_ids: Iterable[int]) -> None:
+    """
+    Send the new vote counts of the given candidates to live results subscribers.
+    """
+    channel_layer = get_channel_layer()
+    message = {
+        'type': 'election_results_delta',
+        # Encoded once here rather than by every subscriber
+        'text': encode_frame(build_results_delta(election_id, candidate_ids))
+    }
+    with GROUP_SEND_SECONDS.time():
+        async_to_sync(channel_layer.group_send)(results_group_name(election_id), message)
+
+
+def broadcast_status_change(election_id, status: str) -> None:
+    """
+    Tell live results subscribers that an election changed status, so
+    clients can show that voting opened or that the results are final.
+    """
+    channel_layer = get_channel_layer()
+    message = {
+        'type': 'election_status',
+        'text': encode_frame({
+            'type': 'status',
+            'seq': next_results_sequence(election_id),
+            'election_id': int(election_id),
+            'status': status
+        })
+    }
+    with GROUP_SEND_SECONDS.time():
+        async_to_sync(channel_layer.group_send)(results_group_name(election_id), message)
+
+
+class ResultsBroadcaster:
+    """
+    Coalesces live results updates per election.
+
+    Request threads only record which candidates changed. A background
+    thread wakes one tick after the first pending change, reads the current
+    counts once per election and sends a single merged delta, so a burst of
+    votes costs one group_send per election per tick.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    @property
+    def interval(self) -> float:
+        return getattr(settings, 'RESULTS_BROADCAST_INTERVAL', 0.25)
+
+    def enqueue(self, election_id, candidate_ids: Iterable[int]) -> None:
+        """
+        Schedule a delta for the given candidates without touching the channel layer.
+        """
+        # The in-memory layer is bound to the event loop of the process
+        # serving the websockets, so a background thread cannot reach it
+        if self.interval <= 0 or isinstance(get_channel_layer(), InMemoryChannelLayer):
+            broadcast_results_delta(election_id, candidate_ids)
+            return
+
+        with self._lock:
+            self._add_pending(election_id, candidate_ids)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='results-broadcaster', daemon=True
+                )
+                self._thread.start()
+        self._wakeup.set()
+
+    def flush(self) -> None:
+        """
+        Send one merged delta per election with pending changes.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        for election_id, candidate_ids in pending.items():
+            try:
+                broadcast_results_delta(election_id, candidate_ids)
+            except Exception:
+                logger.exception('Failed to broadcast results for election %s, retrying next tick', election_id)
+                # Drop a possibly broken connection; the next flush reconnects
+                connection.close()
+                # Subscribers would miss these counts until the next vote
+                with self._lock:
+                    self._add_pending(election_id, candidate_ids)
+                self._wakeup.set()
+
+    def _add_pending(self, election_id, candidate_ids: Iterable[int]) -> None:
+        self._pending.setdefault(int(election_id), set()).update(
+            int(candidate_id) for candidate_id in candidate_ids
+        )
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+results_broadcaster = ResultsBroadcaster()
+
+# Deliver whatever is still pending when the worker shuts down
+atexit.register(results_broadcaster.flush)
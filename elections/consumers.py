@@ -1,12 +1,71 @@
+import asyncio
 import json
+import time
+from collections import OrderedDict
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from .models import Election, Position, Candidate, Vote
+from .broadcast import encode_frame, results_group_name
+from .metrics import LIVE_RESULTS_CONNECTIONS, RESULTS_COMPUTE_SECONDS
+from .models import Election
+from .results import build_election_results, get_final_snapshot, get_results_sequence, get_results_version
+from .turnout import get_turnout_counts
+
+class SharedFrameCache:
+    """
+    Per-process cache of encoded snapshot frames, keyed by election and
+    results version.
+
+    Subscribers connecting at the same time share a single in-flight
+    computation instead of each querying the database and encoding the
+    same payload.
+    """
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._frames = OrderedDict()
+        self._inflight = {}
+    
+    async def get(self, election_id, version, compute):
+        cached = self._frames.get(election_id)
+        if cached is not None and cached[0] == version:
+            self._frames.move_to_end(election_id)
+            return cached[1]
+        
+        key = (election_id, version)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+        
+        inflight = asyncio.ensure_future(compute())
+        self._inflight[key] = inflight
+        try:
+            frame = await asyncio.shield(inflight)
+        finally:
+            del self._inflight[key]
+        
+        # Only the latest version of an election is worth keeping
+        self._frames[election_id] = (version, frame)
+        self._frames.move_to_end(election_id)
+        while len(self._frames) > self.max_entries:
+            self._frames.popitem(last=False)
+        return frame
+
+snapshot_frames = SharedFrameCache()
 
 class ElectionResultsConsumer(AsyncWebsocketConsumer):
+    """
+    Live results protocol: one full 'snapshot' frame on connect, followed by
+    'delta' frames carrying the new vote counts of the candidates that
+    changed. Both carry the election's turnout counts. A 'status' frame
+    announces that voting opened or closed. Every frame has a 'seq' number;
+    clients ignore frames whose seq is not greater than the last one they
+    applied.
+    """
+    counted = False
+    
     async def connect(self):
-        self.election_id = self.scope['url_route']['kwargs']['election_id']
-        self.room_group_name = f'election_{self.election_id}_results'
+        self.election_id = int(self.scope['url_route']['kwargs']['election_id'])
+        self.room_group_name = results_group_name(self.election_id)
         
         # Join room group
         await self.channel_layer.group_add(
@@ -15,12 +74,22 @@ class ElectionResultsConsumer(AsyncWebsocketConsumer):
         )
         
         await self.accept()
+        LIVE_RESULTS_CONNECTIONS.labels(self.election_id).inc()
+        self.counted = True
         
-        # Send initial results
-        initial_results = await self.get_election_results()
-        await self.send(text_data=json.dumps(initial_results))
+        # Send initial results, shared with every subscriber of this results version
+        version = await sync_to_async(get_results_version)(self.election_id)
+        initial_frame = await snapshot_frames.get(
+            self.election_id, version, self.get_election_results_frame
+        )
+        await self.send(text_data=initial_frame)
     
     async def disconnect(self, close_code):
+        # Connections rejected before accept were never counted
+        if self.counted:
+            LIVE_RESULTS_CONNECTIONS.labels(self.election_id).dec()
+            self.counted = False
+        
         # Leave room group
         await self.channel_layer.group_discard(
             self.room_group_name,
@@ -32,45 +101,43 @@ class ElectionResultsConsumer(AsyncWebsocketConsumer):
         pass
     
     async def election_results_update(self, event):
-        # Send updated results to WebSocket
-        results = event['results']
-        await self.send(text_data=json.dumps(results))
+        # Send a full results snapshot to WebSocket
+        await self.send(text_data=encode_frame(event['results']))
+    
+    async def election_results_delta(self, event):
+        # Send changed vote counts to WebSocket, already encoded by the broadcaster
+        await self.send(text_data=event['text'])
+    
+    async def election_status(self, event):
+        # Send the election's new status to WebSocket, already encoded by the scheduler
+        await self.send(text_data=event['text'])
+    
+    async def get_election_results_frame(self):
+        start = time.perf_counter()
+        frame = encode_frame(await self.get_election_results())
+        RESULTS_COMPUTE_SECONDS.labels('live_snapshot').observe(time.perf_counter() - start)
+        return frame
     
     @database_sync_to_async
     def get_election_results(self):
         try:
-            election = Election.objects.get(id=self.election_id)
-            positions = Position.objects.filter(election=election)
+            # Read the sequence number before the counts, so deltas with a
+            # higher seq are never older than this snapshot
+            seq = get_results_sequence(self.election_id)
+            election = Election.objects.select_related('results_snapshot').get(id=self.election_id)
+            snapshot = get_final_snapshot(election)
+            if snapshot is not None:
+                results = json.loads(snapshot.results)
+            else:
+                results = build_election_results(election)
             
-            results = {
-                'election_id': election.id,
-                'election_title': election.title,
-                'positions': []
+            return {
+                'type': 'snapshot',
+                'seq': seq,
+                'election_id': results['id'],
+                'election_title': results['title'],
+                'positions': results['positions'],
+                'turnout': get_turnout_counts(self.election_id)
             }
-            
-            for position in positions:
-                position_data = {
-                    'position_id': position.id,
-                    'position_title': position.title,
-                    'candidates': []
-                }
-                
-                candidates = Candidate.objects.filter(position=position)
-                for candidate in candidates:
-                    vote_count = Vote.objects.filter(
-                        election=election,
-                        position=position,
-                        candidate=candidate
-                    ).count()
-                    
-                    position_data['candidates'].append({
-                        'candidate_id': candidate.id,
-                        'candidate_name': candidate.name,
-                        'vote_count': vote_count
-                    })
-                
-                results['positions'].append(position_data)
-            
-            return results
         except Election.DoesNotExist:
-            return {'error': 'Election not found'} 
\ No newline at end of file
+            return {'type': 'error', 'error': 'Election not found'}
@@ -0,0 +1,193 @@
+import hashlib
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from threading import Lock
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import EligibilityRule, EligibleVoter, User
+from .utils import bump_cache_version, get_cache_version
+
+# Seconds an encoded index stays in the shared cache; it is versioned, so
+# this only bounds how long an unused index occupies memory
+ELIGIBILITY_INDEX_TIMEOUT = 24 * 60 * 60
+
+# Bumped along with every election's version, for payloads that cover
+# many elections at once
+ANY_ELIGIBILITY_VERSION_KEY = 'eligibility_version:any'
+
+# Decoded indexes kept in process memory, most recently used last
+_local_indexes = OrderedDict()
+_local_indexes_lock = Lock()
+_LOCAL_INDEXES_MAX = 64
+
+
+def _index_version_key(election_id) -> str:
+    return f'eligibility_version:{election_id}'
+
+
+def _load_index(election_id, version) -> array:
+    key = f'eligibility_index:{election_id}:{version}'
+    encoded = cache.get(key)
+    index = array('q')
+    if encoded is None:
+        index.extend(
+            EligibleVoter.objects.filter(election_id=election_id)
+            .order_by('student_id')
+            .values_list('student_id', flat=True)
+        )
+        cache.set(key, index.tobytes(), ELIGIBILITY_INDEX_TIMEOUT)
+    else:
+        index.frombytes(encoded)
+    return index
+
+
+def _load_rules(election_id, version) -> list:
+    key = f'eligibility_rules:{election_id}:{version}'
+    fields = cache.get(key)
+    if fields is None:
+        fields = list(
+            EligibilityRule.objects.filter(election_id=election_id)
+            .order_by('id')
+            .values_list('rule_type', 'value', 'value_end')
+        )
+        cache.set(key, fields, ELIGIBILITY_INDEX_TIMEOUT)
+    return [
+        EligibilityRule(election_id=election_id, rule_type=rule_type, value=value, value_end=value_end)
+        for rule_type, value, value_end in fields
+    ]
+
+
+def _get_eligibility(election_id) -> tuple:
+    election_id = int(election_id)
+    version = get_cache_version(_index_version_key(election_id))
+
+    with _local_indexes_lock:
+        local = _local_indexes.get(election_id)
+        if local is not None and local[0] == version:
+            _local_indexes.move_to_end(election_id)
+            return local[1], local[2]
+
+    index = _load_index(election_id, version)
+    rules = _load_rules(election_id, version)
+    with _local_indexes_lock:
+        _local_indexes[election_id] = (version, index, rules)
+        _local_indexes.move_to_end(election_id)
+        while len(_local_indexes) > _LOCAL_INDEXES_MAX:
+            _local_indexes.popitem(last=False)
+    return index, rules
+
+
+def get_eligibility_index(election_id) -> array:
+    """
+    Return the sorted ids of the students explicitly made eligible to vote
+    in an election.
+
+    The index is built from EligibleVoter once per version, shared between
+    workers through the cache as a packed array of 64-bit ids and kept
+    decoded in process memory, so a lookup costs one cache read for the
+    version and a binary search.
+    """
+    return _get_eligibility(election_id)[0]
+
+
+def get_eligibility_rules(election_id) -> list:
+    """
+    Return the eligibility rules of an election, cached like the index.
+    """
+    return _get_eligibility(election_id)[1]
+
+
+def is_eligible(user, election_id) -> bool:
+    """
+    Check whether a user may vote in an election without querying the database.
+
+    A user is eligible when an EligibleVoter row lists them or when any of
+    the election's rules matches them.
+    """
+    index, rules = _get_eligibility(election_id)
+    position = bisect_left(index, user.id)
+    if position < len(index) and index[position] == user.id:
+        return True
+    return any(rule.matches(user) for rule in rules)
+
+
+def rules_user_filter(rules) -> Q:
+    """
+    Combine eligibility rules into one Q object on User, or None without rules.
+    """
+    condition = None
+    for rule in rules:
+        condition = rule.user_filter() if condition is None else condition | rule.user_filter()
+    return condition
+
+
+def eligible_users(election_id):
+    """
+    Return a queryset of every user eligible to vote in an election, whether
+    listed explicitly or matched by a rule.
+    """
+    condition = Q(id__in=EligibleVoter.objects.filter(election_id=election_id).values('student_id'))
+    rules_condition = rules_user_filter(EligibilityRule.objects.filter(election_id=election_id))
+    if rules_condition is not None:
+        condition |= rules_condition
+    return User.objects.filter(condition)
+
+
+def eligible_election_ids(user) -> set:
+    """
+    Return the ids of the elections whose rules match a user.
+
+    Rules are few compared to voters, so they are matched in memory rather
+    than by asking the database which prefixes a student ID starts with.
+    Rules only look at the role and student ID, so the matches are cached
+    per pair of them until any election's eligibility changes.
+    """
+    attributes = hashlib.md5(f'{user.role}:{user.student_id or ""}'.encode()).hexdigest()
+    key = f'eligible_elections:{get_any_eligibility_version()}:{attributes}'
+    election_ids = cache.get(key)
+    if election_ids is None:
+        election_ids = {
+            rule.election_id
+            for rule in EligibilityRule.objects.all()
+            if rule.matches(user)
+        }
+        cache.set(key, election_ids, ELIGIBILITY_INDEX_TIMEOUT)
+    return election_ids
+
+
+def get_eligibility_version(election_id) -> int:
+    """
+    Return a version that changes whenever an election's eligible voters change.
+    """
+    return get_cache_version(_index_version_key(int(election_id)))
+
+
+def get_any_eligibility_version() -> int:
+    """
+    Return a version that changes whenever the eligible voters of any election change.
+    """
+    return get_cache_version(ANY_ELIGIBILITY_VERSION_KEY)
+
+
+def get_eligible_count(election_id) -> int:
+    """
+    Return the number of users eligible to vote in an election, counted once
+    per eligibility version.
+    """
+    key = f'eligibility_count:{election_id}:{get_eligibility_version(election_id)}'
+    count = cache.get(key)
+    if count is None:
+        count = eligible_users(election_id).count()
+        cache.set(key, count, ELIGIBILITY_INDEX_TIMEOUT)
+    return count
+
+
+def invalidate_eligibility_index(election_id) -> None:
+    """
+    Discard the eligibility index of an election after its voters changed.
+    """
+    for key in (_index_version_key(election_id), ANY_ELIGIBILITY_VERSION_KEY):
+        bump_cache_version(key)
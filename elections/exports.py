@@ -0,0 +1,131 @@
+import csv
+import json
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator, Sequence
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Election, Vote
+from .results import build_positions_results, get_final_snapshot
+
+# Only elections whose voting is over can be exported
+EXPORTABLE_STATUSES = (Election.CLOSED, Election.ARCHIVED)
+
+EXPORT_DATASETS = ('votes', 'results')
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+VOTE_FIELDS = ('vote_id', 'timestamp', 'position_id', 'position_title', 'candidate_id', 'candidate_name')
+RESULT_FIELDS = ('position_id', 'position_title', 'candidate_id', 'candidate_name', 'vote_count')
+
+# Rows fetched from the database per round trip while streaming votes
+VOTE_EXPORT_CHUNK_SIZE = 2000
+
+# Lines encoded per hop to the sync thread when streaming to an ASGI server
+ASYNC_EXPORT_LINES = 500
+
+
+def iter_vote_rows(election_id: int, chunk_size: int = VOTE_EXPORT_CHUNK_SIZE) -> Iterator[tuple]:
+    """
+    Yield every vote of an election as a tuple of VOTE_FIELDS, in vote order.
+
+    Rows are fetched chunk by chunk (through a server-side cursor where the
+    database supports one), so memory stays flat however many votes there
+    are. Voters are not exported, keeping ballots anonymous.
+    """
+    return (
+        Vote.objects.filter(election_id=election_id)
+        .order_by('id')
+        .values_list('id', 'timestamp', 'position_id', 'position__title', 'candidate_id', 'candidate__name')
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def iter_result_rows(election_id: int) -> Iterator[tuple]:
+    """
+    Yield the vote count of every candidate of an election as a tuple of
+    RESULT_FIELDS, read from its results snapshot.
+    """
+    election = Election.objects.select_related('results_snapshot').get(id=election_id)
+    snapshot = get_final_snapshot(election)
+    if snapshot is not None:
+        positions = json.loads(snapshot.results)['positions']
+    else:
+        positions = build_positions_results([election_id])[election_id]
+    for position in positions:
+        for candidate in position['candidates']:
+            yield (
+                position['position_id'],
+                position['position_title'],
+                candidate['candidate_id'],
+                candidate['candidate_name'],
+                candidate['vote_count']
+            )
+
+
+class _LineBuffer:
+    """
+    File-like object whose write() returns the line instead of storing it,
+    so csv.writer can encode rows one at a time.
+    """
+    def write(self, value):
+        return value
+
+
+def encode_csv(fields: Sequence[str], rows: Iterable[tuple]) -> Iterator[str]:
+    """
+    Encode rows as CSV lines, starting with a header line.
+    """
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def encode_ndjson(fields: Sequence[str], rows: Iterable[tuple]) -> Iterator[str]:
+    """
+    Encode rows as newline-delimited JSON objects.
+    """
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+
+def stream_export(election_id: int, dataset: str, export_format: str) -> Iterator[str]:
+    """
+    Stream the 'votes' or 'results' dataset of an election as 'csv' or 'ndjson'.
+    """
+    if dataset == 'votes':
+        fields, rows = VOTE_FIELDS, iter_vote_rows(election_id)
+    else:
+        fields, rows = RESULT_FIELDS, iter_result_rows(election_id)
+    encode = encode_csv if export_format == 'csv' else encode_ndjson
+    return encode(fields, rows)
+
+
+async def astream_export(election_id: int, dataset: str, export_format: str,
+                         lines_per_chunk: int = ASYNC_EXPORT_LINES) -> AsyncIterator[str]:
+    """
+    Stream an export like stream_export, for ASGI servers.
+
+    Under ASGI, StreamingHttpResponse reads a sync iterator into a list
+    before sending anything. Here the sync iterator is advanced through
+    sync_to_async instead, lines_per_chunk lines at a time. The calls are
+    thread sensitive, so every query of the export, including its
+    server-side cursor, stays on the request's connection.
+    """
+    lines = stream_export(election_id, dataset, export_format)
+    read_chunk = sync_to_async(lambda: ''.join(islice(lines, lines_per_chunk)), thread_sensitive=True)
+    try:
+        while True:
+            chunk = await read_chunk()
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        # Releases the cursor if the client disconnects mid-export
+        await sync_to_async(lines.close, thread_sensitive=True)()
@@ -0,0 +1,178 @@
+import csv
+import time
+from itertools import islice
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .eligibility import invalidate_eligibility_index
+from .models import EligibleVoter, User
+
+STUDENT_CSV_FIELDS = ('student_id', 'username', 'email')
+
+
+def read_student_csv(stream: IO[str]) -> Iterator[Dict[str, str]]:
+    """
+    Yield the rows of a student roster CSV one at a time.
+
+    The file needs a header row with student_id, username and email columns.
+    """
+    reader = csv.DictReader(stream)
+    missing = set(STUDENT_CSV_FIELDS) - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f'CSV is missing column(s): {", ".join(sorted(missing))}')
+    for row in reader:
+        yield {field: (row[field] or '').strip() for field in STUDENT_CSV_FIELDS}
+
+
+def _batches(rows: Iterable[Dict[str, str]], batch_size: int) -> Iterator[List[Dict[str, str]]]:
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _upsert_users(users: List[User]) -> None:
+    User.objects.bulk_create(
+        users,
+        update_conflicts=True,
+        unique_fields=['student_id'],
+        update_fields=['username', 'email']
+    )
+
+
+def _save_users(pending: List[Tuple[int, User]], counts: Dict[str, Any]) -> List[User]:
+    # A username taken since the batch was checked, e.g. by a concurrent
+    # import, fails the whole insert; retry row by row and skip the rows
+    # that still conflict
+    try:
+        with transaction.atomic():
+            _upsert_users([user for _, user in pending])
+        return [user for _, user in pending]
+    except IntegrityError:
+        pass
+
+    saved = []
+    for number, user in pending:
+        try:
+            with transaction.atomic():
+                _upsert_users([user])
+        except IntegrityError as e:
+            counts['skipped'] += 1
+            counts['errors'].append(f'Row {number}: {e}')
+        else:
+            saved.append(user)
+    return saved
+
+
+@transaction.atomic
+def _import_batch(rows: List[Dict[str, str]], election_id: Optional[int], first_row: int) -> Dict[str, Any]:
+    counts = {'users_created': 0, 'users_updated': 0, 'users_unchanged': 0, 'skipped': 0, 'errors': []}
+
+    # Rows without a student_id or username are skipped; a student_id
+    # repeated within the batch keeps its last row
+    by_student_id = {}
+    for number, row in enumerate(rows, start=first_row):
+        if not row['student_id'] or not row['username'] or row['student_id'] in by_student_id:
+            counts['skipped'] += 1
+        if row['student_id'] and row['username']:
+            by_student_id[row['student_id']] = (number, row)
+
+    existing = User.objects.filter(
+        Q(student_id__in=list(by_student_id)) |
+        Q(username__in=[row['username'] for _, row in by_student_id.values()])
+    ).values_list('student_id', 'username', 'email')
+    current = {}
+    username_owners = {}
+    for student_id, username, email in existing:
+        current[student_id] = (username, email)
+        username_owners[username] = student_id
+
+    pending = []
+    unchanged = []
+    for student_id, (number, row) in by_student_id.items():
+        if username_owners.setdefault(row['username'], student_id) != student_id:
+            # The username belongs to another student; importing would break its uniqueness
+            counts['skipped'] += 1
+            continue
+        if current.get(student_id) == (row['username'], row['email']):
+            counts['users_unchanged'] += 1
+            unchanged.append(student_id)
+            continue
+        pending.append((number, User(
+            student_id=student_id,
+            username=row['username'],
+            email=row['email'],
+            role=User.STUDENT,
+            password=make_password(None)
+        )))
+
+    saved = _save_users(pending, counts)
+    for user in saved:
+        counts['users_updated' if user.student_id in current else 'users_created'] += 1
+
+    student_ids = unchanged + [user.student_id for user in saved]
+    if election_id is not None and student_ids:
+        student_pks = User.objects.filter(student_id__in=student_ids).values_list('id', flat=True)
+        EligibleVoter.objects.bulk_create(
+            [EligibleVoter(election_id=election_id, student_id=pk) for pk in student_pks],
+            ignore_conflicts=True
+        )
+
+    return counts
+
+
+def import_students(
+    rows: Iterable[Dict[str, str]],
+    election_id: Optional[int] = None,
+    batch_size: int = 1000,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Upsert students from roster rows and make them eligible for an election.
+
+    Rows are consumed in batches of batch_size, so memory use does not grow
+    with the size of the roster. Users are matched on student_id: new ones
+    are created with an unusable password, existing ones get their username
+    and email updated when either differs. Students already eligible for
+    the election are left alone. Rows that cannot be saved are skipped and
+    described in the 'errors' statistic by their 1-based row number.
+
+    Returns the import statistics; progress, if given, is called with them
+    after every batch.
+    """
+    stats = {
+        'rows': 0,
+        'users_created': 0,
+        'users_updated': 0,
+        'users_unchanged': 0,
+        'skipped': 0,
+        'errors': [],
+        'eligible_added': 0,
+        'seconds': 0.0,
+        'rows_per_second': 0.0,
+    }
+    eligible_before = (
+        EligibleVoter.objects.filter(election_id=election_id).count()
+        if election_id is not None else 0
+    )
+    started = time.perf_counter()
+
+    for batch in _batches(rows, batch_size):
+        for key, count in _import_batch(batch, election_id, stats['rows'] + 1).items():
+            stats[key] += count
+        stats['rows'] += len(batch)
+        stats['seconds'] = time.perf_counter() - started
+        stats['rows_per_second'] = stats['rows'] / stats['seconds'] if stats['seconds'] else 0.0
+        if progress:
+            progress(dict(stats))
+
+    if election_id is not None:
+        stats['eligible_added'] = EligibleVoter.objects.filter(election_id=election_id).count() - eligible_before
+        # bulk_create bypasses the signals that normally keep the index fresh
+        invalidate_eligibility_index(election_id)
+    return stats
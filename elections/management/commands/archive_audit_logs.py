@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from elections.archive import archive_period, find_archivable_periods, get_retention_cutoff
+from elections.models import AuditLogArchive
+
+
+class Command(BaseCommand):
+    help = 'Move whole months of audit log entries older than the retention period into compressed archive files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-months',
+            type=int,
+            help="Months, counting the current one, to keep in the table (defaults to AUDIT_LOG['RETENTION_MONTHS'])"
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only list the months that would be archived'
+        )
+
+    def handle(self, *args, **options):
+        if options['keep_months'] is not None and options['keep_months'] < 1:
+            raise CommandError('--keep-months must be at least 1')
+
+        cutoff = get_retention_cutoff(options['keep_months'])
+        periods = find_archivable_periods(cutoff)
+        if not periods:
+            self.stdout.write(self.style.SUCCESS(f'No audit log entries before {cutoff:%Y-%m} to archive'))
+            return
+
+        # Entries written late into a month that is already archived cannot
+        # be added to its file; they stay in the table until it is restored
+        archived = set(
+            AuditLogArchive.objects.filter(period_start__in=periods).values_list('period_start', flat=True)
+        )
+        for start in periods:
+            if start in archived:
+                self.stderr.write(self.style.WARNING(
+                    f'Skipping {start:%Y-%m}: it is already archived but has entries in the table; '
+                    f'restore it with restore_audit_archive {start:%Y-%m} and archive it again'
+                ))
+                continue
+            if options['dry_run']:
+                self.stdout.write(f'Would archive {start:%Y-%m}')
+                continue
+            try:
+                archive = archive_period(start)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Failed to archive {start:%Y-%m}: {e}')
+            self.stdout.write(self.style.SUCCESS(
+                f'Archived {archive.row_count} entries of {start:%Y-%m} to {archive.path}'
+            ))
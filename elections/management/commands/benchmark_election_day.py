@@ -0,0 +1,70 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from elections.benchmark import ElectionDayBenchmark, remove_seeded_election, seed_election
+
+
+class Command(BaseCommand):
+    help = 'Seed a synthetic election and measure vote, results polling and live results throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000, help='Eligible students, each voting once (default 1000)')
+        parser.add_argument('--positions', type=int, default=3, help='Positions on the ballot (default 3)')
+        parser.add_argument('--candidates', type=int, default=4, help='Candidates per position (default 4)')
+        parser.add_argument('--concurrency', type=int, default=20, help='Voters voting at the same time (default 20)')
+        parser.add_argument('--subscribers', type=int, default=100, help='Live results websockets (default 100)')
+        parser.add_argument('--pollers', type=int, default=20, help='Clients polling the public results (default 20)')
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds each poller waits between reads; 0 polls as fast as possible (default 1.0)'
+        )
+        parser.add_argument(
+            '--vote-endpoint',
+            choices=['ballot', 'vote'],
+            default='ballot',
+            help="'ballot' casts one request per voter (default), 'vote' one request per position"
+        )
+        parser.add_argument('--output', help='File to write the JSON report to (defaults to standard output)')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded election and users afterwards')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Run even though DEBUG is off; the benchmark writes to the configured database'
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError(
+                'DEBUG is off, so this may be a production database. '
+                'Point the settings at a local database, or pass --force.'
+            )
+        for name in ('students', 'positions', 'candidates', 'concurrency'):
+            if options[name] < 1:
+                raise CommandError(f'--{name} must be at least 1')
+
+        seeded = seed_election(options['students'], options['positions'], options['candidates'])
+        self.stderr.write(f'Seeded election {seeded.election_id} with {len(seeded.student_ids)} students')
+        try:
+            report = ElectionDayBenchmark(
+                seeded,
+                concurrency=options['concurrency'],
+                subscribers=options['subscribers'],
+                pollers=options['pollers'],
+                poll_interval=options['poll_interval'],
+                vote_endpoint=options['vote_endpoint']
+            ).run()
+        finally:
+            if not options['keep']:
+                remove_seeded_election(seeded)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                stream.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Wrote the report to {options['output']}"))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from elections.eligibility import get_eligibility_index, is_eligible
+from elections.models import Election, EligibleVoter, User
+
+
+class Command(BaseCommand):
+    help = 'Compare eligibility checks through the in-memory index with the EligibleVoter query'
+
+    def add_arguments(self, parser):
+        parser.add_argument('election', type=int, help='ID of the election to check against')
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=1000,
+            help='Number of checks to time for each method (default 1000)'
+        )
+
+    def handle(self, *args, **options):
+        election_id = options['election']
+        iterations = options['iterations']
+        if not Election.objects.filter(id=election_id).exists():
+            raise CommandError(f'Election {election_id} not found')
+
+        users = list(User.objects.order_by('?')[:iterations])
+        if not users:
+            raise CommandError('There are no users to check')
+        users = (users * (iterations // len(users) + 1))[:iterations]
+
+        # Build the index up front so only lookups are timed
+        index = get_eligibility_index(election_id)
+
+        started = time.perf_counter()
+        for user in users:
+            EligibleVoter.objects.filter(election_id=election_id, student=user).exists()
+        query_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for user in users:
+            is_eligible(user, election_id)
+        index_seconds = time.perf_counter() - started
+
+        self.stdout.write(f'Eligible voters in index: {len(index)} ({index.itemsize * len(index)} bytes)')
+        self.stdout.write(f'EligibleVoter query: {query_seconds / iterations * 1e6:.1f} us per check')
+        self.stdout.write(f'Eligibility index:   {index_seconds / iterations * 1e6:.1f} us per check')
+        if index_seconds:
+            self.stdout.write(self.style.SUCCESS(f'Speedup: {query_seconds / index_seconds:.1f}x'))
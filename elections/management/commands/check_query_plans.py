@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from elections.query_plans import check_query_plans
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN every hot query and fail if any of them reads a whole table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print the full plan of every query, not only the failing ones'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            results = check_query_plans()
+        except NotImplementedError as e:
+            raise CommandError(str(e))
+
+        failures = 0
+        for name, (plan, full_scans) in results.items():
+            if full_scans:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f'FULL SCAN  {name}'))
+            else:
+                self.stdout.write(f'ok         {name}')
+            if full_scans or options['verbose_plans']:
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+
+        if failures:
+            raise CommandError(f'{failures} of {len(results)} hot queries read a whole table')
+        self.stdout.write(self.style.SUCCESS(f'All {len(results)} hot queries use an index'))
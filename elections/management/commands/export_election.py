@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from elections.exports import EXPORT_DATASETS, EXPORT_FORMATS, EXPORTABLE_STATUSES, stream_export
+from elections.models import Election
+
+
+class Command(BaseCommand):
+    help = 'Stream the votes or results of a closed election as CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('election', type=int, help='ID of the election to export')
+        parser.add_argument(
+            '--dataset',
+            choices=EXPORT_DATASETS,
+            default='votes',
+            help="'votes' for one row per vote (default), 'results' for one row per candidate"
+        )
+        parser.add_argument(
+            '--format',
+            choices=list(EXPORT_FORMATS),
+            default='csv',
+            dest='export_format',
+            help='Output format (default csv)'
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write to (defaults to standard output)'
+        )
+
+    def handle(self, *args, **options):
+        election = Election.objects.filter(id=options['election']).first()
+        if election is None:
+            raise CommandError(f"Election {options['election']} not found")
+        if election.status not in EXPORTABLE_STATUSES:
+            raise CommandError(f'Election {election.id} is {election.status}; only closed elections can be exported')
+
+        chunks = stream_export(election.id, options['dataset'], options['export_format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(chunks)
+            self.stderr.write(self.style.SUCCESS(f"Exported {options['dataset']} to {options['output']}"))
+        else:
+            sys.stdout.writelines(chunks)
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from elections.models import Election, ResultsSnapshot
+from elections.results import FINAL_STATUSES, freeze_results, refreeze_results
+
+
+class Command(BaseCommand):
+    help = 'Store the final results of closed and archived elections that have no results snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--election',
+            type=int,
+            action='append',
+            dest='elections',
+            help='ID of a closed or archived election to freeze (repeatable, defaults to all of them)'
+        )
+        parser.add_argument(
+            '--refreeze',
+            action='store_true',
+            help='Replace existing snapshots, e.g. after correcting the votes of a closed election'
+        )
+
+    def handle(self, *args, **options):
+        elections = Election.objects.filter(status__in=FINAL_STATUSES)
+        if options['elections']:
+            elections = elections.filter(id__in=options['elections'])
+            missing = set(options['elections']) - set(elections.values_list('id', flat=True))
+            if missing:
+                raise CommandError(
+                    f'Election(s) not found or not closed: {", ".join(map(str, sorted(missing)))}'
+                )
+
+        frozen = 0
+        for election in elections:
+            if options['refreeze']:
+                refreeze_results(election)
+            elif ResultsSnapshot.objects.filter(election_id=election.id).exists():
+                continue
+            else:
+                freeze_results(election)
+            frozen += 1
+        self.stdout.write(self.style.SUCCESS(f'Froze the results of {frozen} election(s)'))
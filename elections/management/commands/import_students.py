@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from elections.importers import import_students, read_student_csv
+from elections.models import Election
+
+
+class Command(BaseCommand):
+    help = 'Import students from a CSV of student_id, username and email, optionally making them eligible for an election'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='Path to the roster CSV')
+        parser.add_argument(
+            '--election',
+            type=int,
+            help='ID of the election the imported students become eligible for'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows inserted per batch (default 1000)'
+        )
+
+    def handle(self, *args, **options):
+        election_id = options['election']
+        if election_id is not None and not Election.objects.filter(id=election_id).exists():
+            raise CommandError(f'Election {election_id} not found')
+
+        def report(stats):
+            self.stdout.write(
+                f"{stats['rows']} rows, {stats['rows_per_second']:.0f} rows/s"
+            )
+
+        try:
+            with open(options['csv_file'], newline='', encoding='utf-8-sig') as stream:
+                stats = import_students(
+                    read_student_csv(stream),
+                    election_id=election_id,
+                    batch_size=options['batch_size'],
+                    progress=report
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for error in stats['errors']:
+            self.stderr.write(self.style.WARNING(f'Skipped {error}'))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['rows']} rows in {stats['seconds']:.1f}s "
+            f"({stats['rows_per_second']:.0f} rows/s): "
+            f"{stats['users_created']} users created, {stats['users_updated']} updated, "
+            f"{stats['users_unchanged']} unchanged, {stats['skipped']} skipped, "
+            f"{stats['eligible_added']} eligible voters added"
+        ))
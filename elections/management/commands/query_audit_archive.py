@@ -0,0 +1,35 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from elections.archive import search_archives
+from elections.audit import parse_audit_filters
+
+
+class Command(BaseCommand):
+    help = 'Search archived audit log entries with the same filters as the audit log API, printing matches as NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--action', help='Only entries with this action')
+        parser.add_argument('--user', help='Only entries of this user ID')
+        parser.add_argument('--ip', help='Only entries from this IP address')
+        parser.add_argument('--election', help='Only entries about this election ID')
+        parser.add_argument('--since', help='Only entries at or after this ISO 8601 datetime')
+        parser.add_argument('--until', help='Only entries before this ISO 8601 datetime')
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_audit_filters(options)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        encoder = DjangoJSONEncoder(separators=(',', ':'))
+        matched = 0
+        try:
+            for entry in search_archives(filters):
+                sys.stdout.write(encoder.encode(entry) + '\n')
+                matched += 1
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        self.stderr.write(f'{matched} archived entries matched')
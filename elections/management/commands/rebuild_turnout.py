@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from elections.models import Election
+from elections.turnout import rebuild_turnout
+
+
+class Command(BaseCommand):
+    help = 'Recompute turnout tallies, voter progress and has_voted flags from the raw votes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--election',
+            type=int,
+            action='append',
+            dest='elections',
+            help='ID of an election to rebuild (repeatable, defaults to all elections)'
+        )
+
+    def handle(self, *args, **options):
+        election_ids = options['elections'] or list(Election.objects.values_list('id', flat=True))
+        missing = set(election_ids) - set(
+            Election.objects.filter(id__in=election_ids).values_list('id', flat=True)
+        )
+        if missing:
+            raise CommandError(f'Election(s) not found: {", ".join(map(str, sorted(missing)))}')
+
+        rebuild_turnout(election_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt turnout for {len(election_ids)} election(s)'))
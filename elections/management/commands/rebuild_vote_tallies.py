@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from elections.models import Election
+from elections.results import find_tally_drift, rebuild_tallies
+
+
+class Command(BaseCommand):
+    help = (
+        'Verify vote tallies against the raw votes and rebuild the ones that drifted, '
+        'refreezing the results of closed elections'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--election',
+            type=int,
+            action='append',
+            dest='elections',
+            help='ID of an election to check (repeatable, defaults to all elections)'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report drift and exit with an error if any is found'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rebuild tallies even when no drift is found'
+        )
+
+    def handle(self, *args, **options):
+        election_ids = options['elections'] or list(Election.objects.values_list('id', flat=True))
+        missing = set(election_ids) - set(
+            Election.objects.filter(id__in=election_ids).values_list('id', flat=True)
+        )
+        if missing:
+            raise CommandError(f'Election(s) not found: {", ".join(map(str, sorted(missing)))}')
+
+        drifted = []
+        for election_id in election_ids:
+            drift = find_tally_drift([election_id])
+            for candidate_id, (tallied, counted) in sorted(drift.items()):
+                self.stdout.write(
+                    f'Election {election_id}: candidate {candidate_id} tallied {tallied}, counted {counted}'
+                )
+            if drift:
+                drifted.append(election_id)
+
+        if options['check']:
+            if drifted:
+                raise CommandError(f'Tally drift found in {len(drifted)} election(s)')
+            self.stdout.write(self.style.SUCCESS(f'Tallies match votes for {len(election_ids)} election(s)'))
+            return
+
+        to_rebuild = election_ids if options['force'] else drifted
+        if not to_rebuild:
+            self.stdout.write(self.style.SUCCESS(f'Tallies match votes for {len(election_ids)} election(s)'))
+            return
+
+        rows = rebuild_tallies(to_rebuild)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {rows} tally row(s) for {len(to_rebuild)} election(s)'
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from elections.archive import parse_period, restore_archive
+from elections.models import AuditLogArchive
+
+
+class Command(BaseCommand):
+    help = 'Move an archived month of audit log entries back into the audit log table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('period', help='Archived month, as YYYY-MM')
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_period(options['period'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        archive = AuditLogArchive.objects.filter(period_start=start).first()
+        if archive is None:
+            raise CommandError(f"No audit log archive for {options['period']}")
+
+        try:
+            restored = restore_archive(archive)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Failed to restore {archive.path}: {e}')
+        self.stdout.write(self.style.SUCCESS(f"Restored {restored} entries of {options['period']}"))
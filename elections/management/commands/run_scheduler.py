@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from elections.scheduler import ElectionScheduler
+
+
+class Command(BaseCommand):
+    help = 'Start and close elections as their start and end times arrive'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Apply the transitions already due and exit, for running from cron'
+        )
+
+    def handle(self, *args, **options):
+        scheduler = ElectionScheduler()
+        if options['once']:
+            scheduler.load()
+            for election_id, action in scheduler.run_due():
+                self.stdout.write(f'Applied {action} to election {election_id}')
+            return
+
+        self.stdout.write('Election scheduler running; press Ctrl+C to stop')
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            pass
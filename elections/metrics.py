@@ -0,0 +1,92 @@
+import functools
+import hmac
+import os
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess
+)
+
+# Set PROMETHEUS_MULTIPROC_DIR to a directory shared by every worker process
+# (emptied before the server starts) to aggregate metrics across workers.
+# Metric values are then written to files in that directory instead of
+# process memory, and /metrics merges them.
+MULTIPROCESS = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+VOTES_CAST = Counter(
+    'election_votes_cast_total',
+    'Votes recorded, by the endpoint that recorded them',
+    ['endpoint']
+)
+VOTE_REQUEST_SECONDS = Histogram(
+    'election_vote_request_seconds',
+    'Time to handle a vote or ballot request, by endpoint and response status',
+    ['endpoint', 'status'],
+    buckets=FAST_BUCKETS
+)
+LIVE_RESULTS_CONNECTIONS = Gauge(
+    'election_live_results_connections',
+    'Open live results websockets, by election',
+    ['election'],
+    multiprocess_mode='livesum'
+)
+GROUP_SEND_SECONDS = Histogram(
+    'election_results_group_send_seconds',
+    'Time to hand a live results frame to the channel layer',
+    buckets=FAST_BUCKETS
+)
+RESULTS_COMPUTE_SECONDS = Histogram(
+    'election_results_compute_seconds',
+    'Time to build a results payload on a cache miss, by payload',
+    ['payload'],
+    buckets=FAST_BUCKETS
+)
+RESULTS_CACHE_REQUESTS = Counter(
+    'election_results_cache_requests_total',
+    'Cached results payload reads, by payload and whether they hit',
+    ['payload', 'result']
+)
+
+
+def observe_vote_request(endpoint):
+    """
+    Decorate a vote view method to time it under the given endpoint label.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            response = method(*args, **kwargs)
+            VOTE_REQUEST_SECONDS.labels(endpoint, response.status_code).observe(
+                time.perf_counter() - start
+            )
+            return response
+        return wrapper
+    return decorator
+
+
+def get_registry():
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_view(request):
+    """
+    Serve every metric in the Prometheus text format.
+
+    When METRICS_TOKEN is set, scrapers must send it as a bearer token.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        authorization = request.META.get('HTTP_AUTHORIZATION', '')
+        if not hmac.compare_digest(authorization, f'Bearer {token}'):
+            return HttpResponse(status=401)
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
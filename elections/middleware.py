@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .utils import percentile
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Profile requests at all; the middleware removes itself when False
+    'ENABLED': False,
+    # Requests remembered per view for the percentiles
+    'WINDOW': 1000,
+    # Requests running more queries than this are logged
+    'QUERY_BUDGET': 50,
+    # Requests taking longer than this many milliseconds are logged
+    'LATENCY_BUDGET_MS': 500,
+}
+
+METRICS = ('queries', 'sql_ms', 'wall_ms', 'response_bytes')
+
+
+def get_profiling_setting(name):
+    return getattr(settings, 'REQUEST_PROFILING', {}).get(name, DEFAULTS[name])
+
+
+class RequestProfileStore:
+    """
+    Rolling per-view request profiles kept in process memory.
+
+    Each view keeps its last WINDOW samples, from which percentiles are
+    computed on demand, plus running totals since the last reset.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view_name, sample):
+        with self._lock:
+            profile = self._views.get(view_name)
+            if profile is None:
+                profile = self._views[view_name] = {
+                    'requests': 0,
+                    'totals': dict.fromkeys(METRICS, 0),
+                    'samples': deque(maxlen=get_profiling_setting('WINDOW')),
+                }
+            profile['requests'] += 1
+            for metric in METRICS:
+                profile['totals'][metric] += sample[metric]
+            profile['samples'].append(tuple(sample[metric] for metric in METRICS))
+
+    def snapshot(self):
+        """
+        Return the profile of every view, busiest first.
+        """
+        with self._lock:
+            views = {
+                name: (profile['requests'], dict(profile['totals']), list(profile['samples']))
+                for name, profile in self._views.items()
+            }
+
+        result = []
+        for name, (requests, totals, samples) in views.items():
+            stats = {}
+            for index, metric in enumerate(METRICS):
+                ordered = sorted(sample[index] for sample in samples)
+                stats[metric] = {
+                    'mean': round(totals[metric] / requests, 2),
+                    'p50': round(percentile(ordered, 0.50), 2),
+                    'p95': round(percentile(ordered, 0.95), 2),
+                    'p99': round(percentile(ordered, 0.99), 2),
+                    'max': round(ordered[-1], 2),
+                }
+            result.append({'view': name, 'requests': requests, 'window': len(samples), **stats})
+        result.sort(key=lambda view: view['requests'], reverse=True)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+request_profiles = RequestProfileStore()
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting the queries of a request and their time.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+class RequestProfilingMiddleware:
+    """
+    Records the SQL query count, SQL time, wall time and response size of
+    every request under its resolved view name, and logs requests over the
+    query or latency budget.
+
+    Opt in with REQUEST_PROFILING['ENABLED']; profiles are served by
+    RequestProfileView.
+    """
+
+    def __init__(self, get_response):
+        if not get_profiling_setting('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = (match.view_name if match else None) or '<unresolved>'
+        # Streaming responses are not buffered just to be measured
+        response_bytes = 0 if response.streaming else len(response.content)
+        sample = {
+            'queries': counter.queries,
+            'sql_ms': counter.seconds * 1000,
+            'wall_ms': wall_ms,
+            'response_bytes': response_bytes,
+        }
+        request_profiles.record(view_name, sample)
+
+        if (counter.queries > get_profiling_setting('QUERY_BUDGET')
+                or wall_ms > get_profiling_setting('LATENCY_BUDGET_MS')):
+            logger.warning(
+                'Request over budget: %s %s (%s) ran %d queries in %.1f ms of SQL, %.1f ms total, %d bytes',
+                request.method, request.path, view_name, counter.queries,
+                sample['sql_ms'], wall_ms, response_bytes
+            )
+        return response
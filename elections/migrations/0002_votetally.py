@@ -0,0 +1,49 @@
+# Generated by Django 5.2.1 on 2026-10-16 22:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_vote_tallies(apps, schema_editor):
+    Candidate = apps.get_model('elections', 'Candidate')
+    Vote = apps.get_model('elections', 'Vote')
+    VoteTally = apps.get_model('elections', 'VoteTally')
+
+    counts = dict(
+        Vote.objects.values('candidate_id').annotate(vote_count=Count('id')).order_by()
+        .values_list('candidate_id', 'vote_count')
+    )
+    VoteTally.objects.bulk_create([
+        VoteTally(
+            election_id=candidate.position.election_id,
+            position_id=candidate.position_id,
+            candidate_id=candidate.id,
+            vote_count=counts[candidate.id]
+        )
+        for candidate in Candidate.objects.filter(id__in=counts).select_related('position')
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vote_count', models.PositiveIntegerField(default=0)),
+                ('candidate', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='vote_tally', to='elections.candidate')),
+                ('election', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vote_tallies', to='elections.election')),
+                ('position', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vote_tallies', to='elections.position')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['election', 'position'], name='elections_v_electio_a3f889_idx')],
+            },
+        ),
+        migrations.RunPython(populate_vote_tallies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-16 22:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('elections', '0003_auditlog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EligibilityRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rule_type', models.CharField(choices=[('role', 'All users with role'), ('student_id_prefix', 'Student ID starts with'), ('student_id_range', 'Student ID between (inclusive, compared as text)')], max_length=20)),
+                ('value', models.CharField(help_text='Role, student ID prefix or start of the student ID range', max_length=50)),
+                ('value_end', models.CharField(blank=True, help_text='End of the student ID range', max_length=50)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role'], name='elections_u_role_5123bf_idx'),
+        ),
+        migrations.AddField(
+            model_name='eligibilityrule',
+            name='election',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eligibility_rules', to='elections.election'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.1 on 2026-10-16 22:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Exists, OuterRef
+
+
+def populate_turnout(apps, schema_editor):
+    EligibleVoter = apps.get_model('elections', 'EligibleVoter')
+    Position = apps.get_model('elections', 'Position')
+    TurnoutTally = apps.get_model('elections', 'TurnoutTally')
+    Vote = apps.get_model('elections', 'Vote')
+    VoterProgress = apps.get_model('elections', 'VoterProgress')
+
+    total_positions = dict(
+        Position.objects.values('election_id').annotate(total=Count('id')).order_by()
+        .values_list('election_id', 'total')
+    )
+    turnout = {}
+    progress = []
+    for election_id, student_id, positions_voted in (
+        Vote.objects.values('election_id', 'student_id').annotate(total=Count('id')).order_by()
+        .values_list('election_id', 'student_id', 'total')
+    ):
+        progress.append(VoterProgress(
+            election_id=election_id,
+            student_id=student_id,
+            positions_voted=positions_voted
+        ))
+        tally = turnout.setdefault(election_id, TurnoutTally(election_id=election_id))
+        tally.voters_started += 1
+        if positions_voted >= total_positions.get(election_id, 0):
+            tally.voters_completed += 1
+
+    VoterProgress.objects.bulk_create(progress, batch_size=1000)
+    TurnoutTally.objects.bulk_create(turnout.values())
+    EligibleVoter.objects.filter(
+        Exists(VoterProgress.objects.filter(
+            election_id=OuterRef('election_id'),
+            student_id=OuterRef('student_id')
+        ))
+    ).update(has_voted=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0004_eligibilityrule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TurnoutTally',
+            fields=[
+                ('election', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='turnout_tally', serialize=False, to='elections.election')),
+                ('voters_started', models.PositiveIntegerField(default=0)),
+                ('voters_completed', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VoterProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('positions_voted', models.PositiveIntegerField(default=0)),
+                ('election', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='voter_progress', to='elections.election')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='voter_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('election', 'student')},
+            },
+        ),
+        migrations.RunPython(populate_turnout, migrations.RunPython.noop),
+    ]
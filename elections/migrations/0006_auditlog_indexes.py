@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-16 22:44
+
+import django.db.models.fields.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0005_turnout'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['-timestamp'], name='elections_a_timesta_32f6fb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['user', '-timestamp'], name='elections_a_user_id_70f387_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['action', '-timestamp'], name='elections_a_action_e448a1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['ip_address', '-timestamp'], name='elections_a_ip_addr_44b9f1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(django.db.models.fields.json.KeyTextTransform('election_id', 'details'), models.OrderBy(models.F('timestamp'), descending=True), name='auditlog_election_ts_idx'),
+        ),
+    ]
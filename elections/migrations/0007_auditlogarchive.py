@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-16 22:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0006_auditlog_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditLogArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateTimeField(unique=True)),
+                ('period_end', models.DateTimeField()),
+                ('path', models.CharField(max_length=255)),
+                ('row_count', models.PositiveIntegerField()),
+                ('checksum', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-period_start'],
+            },
+        ),
+    ]
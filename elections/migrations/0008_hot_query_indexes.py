@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-16 22:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0007_auditlogarchive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='election',
+            index=models.Index(fields=['status', '-start_datetime', '-id'], name='elections_e_status_2a8e73_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eligiblevoter',
+            index=models.Index(fields=['student', 'election'], name='elections_e_student_e18dbe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['student', 'election'], name='elections_v_student_004f4a_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-16 23:10
+
+from django.db import migrations
+
+
+def declare_statuses(apps, schema_editor):
+    Election = apps.get_model('elections', 'Election')
+    # The end action used to record 'completed' and the start action
+    # expected 'pending'; neither is a declared status
+    Election.objects.filter(status='completed').update(status='closed')
+    Election.objects.filter(status='pending').update(status='upcoming')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0008_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(declare_statuses, migrations.RunPython.noop),
+    ]
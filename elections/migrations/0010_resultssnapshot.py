@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-16 23:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0009_undeclared_election_statuses'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultsSnapshot',
+            fields=[
+                ('election', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='results_snapshot', serialize=False, to='elections.election')),
+                ('results', models.TextField()),
+                ('turnout', models.TextField()),
+                ('checksum', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
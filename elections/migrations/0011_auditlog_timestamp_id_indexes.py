@@ -0,0 +1,58 @@
+# Generated by Django 5.2.1 on 2026-10-16 23:39
+
+import django.db.models.fields.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0010_resultssnapshot'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='auditlog',
+            options={'ordering': ['-timestamp', '-id']},
+        ),
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='elections_a_timesta_32f6fb_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='elections_a_user_id_70f387_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='elections_a_action_e448a1_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='elections_a_ip_addr_44b9f1_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='auditlog_election_ts_idx',
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['-timestamp', '-id'], name='elections_a_timesta_019565_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['user', '-timestamp', '-id'], name='elections_a_user_id_6081b8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['action', '-timestamp', '-id'], name='elections_a_action_9c51e1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['ip_address', '-timestamp', '-id'], name='elections_a_ip_addr_051789_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(django.db.models.fields.json.KeyTextTransform('election_id', 'details'), models.OrderBy(models.F('timestamp'), descending=True), models.OrderBy(models.F('id'), descending=True), name='auditlog_election_ts_id_idx'),
+        ),
+    ]
@@ -1,5 +1,8 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.fields.json import KeyTextTransform
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 class User(AbstractUser):
@@ -17,6 +20,10 @@ class User(AbstractUser):
     class Meta:
         verbose_name = _('user')
         verbose_name_plural = _('users')
+        indexes = [
+            # Eligibility rules select users by role
+            models.Index(fields=['role']),
+        ]
 
 class Election(models.Model):
     UPCOMING = 'upcoming'
@@ -42,6 +49,10 @@ class Election(models.Model):
     
     class Meta:
         ordering = ['-start_datetime']
+        indexes = [
+            # Public listing: filter by status, newest first, keyset on id
+            models.Index(fields=['status', '-start_datetime', '-id']),
+        ]
     
     def __str__(self):
         return self.title
@@ -79,10 +90,67 @@ class EligibleVoter(models.Model):
     
     class Meta:
         unique_together = ['election', 'student']
+        indexes = [
+            # A student's elections; the unique constraint leads with election
+            models.Index(fields=['student', 'election']),
+        ]
     
     def __str__(self):
         return f"{self.student.username} - {self.election.title}"
 
+class EligibilityRule(models.Model):
+    """
+    Makes every user matching a predicate eligible for an election, without
+    one EligibleVoter row per student. Explicit EligibleVoter rows still add
+    voters on top of the rules.
+    """
+    ROLE = 'role'
+    STUDENT_ID_PREFIX = 'student_id_prefix'
+    STUDENT_ID_RANGE = 'student_id_range'
+    
+    RULE_CHOICES = [
+        (ROLE, 'All users with role'),
+        (STUDENT_ID_PREFIX, 'Student ID starts with'),
+        (STUDENT_ID_RANGE, 'Student ID between (inclusive, compared as text)'),
+    ]
+    
+    election = models.ForeignKey(Election, on_delete=models.CASCADE, related_name='eligibility_rules')
+    rule_type = models.CharField(max_length=20, choices=RULE_CHOICES)
+    value = models.CharField(max_length=50, help_text='Role, student ID prefix or start of the student ID range')
+    value_end = models.CharField(max_length=50, blank=True, help_text='End of the student ID range')
+    
+    def __str__(self):
+        if self.rule_type == self.STUDENT_ID_RANGE:
+            return f"{self.election.title}: student ID {self.value}-{self.value_end}"
+        return f"{self.election.title}: {self.get_rule_type_display()} {self.value}"
+    
+    def clean(self):
+        if self.rule_type == self.ROLE and self.value not in dict(User.ROLE_CHOICES):
+            raise ValidationError({'value': 'Unknown role'})
+        if self.rule_type == self.STUDENT_ID_RANGE and not self.value_end:
+            raise ValidationError({'value_end': 'A student ID range needs an end'})
+    
+    def user_filter(self):
+        """
+        Return a Q object selecting the users this rule makes eligible.
+        """
+        if self.rule_type == self.ROLE:
+            return models.Q(role=self.value)
+        if self.rule_type == self.STUDENT_ID_PREFIX:
+            return models.Q(student_id__startswith=self.value)
+        return models.Q(student_id__gte=self.value, student_id__lte=self.value_end)
+    
+    def matches(self, user):
+        """
+        Check in memory whether this rule makes the given user eligible.
+        """
+        if self.rule_type == self.ROLE:
+            return user.role == self.value
+        student_id = user.student_id or ''
+        if self.rule_type == self.STUDENT_ID_PREFIX:
+            return bool(student_id) and student_id.startswith(self.value)
+        return bool(student_id) and self.value <= student_id <= self.value_end
+
 class Vote(models.Model):
     election = models.ForeignKey(Election, on_delete=models.CASCADE, related_name='votes')
     position = models.ForeignKey(Position, on_delete=models.CASCADE, related_name='votes')
@@ -93,21 +161,118 @@ class Vote(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=['election', 'position']),
+            # A student's votes in an election
+            models.Index(fields=['student', 'election']),
         ]
         unique_together = ['election', 'position', 'student']
     
     def __str__(self):
         return f"Vote for {self.candidate.name} in {self.position.title}"
 
+class VoteTally(models.Model):
+    election = models.ForeignKey(Election, on_delete=models.CASCADE, related_name='vote_tallies')
+    position = models.ForeignKey(Position, on_delete=models.CASCADE, related_name='vote_tallies')
+    candidate = models.OneToOneField(Candidate, on_delete=models.CASCADE, related_name='vote_tally')
+    vote_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['election', 'position']),
+        ]
+    
+    def __str__(self):
+        return f"{self.candidate.name}: {self.vote_count} votes"
+
+class VoterProgress(models.Model):
+    """
+    Number of positions a voter has voted for in an election, used to keep
+    the election's turnout tally up to date without scanning votes.
+    """
+    election = models.ForeignKey(Election, on_delete=models.CASCADE, related_name='voter_progress')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='voter_progress')
+    positions_voted = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['election', 'student']
+    
+    def __str__(self):
+        return f"{self.student.username} - {self.election.title}: {self.positions_voted} positions"
+
+class TurnoutTally(models.Model):
+    election = models.OneToOneField(Election, on_delete=models.CASCADE, primary_key=True, related_name='turnout_tally')
+    # Voters with at least one vote, and voters who voted for every position
+    voters_started = models.PositiveIntegerField(default=0)
+    voters_completed = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.election.title}: {self.voters_started} started, {self.voters_completed} completed"
+
+class ResultsSnapshot(models.Model):
+    """
+    The final results of a closed election, encoded once when it closes and
+    served as stored from then on. Snapshots are never updated; one that
+    must change is deleted and frozen again.
+    """
+    election = models.OneToOneField(Election, on_delete=models.CASCADE, primary_key=True, related_name='results_snapshot')
+    # JSON of the election results payload: id, title and positions
+    results = models.TextField()
+    # JSON of the turnout totals: eligible_voters, voters and votes
+    turnout = models.TextField()
+    # SHA-256 of results and turnout
+    checksum = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Results snapshots cannot be changed')
+        super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return f"Final results of {self.election.title}"
+
 class AuditLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='audit_logs')
     action = models.CharField(max_length=200)
     details = models.JSONField(default=dict)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the entry is recorded, not when a buffered batch is inserted
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     
     class Meta:
-        ordering = ['-timestamp']
+        # Entries of one batch can share a timestamp; the id breaks the tie
+        ordering = ['-timestamp', '-id']
+        # Every audit log filter is paired with the newest-first ordering,
+        # so each index ends in (timestamp, id) and serves a keyset page directly
+        indexes = [
+            models.Index(fields=['-timestamp', '-id']),
+            models.Index(fields=['user', '-timestamp', '-id']),
+            models.Index(fields=['action', '-timestamp', '-id']),
+            models.Index(fields=['ip_address', '-timestamp', '-id']),
+            models.Index(
+                KeyTextTransform('election_id', 'details'), models.F('timestamp').desc(), models.F('id').desc(),
+                name='auditlog_election_ts_id_idx'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.action} by {self.user.username if self.user else 'System'} at {self.timestamp}" 
+
+class AuditLogArchive(models.Model):
+    """
+    A month of audit log entries moved out of AuditLog into a gzip-compressed
+    NDJSON file, by the archive_audit_logs command.
+    """
+    period_start = models.DateTimeField(unique=True)
+    period_end = models.DateTimeField()
+    # Relative to the audit archive directory
+    path = models.CharField(max_length=255)
+    row_count = models.PositiveIntegerField()
+    # SHA-256 of the compressed file
+    checksum = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-period_start']
     
     def __str__(self):
-        return f"{self.action} by {self.user.username if self.user else 'System'} at {self.timestamp}" 
\ No newline at end of file
+        return f"Audit log archive {self.period_start:%Y-%m} ({self.row_count} entries)"
@@ -0,0 +1,56 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class PublicElectionsPagination(CursorPagination):
+    """
+    Cursor pagination for the public elections list, newest elections first.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-start_datetime', '-id')
+
+
+class SettingsPageSizeMixin:
+    """
+    Default the page size to the API_PAGE_SIZE setting, read per request so
+    a changed or overridden setting takes effect without a restart.
+    """
+    page_size = None
+
+    def get_page_size(self, request):
+        return super().get_page_size(request) or getattr(settings, 'API_PAGE_SIZE', 50)
+
+
+class KeysetPagination(SettingsPageSizeMixin, CursorPagination):
+    """
+    Opt-in cursor pagination for the user, vote and election lists.
+
+    Requests without a 'cursor' or 'page_size' parameter still get the whole
+    list. Paginated requests page on the primary key, newest first, so a
+    deep page costs the same index range scan as the first one. The default
+    page size is the API_PAGE_SIZE setting.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = '-id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (self.cursor_query_param not in request.query_params
+                and self.page_size_query_param not in request.query_params):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class AuditLogPagination(SettingsPageSizeMixin, CursorPagination):
+    """
+    Cursor pagination for the audit log, newest entries first.
+
+    Pages follow the (timestamp, id) indexes, so a page of a filtered
+    search is an index range scan however far back it is, and entries
+    sharing a timestamp are neither skipped nor repeated across pages.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-timestamp', '-id')
@@ -1,5 +1,5 @@
 from rest_framework import permissions
-from .models import EligibleVoter
+from .eligibility import is_eligible
 
 class IsAdminOrReadOnly(permissions.BasePermission):
     """
@@ -14,6 +14,13 @@ class IsAdminOrReadOnly(permissions.BasePermission):
         # Write permissions are only allowed to admin users
         return request.user and request.user.role == 'admin'
 
+class IsAdminRole(permissions.BasePermission):
+    """
+    Only allow admin users, whatever the request method.
+    """
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and request.user.role == 'admin')
+
 class IsEligibleVoter(permissions.BasePermission):
     """
     Custom permission to only allow eligible voters to vote.
@@ -30,14 +37,10 @@ class IsEligibleVoter(permissions.BasePermission):
                 return False
 
             try:
-                # Check if user is eligible for this election
+                # Check if user is eligible for this election, using the in-memory index
                 # Note: We don't check has_voted here because users can vote for multiple positions
-                EligibleVoter.objects.get(
-                    election_id=election_id,
-                    student=request.user
-                )
-                return True
-            except EligibleVoter.DoesNotExist:
+                return is_eligible(request.user, int(election_id))
+            except (TypeError, ValueError):
                 return False
 
         # Allow GET requests for viewing votes
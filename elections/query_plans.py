@@ -0,0 +1,91 @@
+import re
+from typing import Callable, Dict, List
+
+from django.db import connection, transaction
+
+from .audit import filter_audit_logs
+from .models import (
+    AuditLog, Election, EligibleVoter, Position, TurnoutTally, Vote, VoterProgress, VoteTally
+)
+
+# Ids used to build the queries; plans do not depend on whether they exist
+SAMPLE_ID = 1
+
+# Audit log searches are read newest first, as AuditLogPagination pages them
+AUDIT_LOG_PAGE = AuditLog.objects.order_by('-timestamp', '-id')
+
+# The queries run on every vote, results read or list request. Each must be
+# answered from an index, never by reading a whole table.
+HOT_QUERIES: Dict[str, Callable] = {
+    'eligible voter lookup': lambda: EligibleVoter.objects.filter(
+        student_id=SAMPLE_ID, election_id=SAMPLE_ID
+    ),
+    "student's elections": lambda: Election.objects.filter(
+        id__in=EligibleVoter.objects.filter(student_id=SAMPLE_ID).values('election_id')
+    ),
+    "student's votes in an election": lambda: Vote.objects.filter(
+        student_id=SAMPLE_ID, election_id=SAMPLE_ID
+    ),
+    "candidate's votes": lambda: Vote.objects.filter(candidate_id=SAMPLE_ID),
+    'public elections page': lambda: Election.objects.filter(
+        status__in=[Election.ACTIVE, Election.CLOSED]
+    ).order_by('-start_datetime', '-id')[:11],
+    'scheduled elections': lambda: Election.objects.filter(
+        status__in=[Election.UPCOMING, Election.ACTIVE]
+    ),
+    'ballot positions': lambda: Position.objects.filter(election_id=SAMPLE_ID),
+    'election tallies': lambda: VoteTally.objects.filter(election_id=SAMPLE_ID),
+    'voter progress': lambda: VoterProgress.objects.filter(
+        election_id=SAMPLE_ID, student_id=SAMPLE_ID
+    ),
+    'turnout tally': lambda: TurnoutTally.objects.filter(election_id=SAMPLE_ID),
+    "user's audit log": lambda: filter_audit_logs(AUDIT_LOG_PAGE, {'user': SAMPLE_ID})[:50],
+    'audit log by action': lambda: filter_audit_logs(AUDIT_LOG_PAGE, {'action': 'cast_vote'})[:50],
+    "election's audit log": lambda: filter_audit_logs(AUDIT_LOG_PAGE, {'election': SAMPLE_ID})[:50],
+}
+
+# Plan lines that mean a whole table is read, per database vendor
+_FULL_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\S+)'),
+    # 'SCAN table' reads the table itself; 'SCAN table USING INDEX' walks an index
+    'sqlite': re.compile(r'\bSCAN (?!CONSTANT ROW)(\S+)(?! USING)(?:\s|$)'),
+}
+
+
+def explain(queryset) -> str:
+    """
+    Return the query plan of a queryset.
+
+    On PostgreSQL sequential scans are disabled for the duration of the
+    EXPLAIN: the planner prefers them on small tables even when an index
+    exists, so a Seq Scan that remains means no usable index exists.
+    """
+    if connection.vendor == 'postgresql':
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+    return queryset.explain()
+
+
+def find_full_scans(plan: str) -> List[str]:
+    """
+    Return the plan lines that read a whole table.
+    """
+    pattern = _FULL_SCAN_PATTERNS.get(connection.vendor)
+    if pattern is None:
+        raise NotImplementedError(f'Query plans cannot be checked on {connection.vendor}')
+    return [line.strip() for line in plan.splitlines() if pattern.search(line)]
+
+
+def check_query_plans() -> Dict[str, tuple]:
+    """
+    Explain every hot query.
+
+    Returns a mapping of query name -> (plan, full scan lines).
+    """
+    results = {}
+    for name, build in HOT_QUERIES.items():
+        plan = explain(build())
+        results[name] = (plan, find_full_scans(plan))
+    return results
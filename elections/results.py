@@ -0,0 +1,395 @@
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from rest_framework import status
+
+from .eligibility import get_eligible_count
+from .metrics import RESULTS_CACHE_REQUESTS, RESULTS_COMPUTE_SECONDS
+from .models import Candidate, Election, Position, ResultsSnapshot, TurnoutTally, Vote, VoteTally
+from .utils import bump_cache_version, get_cache_version
+
+logger = logging.getLogger(__name__)
+
+PUBLIC_RESULTS_VERSION_KEY = 'results_version:public'
+
+# Statuses whose results are public
+RESULTS_STATUSES = (Election.ACTIVE, Election.CLOSED, Election.ARCHIVED)
+
+# Statuses whose results can no longer change and are served from a ResultsSnapshot
+FINAL_STATUSES = (Election.CLOSED, Election.ARCHIVED)
+
+
+def _results_version_key(election_id) -> str:
+    return f'results_version:{election_id}'
+
+
+def get_vote_counts(election_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Read the maintained vote tallies of the given elections in one query.
+
+    Returns a mapping of candidate_id -> vote count. Candidates without
+    votes are absent from the mapping.
+    """
+    return dict(
+        VoteTally.objects.filter(election_id__in=list(election_ids))
+        .values_list('candidate_id', 'vote_count')
+    )
+
+
+def count_votes(election_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Count the raw votes of the given elections with a single grouped aggregate.
+
+    This is the source of truth the tallies are verified and rebuilt from;
+    results reads should use get_vote_counts instead.
+    """
+    return dict(
+        Vote.objects.filter(election_id__in=list(election_ids))
+        .values('candidate_id')
+        .annotate(vote_count=Count('id'))
+        .order_by()
+        .values_list('candidate_id', 'vote_count')
+    )
+
+
+def build_positions_results(election_ids: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Build the positions -> candidates -> vote_count tree for several elections.
+
+    Runs a fixed number of queries (positions, candidates and one tally
+    read) regardless of how many elections, positions or candidates are
+    involved.
+
+    Returns a mapping of election_id -> list of position results.
+    """
+    election_ids = list(election_ids)
+    results = {election_id: [] for election_id in election_ids}
+    if not election_ids:
+        return results
+
+    vote_counts = get_vote_counts(election_ids)
+    positions = Position.objects.filter(election_id__in=election_ids).prefetch_related('candidates')
+
+    for position in positions:
+        results[position.election_id].append({
+            'position_id': position.id,
+            'position_title': position.title,
+            'candidates': [
+                {
+                    'candidate_id': candidate.id,
+                    'candidate_name': candidate.name,
+                    'vote_count': vote_counts.get(candidate.id, 0)
+                }
+                for candidate in position.candidates.all()
+            ]
+        })
+
+    return results
+
+
+def build_election_results(election) -> Dict[str, Any]:
+    """
+    Build the full results payload for a single election.
+    """
+    return {
+        'id': election.id,
+        'title': election.title,
+        'positions': build_positions_results([election.id])[election.id]
+    }
+
+
+def compute_election_results(election_id) -> Tuple[int, Union[Dict[str, Any], str]]:
+    """
+    Build the public results of an election as (HTTP status, payload).
+
+    The payload of a closed or archived election is its snapshot's
+    pre-encoded JSON, read with the election in one query.
+    """
+    election = Election.objects.select_related('results_snapshot').filter(id=election_id).first()
+    if election is None:
+        return status.HTTP_404_NOT_FOUND, {'detail': 'Election not found'}
+    if election.status not in RESULTS_STATUSES:
+        return (
+            status.HTTP_400_BAD_REQUEST,
+            {'error': 'Results are only available for active, closed or archived elections'}
+        )
+    snapshot = get_final_snapshot(election)
+    if snapshot is not None:
+        return status.HTTP_200_OK, snapshot.results
+    return status.HTTP_200_OK, build_election_results(election)
+
+
+def build_turnout_summaries(election_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+    """
+    Read turnout totals for several elections from the maintained tallies.
+
+    Eligible voter counts come from the eligibility cache, so only the
+    turnout and vote tallies are queried.
+
+    Returns a mapping of election_id -> {'eligible_voters', 'voters', 'votes'}.
+    """
+    election_ids = list(election_ids)
+    voters = dict(
+        TurnoutTally.objects.filter(election_id__in=election_ids)
+        .values_list('election_id', 'voters_started')
+    )
+    votes = dict(
+        VoteTally.objects.filter(election_id__in=election_ids)
+        .values('election_id').annotate(total=Sum('vote_count')).order_by()
+        .values_list('election_id', 'total')
+    )
+    return {
+        election_id: {
+            'eligible_voters': get_eligible_count(election_id),
+            'voters': voters.get(election_id, 0),
+            'votes': votes.get(election_id) or 0
+        }
+        for election_id in election_ids
+    }
+
+
+def _snapshot_checksum(results: str, turnout: str) -> str:
+    digest = hashlib.sha256(results.encode())
+    digest.update(b'\n')
+    digest.update(turnout.encode())
+    return digest.hexdigest()
+
+
+def _encode(data) -> str:
+    return json.dumps(data, separators=(',', ':'), cls=DjangoJSONEncoder)
+
+
+def freeze_results(election: Election) -> ResultsSnapshot:
+    """
+    Store the final results and turnout of an election as a ResultsSnapshot,
+    or return the snapshot it already has.
+    """
+    results = _encode(build_election_results(election))
+    turnout = _encode(build_turnout_summaries([election.id])[election.id])
+    try:
+        with transaction.atomic():
+            return ResultsSnapshot.objects.create(
+                election=election,
+                results=results,
+                turnout=turnout,
+                checksum=_snapshot_checksum(results, turnout)
+            )
+    except IntegrityError:
+        # Frozen by a concurrent request
+        return ResultsSnapshot.objects.get(election_id=election.id)
+
+
+def refreeze_results(election: Election) -> ResultsSnapshot:
+    """
+    Replace the snapshot of a closed or archived election with one built
+    from its current tallies, e.g. after they were corrected.
+    """
+    with transaction.atomic():
+        ResultsSnapshot.objects.filter(election_id=election.id).delete()
+        return freeze_results(election)
+
+
+def get_final_snapshot(election: Election) -> Optional[ResultsSnapshot]:
+    """
+    Return the snapshot of a closed or archived election, or None for an
+    election whose results may still change, that has no snapshot, or
+    whose snapshot fails its checksum.
+
+    Snapshots are written by the close transition and the freeze_results
+    command only, so serving results never writes. The snapshot is read
+    through election.results_snapshot; select_related it to avoid a query.
+    """
+    if election.status not in FINAL_STATUSES:
+        return None
+    try:
+        snapshot = election.results_snapshot
+    except ResultsSnapshot.DoesNotExist:
+        # Counted live until frozen
+        return None
+    if _snapshot_checksum(snapshot.results, snapshot.turnout) != snapshot.checksum:
+        # Served live until someone runs freeze_results --refreeze
+        logger.error('Results snapshot of election %s does not match its checksum', election.id)
+        return None
+    return snapshot
+
+
+def increment_tally(election_id: int, position_id: int, candidate_id: int, amount: int = 1) -> None:
+    """
+    Add votes to a candidate's tally.
+
+    Must be called inside the transaction that inserts the votes so the
+    tally and the Vote table never disagree.
+    """
+    updated = VoteTally.objects.filter(candidate_id=candidate_id).update(
+        vote_count=F('vote_count') + amount
+    )
+    if updated:
+        return
+
+    # First vote for this candidate: create the row, falling back to an
+    # update if a concurrent vote created it first.
+    with transaction.atomic():
+        tally, created = VoteTally.objects.get_or_create(
+            candidate_id=candidate_id,
+            defaults={
+                'election_id': election_id,
+                'position_id': position_id,
+                'vote_count': amount
+            }
+        )
+    if not created:
+        VoteTally.objects.filter(pk=tally.pk).update(vote_count=F('vote_count') + amount)
+
+
+def increment_tallies(election_id: int, choices: Iterable[tuple]) -> None:
+    """
+    Add one vote to the tally of each (position_id, candidate_id) choice.
+
+    Uses two statements whatever the number of choices: missing tally rows
+    are created first so a single UPDATE can then increment all of them.
+    Each candidate must appear at most once. Like increment_tally, this
+    must run inside the transaction that inserts the votes.
+    """
+    choices = list(choices)
+    VoteTally.objects.bulk_create([
+        VoteTally(
+            election_id=election_id,
+            position_id=position_id,
+            candidate_id=candidate_id,
+            vote_count=0
+        )
+        for position_id, candidate_id in choices
+    ], ignore_conflicts=True)
+    VoteTally.objects.filter(
+        candidate_id__in=[candidate_id for _, candidate_id in choices]
+    ).update(vote_count=F('vote_count') + 1)
+
+
+def find_tally_drift(election_ids: Iterable[int]) -> Dict[int, tuple]:
+    """
+    Compare the tallies of the given elections against the raw votes.
+
+    Returns a mapping of candidate_id -> (tallied, counted) for every
+    candidate whose tally is wrong.
+    """
+    election_ids = list(election_ids)
+    tallied = get_vote_counts(election_ids)
+    counted = count_votes(election_ids)
+
+    drift = {}
+    for candidate_id in set(tallied) | set(counted):
+        expected = counted.get(candidate_id, 0)
+        actual = tallied.get(candidate_id, 0)
+        if expected != actual:
+            drift[candidate_id] = (actual, expected)
+    return drift
+
+
+@transaction.atomic
+def rebuild_tallies(election_ids: Iterable[int]) -> int:
+    """
+    Recompute the tallies of the given elections from the raw votes, and
+    refreeze the results of those that are closed or archived.
+
+    The elections are locked first. Votes check their election under a
+    share lock (see scheduler.lock_active_election), so votes in progress
+    commit before the count and new votes wait for the rebuild.
+
+    Returns the number of tally rows written.
+    """
+    election_ids = list(
+        Election.objects.select_for_update().filter(id__in=list(election_ids))
+        .order_by('id').values_list('id', flat=True)
+    )
+    counts = count_votes(election_ids)
+
+    VoteTally.objects.filter(election_id__in=election_ids).delete()
+    tallies = VoteTally.objects.bulk_create([
+        VoteTally(
+            election_id=candidate.position.election_id,
+            position_id=candidate.position_id,
+            candidate_id=candidate.id,
+            vote_count=counts[candidate.id]
+        )
+        for candidate in Candidate.objects.filter(id__in=counts).select_related('position')
+    ], batch_size=1000)
+
+    # Frozen results were built from the old tallies
+    for election in Election.objects.filter(id__in=election_ids, status__in=FINAL_STATUSES):
+        refreeze_results(election)
+
+    for election_id in election_ids:
+        transaction.on_commit(lambda election_id=election_id: bump_results_version(election_id))
+    return len(tallies)
+
+
+def get_results_version(election_id) -> int:
+    """
+    Return the current results version of an election.
+
+    The version changes whenever a vote is cast or the election's ballot
+    changes, so it can key cached payloads and ETags without touching the
+    database.
+    """
+    return get_cache_version(_results_version_key(election_id))
+
+
+def get_public_results_version() -> int:
+    """
+    Return a version that changes whenever the results of any election change.
+    """
+    return get_cache_version(PUBLIC_RESULTS_VERSION_KEY)
+
+
+def bump_results_version(election_id) -> None:
+    """
+    Invalidate every cached results payload of an election.
+    """
+    for key in (_results_version_key(election_id), PUBLIC_RESULTS_VERSION_KEY):
+        bump_cache_version(key)
+
+
+def _results_sequence_key(election_id) -> str:
+    return f'results_seq:{election_id}'
+
+
+def get_results_sequence(election_id) -> int:
+    """
+    Return the sequence number of the latest live results frame of an election.
+    """
+    return get_cache_version(_results_sequence_key(election_id))
+
+
+def next_results_sequence(election_id) -> int:
+    """
+    Allocate the sequence number of a new live results frame.
+    """
+    return bump_cache_version(_results_sequence_key(election_id))
+
+
+def get_cached_results(cache_key: str, version: int, compute):
+    """
+    Return the payload stored under cache_key for the given results version,
+    calling compute() and storing its result on a miss.
+    """
+    key = f'{cache_key}:{version}'
+    # Metrics are labelled by payload kind, not by election
+    payload = cache_key.split(':', 1)[0]
+    data = cache.get(key)
+    if data is None:
+        RESULTS_CACHE_REQUESTS.labels(payload, 'miss').inc()
+        start = time.perf_counter()
+        data = compute()
+        RESULTS_COMPUTE_SECONDS.labels(payload).observe(time.perf_counter() - start)
+        cache.set(key, data, getattr(settings, 'RESULTS_CACHE_TIMEOUT', 60 * 60))
+    else:
+        RESULTS_CACHE_REQUESTS.labels(payload, 'hit').inc()
+    return data
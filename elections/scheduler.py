@@ -0,0 +1,207 @@
+import heapq
+import logging
+import threading
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .broadcast import broadcast_status_change
+from .models import Election
+from .results import bump_results_version
+from .utils import get_cache_version, log_audit
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever an election is saved or deleted, so a running scheduler
+# reloads its transitions without reading every election on every tick
+SCHEDULE_VERSION_KEY = 'election_schedule_version'
+
+# Sent once an election's transition is committed, with its election_id.
+# Receivers that raise are logged and do not stop the others.
+election_started = Signal()
+election_closed = Signal()
+
+START = 'start'
+CLOSE = 'close'
+
+
+def _announce(election_id: int, status: str, signal: Signal) -> None:
+    # The status gates results reads and appears in results payloads
+    bump_results_version(election_id)
+    try:
+        broadcast_status_change(election_id, status)
+    except Exception:
+        logger.exception('Failed to broadcast the new status of election %s', election_id)
+    for receiver, result in signal.send_robust(sender=Election, election_id=election_id):
+        if isinstance(result, Exception):
+            logger.error('Election %s hook %r failed', election_id, receiver, exc_info=result)
+
+
+def lock_active_election(election_id: int) -> bool:
+    """
+    Check that an election is active, and keep it active until the calling
+    transaction ends. Must be called inside the transaction that casts votes.
+
+    The election row is locked in share mode, so votes do not wait for each
+    other, but a status change waits for every vote holding the lock to
+    commit. A vote waiting on a status change reads the new status once the
+    change commits. Results frozen after an election closes therefore hold
+    every vote it accepted.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT status FROM {Election._meta.db_table} WHERE id = %s FOR SHARE',
+                [election_id]
+            )
+            row = cursor.fetchone()
+    else:
+        # Elsewhere an exclusive lock, where the database supports one
+        row = Election.objects.select_for_update().filter(id=election_id).values_list('status').first()
+    return row is not None and row[0] == Election.ACTIVE
+
+
+def _transition(election: Election, from_status: str, to_status: str, signal: Signal) -> bool:
+    # Compare-and-set, so an admin action and the scheduler racing on the
+    # same election apply the transition, and fire its hooks, only once.
+    # The update waits for votes holding lock_active_election to commit.
+    with transaction.atomic():
+        changed = Election.objects.filter(id=election.id, status=from_status).update(
+            status=to_status, updated_at=timezone.now()
+        )
+        if changed:
+            election.status = to_status
+            election_id = election.id
+            transaction.on_commit(lambda: _announce(election_id, to_status, signal))
+    return bool(changed)
+
+
+def start_election(election: Election, user=None, request=None) -> bool:
+    """
+    Move an upcoming election to active. Returns False if it was not upcoming.
+
+    Without a user the transition is recorded as made by the scheduler.
+    """
+    if not _transition(election, Election.UPCOMING, Election.ACTIVE, election_started):
+        return False
+    log_audit(user, 'start_election', {
+        'message': f'Started election: {election.title}',
+        'election_id': election.id,
+        'scheduled': user is None
+    }, strict=True, request=request)
+    return True
+
+
+def close_election(election: Election, user=None, request=None) -> bool:
+    """
+    Move an active election to closed. Returns False if it was not active.
+
+    Without a user the transition is recorded as made by the scheduler.
+    """
+    if not _transition(election, Election.ACTIVE, Election.CLOSED, election_closed):
+        return False
+    log_audit(user, 'end_election', {
+        'message': f'Ended election: {election.title}',
+        'election_id': election.id,
+        'scheduled': user is None
+    }, strict=True, request=request)
+    return True
+
+
+class ElectionScheduler:
+    """
+    Applies election transitions when they fall due.
+
+    Pending transitions are kept in a min-heap ordered by due time: the
+    start of every upcoming election and the end of every upcoming or
+    active election. The scheduler sleeps until the earliest one, so no
+    election is read until one of its transitions is due. Edits are picked
+    up through SCHEDULE_VERSION_KEY, one cache read per tick.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int, int, str]] = []
+        self._version = None
+
+    @property
+    def interval(self) -> float:
+        # Longest sleep between checks for edited elections
+        return getattr(settings, 'ELECTION_SCHEDULER_INTERVAL', 5)
+
+    def load(self) -> None:
+        """
+        Rebuild the heap from the upcoming and active elections.
+        """
+        self._version = get_cache_version(SCHEDULE_VERSION_KEY)
+        heap = []
+        elections = Election.objects.filter(
+            status__in=[Election.UPCOMING, Election.ACTIVE]
+        ).values_list('id', 'status', 'start_datetime', 'end_datetime')
+        for election_id, status, start, end in elections:
+            # A start and an end falling at the same moment apply in that order
+            if status == Election.UPCOMING:
+                heap.append((start, 0, election_id, START))
+            heap.append((end, 1, election_id, CLOSE))
+        heapq.heapify(heap)
+        self._heap = heap
+
+    def reload_if_changed(self) -> bool:
+        if get_cache_version(SCHEDULE_VERSION_KEY) == self._version:
+            return False
+        self.load()
+        return True
+
+    def next_due(self) -> Optional[datetime]:
+        return self._heap[0][0] if self._heap else None
+
+    def run_due(self, now: Optional[datetime] = None) -> List[Tuple[int, str]]:
+        """
+        Apply every transition due at now. Returns the (election_id, action)
+        pairs applied.
+        """
+        now = now or timezone.now()
+        applied = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, election_id, action = heapq.heappop(self._heap)
+            election = Election.objects.filter(id=election_id).first()
+            # Entries made stale by an edit are skipped; the reload that
+            # follows the edit schedules the new times
+            if election is None:
+                continue
+            if action == START and election.start_datetime <= now:
+                done = start_election(election)
+            elif action == CLOSE and election.end_datetime <= now:
+                done = close_election(election)
+            else:
+                done = False
+            if done:
+                applied.append((election_id, action))
+        return applied
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        """
+        Apply transitions as they fall due until stop is set.
+        """
+        stop = stop or threading.Event()
+        self.load()
+        while not stop.is_set():
+            close_old_connections()
+            timeout = self.interval
+            try:
+                self.reload_if_changed()
+                for election_id, action in self.run_due():
+                    logger.info('Applied %s to election %s', action, election_id)
+            except Exception:
+                logger.exception('Election scheduler tick failed; retrying in %s seconds', timeout)
+                # Transitions popped before the failure are rescheduled by the reload
+                self._version = None
+                connection.close()
+            else:
+                next_due = self.next_due()
+                if next_due is not None:
+                    timeout = min(timeout, max((next_due - timezone.now()).total_seconds(), 0))
+            stop.wait(timeout)
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from typing import List, Dict, Any
 from .models import User, Election, Position, Candidate, EligibleVoter, Vote, AuditLog
+from .eligibility import is_eligible
+from .results import build_positions_results
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -44,33 +46,11 @@ class ElectionResultsSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'positions']
     
     def get_positions(self, obj) -> List[Dict[str, Any]]:
-        positions = Position.objects.filter(election=obj)
-        result = []
-        
-        for position in positions:
-            position_data = {
-                'position_id': position.id,
-                'position_title': position.title,
-                'candidates': []
-            }
-            
-            candidates = Candidate.objects.filter(position=position)
-            for candidate in candidates:
-                vote_count = Vote.objects.filter(
-                    election=obj,
-                    position=position,
-                    candidate=candidate
-                ).count()
-                
-                position_data['candidates'].append({
-                    'candidate_id': candidate.id,
-                    'candidate_name': candidate.name,
-                    'vote_count': vote_count
-                })
-            
-            result.append(position_data)
-        
-        return result
+        # Views listing several elections precompute every tree in one pass
+        positions_by_election = self.context.get('positions_by_election')
+        if positions_by_election is not None:
+            return positions_by_election.get(obj.id, [])
+        return build_positions_results([obj.id])[obj.id]
 
 class EligibleVoterSerializer(serializers.ModelSerializer):
     student = UserSerializer(read_only=True)
@@ -84,9 +64,29 @@ class AuditLogSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = AuditLog
-        fields = ['id', 'user', 'action', 'details', 'timestamp']
+        fields = ['id', 'user', 'action', 'details', 'timestamp', 'ip_address']
 
 # New serializers for better user experience
+def get_user_votes(context, election_id):
+    """
+    Return the requesting user's votes in an election as position_id -> Vote.
+
+    The votes are loaded with one query the first time any nested serializer
+    asks for them and shared through the serializer context afterwards.
+    """
+    user_votes = context.setdefault('user_votes', {})
+    if election_id not in user_votes:
+        request = context.get('request')
+        if not request or not request.user.is_authenticated:
+            user_votes[election_id] = {}
+        else:
+            votes = Vote.objects.filter(
+                election_id=election_id,
+                student=request.user
+            ).select_related('candidate')
+            user_votes[election_id] = {vote.position_id: vote for vote in votes}
+    return user_votes[election_id]
+
 class CandidateWithVoteStatusSerializer(serializers.ModelSerializer):
     has_voted_for = serializers.SerializerMethodField()
     
@@ -95,17 +95,9 @@ class CandidateWithVoteStatusSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'bio', 'photo', 'has_voted_for']
     
     def get_has_voted_for(self, obj):
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return False
-        
         # Check if user has voted for this candidate
-        return Vote.objects.filter(
-            election=obj.position.election,
-            position=obj.position,
-            candidate=obj,
-            student=request.user
-        ).exists()
+        vote = get_user_votes(self.context, obj.position.election_id).get(obj.position_id)
+        return vote is not None and vote.candidate_id == obj.id
 
 class PositionWithVoteStatusSerializer(serializers.ModelSerializer):
     candidates = CandidateWithVoteStatusSerializer(many=True, read_only=True)
@@ -117,28 +109,12 @@ class PositionWithVoteStatusSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'description', 'candidates', 'user_has_voted', 'user_vote']
     
     def get_user_has_voted(self, obj):
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return False
-        
         # Check if user has voted for this position
-        return Vote.objects.filter(
-            election=obj.election,
-            position=obj,
-            student=request.user
-        ).exists()
+        return obj.id in get_user_votes(self.context, obj.election_id)
     
     def get_user_vote(self, obj):
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return None
-        
         # Get the user's vote for this position
-        vote = Vote.objects.filter(
-            election=obj.election,
-            position=obj,
-            student=request.user
-        ).first()
+        vote = get_user_votes(self.context, obj.election_id).get(obj.id)
         
         if vote:
             return {
@@ -161,21 +137,15 @@ class ElectionWithVoteStatusSerializer(serializers.ModelSerializer):
         read_only_fields = ['status', 'created_by']
     
     def get_user_is_eligible(self, obj):
+        # Views that already checked eligibility pass the answer in the context
+        if 'user_is_eligible' in self.context:
+            return self.context['user_is_eligible']
+        
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
         
-        return EligibleVoter.objects.filter(
-            election=obj,
-            student=request.user
-        ).exists()
+        return is_eligible(request.user, obj.id)
     
     def get_user_total_votes(self, obj):
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return 0
-        
-        return Vote.objects.filter(
-            election=obj,
-            student=request.user
-        ).count() 
\ No newline at end of file
+        return len(get_user_votes(self.context, obj.id))
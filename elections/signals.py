@@ -0,0 +1,93 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .eligibility import get_eligibility_index, get_eligible_count, invalidate_eligibility_index
+from .models import Candidate, Election, EligibilityRule, EligibleVoter, Position, ResultsSnapshot
+from .results import (
+    FINAL_STATUSES, bump_results_version, compute_election_results, freeze_results,
+    get_cached_results, get_results_version
+)
+from .scheduler import SCHEDULE_VERSION_KEY, election_closed, election_started
+from .utils import bump_cache_version
+
+
+def _bump_on_commit(election_id):
+    transaction.on_commit(lambda: bump_results_version(election_id))
+
+
+@receiver([post_save, post_delete], sender=Election)
+def election_changed(sender, instance, **kwargs):
+    _bump_on_commit(instance.id)
+    # Its start or end may have moved; the scheduler reloads its transitions
+    transaction.on_commit(lambda: bump_cache_version(SCHEDULE_VERSION_KEY))
+
+
+@receiver(pre_save, sender=Election)
+def remember_election_status(sender, instance, update_fields=None, **kwargs):
+    # Lets post_save receivers tell what the status changed from
+    if instance.pk is None or (update_fields is not None and 'status' not in update_fields):
+        instance._previous_status = None
+    else:
+        instance._previous_status = Election.objects.filter(id=instance.pk).values_list(
+            'status', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=Election)
+def election_reopened(sender, instance, **kwargs):
+    # Results frozen when the election closed would go stale once it reopens
+    previous = getattr(instance, '_previous_status', None)
+    if previous in FINAL_STATUSES and instance.status not in FINAL_STATUSES:
+        ResultsSnapshot.objects.filter(election_id=instance.id).delete()
+
+
+@receiver(post_delete, sender=ResultsSnapshot)
+def results_snapshot_deleted(sender, instance, **kwargs):
+    # Cached payloads still carry the deleted snapshot
+    _bump_on_commit(instance.election_id)
+
+
+@receiver([post_save, post_delete], sender=Position)
+def position_changed(sender, instance, **kwargs):
+    _bump_on_commit(instance.election_id)
+
+
+@receiver([post_save, post_delete], sender=Candidate)
+def candidate_changed(sender, instance, **kwargs):
+    # The position may already be gone when a cascade deletes its candidates,
+    # in which case the position's own signal covers the election
+    position = Position.objects.filter(id=instance.position_id).values('election_id').first()
+    if position:
+        _bump_on_commit(position['election_id'])
+
+
+@receiver([post_save, post_delete], sender=EligibleVoter)
+@receiver([post_save, post_delete], sender=EligibilityRule)
+def eligibility_changed(sender, instance, **kwargs):
+    election_id = instance.election_id
+    transaction.on_commit(lambda: invalidate_eligibility_index(election_id))
+
+
+def _warm_results(election_id):
+    get_cached_results(
+        f'election_results:{election_id}',
+        get_results_version(election_id),
+        lambda: compute_election_results(election_id)
+    )
+
+
+@receiver(election_started)
+def warm_election_caches(sender, election_id, **kwargs):
+    # Build what every voter and viewer needs before the first of them arrives
+    get_eligibility_index(election_id)
+    get_eligible_count(election_id)
+    _warm_results(election_id)
+
+
+@receiver(election_closed)
+def publish_final_results(sender, election_id, **kwargs):
+    # The results no longer change: freeze them, then cache them for the
+    # rush of final reads
+    freeze_results(Election.objects.get(id=election_id))
+    _warm_results(election_id)
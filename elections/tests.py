@@ -0,0 +1,1532 @@
+import asyncio
+import csv
+import json
+import os
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib import admin as django_admin
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, IntegrityError, OperationalError, connection, transaction
+from django.db.models import Count
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .admin import ElectionAdmin
+from .archive import month_start, restore_archive, search_archives
+from .audit import AuditLogWriter, parse_audit_filters
+from .benchmark import remove_seeded_election, seed_election
+from .broadcast import ResultsBroadcaster
+from .consumers import snapshot_frames
+from .exports import RESULT_FIELDS, VOTE_FIELDS, astream_export, stream_export
+from .eligibility import eligible_election_ids, get_eligibility_index, invalidate_eligibility_index, is_eligible
+from .importers import import_students
+from .middleware import RequestProfilingMiddleware, request_profiles
+from .routing import websocket_urlpatterns
+from .query_plans import check_query_plans, explain, find_full_scans
+from .models import (
+    AuditLog, AuditLogArchive, Candidate, Election, EligibilityRule, EligibleVoter, Position, ResultsSnapshot,
+    TurnoutTally, User, Vote, VoterProgress, VoteTally
+)
+from .results import (
+    build_election_results, build_positions_results, count_votes, freeze_results, get_vote_counts, increment_tally
+)
+from .scheduler import CLOSE, START, ElectionScheduler, close_election, lock_active_election, start_election
+from .turnout import build_turnout, rebuild_turnout
+
+# Run against an in-process cache and channel layer instead of Redis, and
+# write audit entries inline so no background thread touches the database
+TEST_SETTINGS = {
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    'CHANNEL_LAYERS': {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    'AUDIT_LOG': {'BUFFERED': False},
+}
+
+
+def create_election(positions=2, candidates=2, status=Election.ACTIVE):
+    """
+    Create an election with the given number of positions, each with the
+    given number of candidates. Returns (election, [(position, [candidates])]).
+    """
+    admin, _ = User.objects.get_or_create(
+        username='admin', defaults={'role': User.ADMIN, 'is_staff': True}
+    )
+    now = timezone.now()
+    election = Election.objects.create(
+        title='Student Council', description='Annual election', status=status,
+        start_datetime=now, end_datetime=now + timezone.timedelta(days=1), created_by=admin
+    )
+    ballot = []
+    for position_number in range(positions):
+        position = Position.objects.create(election=election, title=f'Position {position_number}')
+        ballot.append((position, [
+            Candidate.objects.create(position=position, name=f'Candidate {position_number}-{number}')
+            for number in range(candidates)
+        ]))
+    return election, ballot
+
+
+def create_voter(election, username='voter'):
+    """
+    Create a student listed as an eligible voter of election.
+    """
+    student = User.objects.create(username=username, student_id=username.upper())
+    # Run the index invalidation a commit would trigger, also inside a TestCase
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        EligibleVoter.objects.create(election=election, student=student)
+    return student
+
+
+def cast_ballot(election, student, choices):
+    """
+    Vote through the ballot endpoint for each (position, candidate) choice.
+    """
+    client = APIClient()
+    client.force_authenticate(student)
+    return client.post('/api/api/votes/ballot/', {
+        'election': election.id,
+        'votes': [{'position': position.id, 'candidate': candidate.id} for position, candidate in choices]
+    }, format='json')
+
+
+@override_settings(**TEST_SETTINGS)
+class ResultsQueryCountTests(TestCase):
+    """
+    Results are built with a fixed number of queries, however many
+    candidates stand.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def create_election_with_votes(self, candidates):
+        election, ballot = create_election(positions=2, candidates=candidates)
+        VoteTally.objects.bulk_create([
+            VoteTally(election=election, position=position, candidate=candidate, vote_count=number)
+            for position, position_candidates in ballot
+            for number, candidate in enumerate(position_candidates)
+        ])
+        return election
+
+    def test_build_positions_results_query_count(self):
+        for candidates in (2, 20):
+            with self.subTest(candidates=candidates):
+                election = self.create_election_with_votes(candidates)
+                # Tallies, positions and prefetched candidates
+                with self.assertNumQueries(3):
+                    results = build_positions_results([election.id])[election.id]
+                self.assertEqual([len(position['candidates']) for position in results], [candidates] * 2)
+                self.assertEqual(
+                    {
+                        candidate['candidate_id']: candidate['vote_count']
+                        for position in results for candidate in position['candidates']
+                    },
+                    dict(VoteTally.objects.filter(election=election).values_list('candidate_id', 'vote_count'))
+                )
+
+    def test_results_view_query_count(self):
+        client = APIClient()
+        for candidates in (2, 20):
+            with self.subTest(candidates=candidates):
+                election = self.create_election_with_votes(candidates)
+                # The election, then the same three queries as above
+                with self.assertNumQueries(4):
+                    response = client.get(f'/elections/{election.id}/results/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    [len(position['candidates']) for position in response.json()['positions']],
+                    [candidates] * 2
+                )
+                # Then served from the cache
+                with self.assertNumQueries(0):
+                    self.assertEqual(client.get(f'/elections/{election.id}/results/').status_code, 200)
+
+
+@override_settings(**TEST_SETTINGS)
+class VoteStatusQueryCountTests(TestCase):
+    """
+    An election with the user's vote status is served with a fixed number
+    of queries, however many positions and candidates it has.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_vote_status_view_query_count(self):
+        for positions, candidates in ((1, 2), (5, 10)):
+            with self.subTest(positions=positions, candidates=candidates):
+                election, ballot = create_election(positions=positions, candidates=candidates)
+                voter = create_voter(election, f'voter{positions}')
+                position, position_candidates = ballot[0]
+                self.assertEqual(cast_ballot(election, voter, [(position, position_candidates[0])]).status_code, 201)
+
+                client = APIClient()
+                client.force_authenticate(voter)
+                path = f'/elections/{election.id}/with-vote-status/'
+                # The election with its creator, positions, prefetched
+                # candidates and the user's votes with their candidates,
+                # after loading the eligibility index and rules once
+                invalidate_eligibility_index(election.id)
+                with self.assertNumQueries(6):
+                    self.assertEqual(client.get(path).status_code, 200)
+                with self.assertNumQueries(4):
+                    response = client.get(path)
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                self.assertEqual(len(data['positions']), positions)
+                self.assertEqual(data['positions'][0]['user_vote']['candidate_id'], position_candidates[0].id)
+                self.assertEqual(
+                    [candidate['has_voted_for'] for candidate in data['positions'][0]['candidates']],
+                    [candidate == position_candidates[0] for candidate in position_candidates]
+                )
+                self.assertFalse(any(position['user_has_voted'] for position in data['positions'][1:]))
+
+
+@override_settings(**TEST_SETTINGS)
+class RequestProfilingTests(TestCase):
+    """
+    Request profiling is off unless enabled, and then records each view's
+    query count over a rolling window of requests.
+    """
+    profiling = {'ENABLED': True, 'WINDOW': 3, 'QUERY_BUDGET': 50, 'LATENCY_BUDGET_MS': 60000}
+
+    def setUp(self):
+        cache.clear()
+        request_profiles.reset()
+        self.addCleanup(request_profiles.reset)
+
+    def profile(self, view_name):
+        return next(view for view in request_profiles.snapshot() if view['view'] == view_name)
+
+    def test_disabled_by_default(self):
+        with override_settings(REQUEST_PROFILING={}):
+            with self.assertRaises(MiddlewareNotUsed):
+                RequestProfilingMiddleware(lambda request: None)
+            election, _ = create_election(positions=1)
+            self.assertEqual(APIClient().get(f'/elections/{election.id}/results/').status_code, 200)
+        self.assertEqual(request_profiles.snapshot(), [])
+
+    def test_records_the_query_count_of_each_request(self):
+        election, _ = create_election(positions=1)
+        with override_settings(REQUEST_PROFILING=self.profiling):
+            client = APIClient()
+            # Built from the database, then served from the cache
+            with self.assertNumQueries(4):
+                self.assertEqual(client.get(f'/elections/{election.id}/results/').status_code, 200)
+            self.assertEqual(client.get(f'/elections/{election.id}/results/').status_code, 200)
+
+        profile = self.profile('election-results')
+        self.assertEqual(profile['requests'], 2)
+        self.assertEqual(profile['queries']['max'], 4)
+        self.assertEqual(profile['queries']['p50'], 4)
+        self.assertEqual(profile['queries']['mean'], 2)
+        self.assertGreater(profile['response_bytes']['max'], 0)
+
+    def test_percentiles_cover_the_window_and_means_every_request(self):
+        with override_settings(REQUEST_PROFILING=self.profiling):
+            for queries in (100, 1, 2, 3):
+                request_profiles.record('view', {'queries': queries, 'sql_ms': 0, 'wall_ms': 0, 'response_bytes': 0})
+        profile = self.profile('view')
+        self.assertEqual((profile['requests'], profile['window']), (4, 3))
+        self.assertEqual(profile['queries']['max'], 3)
+        self.assertEqual(profile['queries']['p50'], 2)
+        self.assertEqual(profile['queries']['mean'], 26.5)
+
+    def test_requests_over_budget_are_logged(self):
+        election, _ = create_election(positions=1)
+        with override_settings(REQUEST_PROFILING={**self.profiling, 'QUERY_BUDGET': 1}):
+            with self.assertLogs('elections.middleware', 'WARNING') as logs:
+                APIClient().get(f'/elections/{election.id}/results/')
+        self.assertIn('ran 4 queries', logs.output[0])
+
+
+class MetricsEndpointTests(SimpleTestCase):
+    """
+    The Prometheus endpoint is open unless METRICS_TOKEN is set, and then
+    requires that token as a bearer token.
+    """
+
+    @override_settings(METRICS_TOKEN='')
+    def test_open_without_a_token(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'election_votes_cast_total', response.content)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_token_is_required_when_set(self):
+        for authorization in (None, 'Bearer wrong', 'scrape-secret', 'Bearer scrape-secret-2'):
+            with self.subTest(authorization=authorization):
+                headers = {'Authorization': authorization} if authorization else {}
+                response = self.client.get('/metrics', headers=headers)
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response.content, b'')
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'election_votes_cast_total', response.content)
+
+
+@override_settings(**TEST_SETTINGS)
+class ResultsETagTests(TestCase):
+    """
+    Only successful responses carry an ETag, so a conditional request never
+    turns an error into a 304.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_results_of_active_election_are_tagged(self):
+        election, _ = create_election()
+        response = self.client.get(f'/elections/{election.id}/results/')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(f'/elections/{election.id}/results/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_errors_are_not_tagged(self):
+        election, _ = create_election(status=Election.UPCOMING)
+        self.client.force_authenticate(election.created_by)
+        for path, status_code in (
+            (f'/elections/{election.id}/results/', 400),
+            (f'/elections/{election.id + 1}/results/', 404),
+            (f'/elections/{election.id + 1}/turnout/', 404),
+            ('/elections/?view=compact', 400),
+        ):
+            with self.subTest(path=path):
+                response = self.client.get(path, HTTP_IF_NONE_MATCH='*')
+                self.assertEqual(response.status_code, status_code)
+                self.assertFalse(response.has_header('ETag'))
+
+
+@override_settings(**TEST_SETTINGS)
+class PublicElectionsCacheTests(TestCase):
+    """
+    The public elections list is cached per normalized page, so query
+    parameters the view ignores cannot add cache entries.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        for _ in range(3):
+            create_election(positions=1)
+
+    def test_ignored_parameters_share_the_cached_page(self):
+        first = self.client.get('/elections/?page_size=2')
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn('x=', first.json()['next'])
+        for path in ('/elections/?page_size=2&x=1', '/elections/?x=2&page_size=2'):
+            with self.subTest(path=path):
+                with self.assertNumQueries(0):
+                    response = self.client.get(path)
+                self.assertEqual(response.json(), first.json())
+
+    def test_page_size_is_clamped_before_caching(self):
+        self.assertEqual(self.client.get('/elections/?page_size=100').status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/elections/?page_size=5000').status_code, 200)
+
+    def test_next_page_link(self):
+        first = self.client.get('/elections/?page_size=2&view=summary&x=1').json()
+        self.assertNotIn('x=1', first['next'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(first['results']) + len(second['results']), 3)
+        self.assertIn('turnout', second['results'][0])
+
+    def test_summary_follows_voter_list_changes(self):
+        election = Election.objects.latest('id')
+        first = self.client.get('/elections/?view=summary')
+        self.assertEqual(first.json()['results'][0]['turnout']['eligible_voters'], 0)
+
+        create_voter(election)
+        second = self.client.get('/elections/?view=summary', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second.json()['results'][0]['turnout']['eligible_voters'], 1)
+
+
+@override_settings(**TEST_SETTINGS)
+class KeysetPaginationTests(TestCase):
+    """
+    The user, vote and election lists page by keyset only when asked to,
+    and the audit log always pages, by default by API_PAGE_SIZE.
+    """
+
+    def setUp(self):
+        cache.clear()
+        for _ in range(5):
+            create_election(positions=1)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(username='admin'))
+
+    def test_full_list_without_cursor_or_page_size(self):
+        with override_settings(API_PAGE_SIZE=2):
+            response = self.client.get('/api/api/elections/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 5)
+
+    def test_keyset_pages_do_not_overlap(self):
+        ids = []
+        url = '/api/api/elections/?page_size=2'
+        while url:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page['results']), 2)
+            ids.extend(election['id'] for election in page['results'])
+            url = page['next']
+        self.assertEqual(ids, list(Election.objects.order_by('-id').values_list('id', flat=True)))
+
+    def test_default_page_size_follows_the_setting(self):
+        AuditLog.objects.bulk_create([AuditLog(action='test', details={'number': number}) for number in range(5)])
+        for page_size in (2, 3):
+            with self.subTest(page_size=page_size), override_settings(API_PAGE_SIZE=page_size):
+                self.assertEqual(len(self.client.get('/api/api/audit-logs/').json()['results']), page_size)
+                # An invalid page_size falls back to the setting too
+                self.assertEqual(len(self.client.get('/api/api/elections/?page_size=x').json()['results']), page_size)
+
+
+@override_settings(**TEST_SETTINGS)
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class ConcurrentVoteTests(TransactionTestCase):
+    """
+    Identical votes and ballots submitted at the same time are counted once.
+
+    A TransactionTestCase, so each request thread commits through its own
+    database connection as it would in production.
+    """
+    submissions = 8
+
+    def setUp(self):
+        cache.clear()
+
+    def submit_in_parallel(self, student, path, body):
+        statuses = []
+        barrier = threading.Barrier(self.submissions)
+
+        def submit():
+            client = APIClient()
+            client.force_authenticate(student)
+            try:
+                barrier.wait()
+                statuses.append(client.post(path, body, format='json').status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit) for _ in range(self.submissions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(statuses)
+
+    def test_identical_votes_submitted_in_parallel(self):
+        election, ballot = create_election(positions=2, candidates=2)
+        student = User.objects.create(username='voter', student_id='S0001')
+        EligibleVoter.objects.create(election=election, student=student)
+        position, candidates = ballot[0]
+        body = {'election': election.id, 'position': position.id, 'candidate': candidates[0].id}
+
+        statuses = self.submit_in_parallel(student, '/api/api/votes/', body)
+
+        self.assertEqual(statuses, [201] + [409] * (self.submissions - 1))
+        self.assertEqual(Vote.objects.filter(election=election).count(), 1)
+        self.assertEqual(
+            dict(VoteTally.objects.filter(election=election).values_list('candidate_id', 'vote_count')),
+            {candidates[0].id: 1}
+        )
+        self.assertEqual(VoterProgress.objects.get(election=election, student=student).positions_voted, 1)
+        turnout = TurnoutTally.objects.get(election=election)
+        self.assertEqual((turnout.voters_started, turnout.voters_completed), (1, 0))
+
+    def test_identical_ballots_submitted_in_parallel(self):
+        election, ballot = create_election(positions=3, candidates=2)
+        student = User.objects.create(username='voter', student_id='S0001')
+        EligibleVoter.objects.create(election=election, student=student)
+        body = {
+            'election': election.id,
+            'votes': [{'position': position.id, 'candidate': candidates[0].id} for position, candidates in ballot]
+        }
+
+        statuses = self.submit_in_parallel(student, '/api/api/votes/ballot/', body)
+
+        self.assertEqual(statuses, [201] + [409] * (self.submissions - 1))
+        self.assertEqual(Vote.objects.filter(election=election).count(), len(ballot))
+        self.assertEqual(
+            dict(VoteTally.objects.filter(election=election).values_list('candidate_id', 'vote_count')),
+            {candidates[0].id: 1 for _, candidates in ballot}
+        )
+        self.assertEqual(VoterProgress.objects.get(election=election, student=student).positions_voted, len(ballot))
+        turnout = TurnoutTally.objects.get(election=election)
+        self.assertEqual((turnout.voters_started, turnout.voters_completed), (1, 1))
+        self.assertTrue(EligibleVoter.objects.get(election=election, student=student).has_voted)
+
+
+@override_settings(**TEST_SETTINGS)
+class EligibilityIndexTests(TestCase):
+    """
+    The packed eligibility index is served from memory until the voter
+    list of its election changes.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.election, _ = create_election(positions=1)
+        self.student = User.objects.create(username='voter', student_id='S0001')
+
+    def test_index_is_cached(self):
+        self.assertEqual(list(get_eligibility_index(self.election.id)), [])
+        with self.assertNumQueries(0):
+            self.assertFalse(is_eligible(self.student, self.election.id))
+
+    def test_adding_and_deleting_a_voter_invalidate_the_index(self):
+        self.assertFalse(is_eligible(self.student, self.election.id))
+        with self.captureOnCommitCallbacks(execute=True):
+            voter = EligibleVoter.objects.create(election=self.election, student=self.student)
+        self.assertEqual(list(get_eligibility_index(self.election.id)), [self.student.id])
+        self.assertTrue(is_eligible(self.student, self.election.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            voter.delete()
+        self.assertEqual(list(get_eligibility_index(self.election.id)), [])
+        self.assertFalse(is_eligible(self.student, self.election.id))
+
+    def test_bulk_import_invalidates_the_index(self):
+        self.assertEqual(list(get_eligibility_index(self.election.id)), [])
+        import_students(
+            [
+                {'student_id': 'S0001', 'username': 'voter', 'email': ''},
+                {'student_id': 'S0002', 'username': 'voter2', 'email': ''},
+            ],
+            election_id=self.election.id
+        )
+        self.assertEqual(
+            list(get_eligibility_index(self.election.id)),
+            sorted(User.objects.filter(student_id__in=['S0001', 'S0002']).values_list('id', flat=True))
+        )
+        self.assertTrue(is_eligible(self.student, self.election.id))
+
+
+@override_settings(**TEST_SETTINGS)
+class TurnoutTests(TestCase):
+    """
+    The maintained turnout tallies agree with the raw votes, whichever way
+    the votes were cast, and a rebuild restores them.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.election, self.ballot = create_election(positions=3, candidates=2)
+        self.voters = [create_voter(self.election, f'voter{number}') for number in range(3)]
+
+    def vote(self, student, position, candidate):
+        client = APIClient()
+        client.force_authenticate(student)
+        return client.post('/api/api/votes/', {
+            'election': self.election.id, 'position': position.id, 'candidate': candidate.id
+        }, format='json')
+
+    def expected_turnout(self):
+        votes = Vote.objects.filter(election=self.election)
+        positions_voted = dict(
+            votes.values('student_id').annotate(total=Count('id')).order_by().values_list('student_id', 'total')
+        )
+        return {
+            'election_id': self.election.id,
+            'eligible_voters': len(self.voters),
+            'voters_started': len(positions_voted),
+            'voters_completed': sum(total == len(self.ballot) for total in positions_voted.values()),
+            'positions': [
+                {
+                    'position_id': position.id,
+                    'position_title': position.title,
+                    'voters': votes.filter(position=position).count()
+                }
+                for position, _ in self.ballot
+            ]
+        }
+
+    def test_single_votes(self):
+        first, second = self.ballot[0], self.ballot[1]
+        for voter in self.voters[:2]:
+            self.assertEqual(self.vote(voter, first[0], first[1][0]).status_code, 201)
+            self.assertEqual(build_turnout(self.election.id), self.expected_turnout())
+        self.assertEqual(self.vote(self.voters[0], second[0], second[1][1]).status_code, 201)
+        self.assertEqual(build_turnout(self.election.id), self.expected_turnout())
+        self.assertEqual(build_turnout(self.election.id)['voters_completed'], 0)
+
+    def test_ballots_and_votes_completing_a_ballot(self):
+        choices = [(position, candidates[0]) for position, candidates in self.ballot]
+        self.assertEqual(cast_ballot(self.election, self.voters[0], choices).status_code, 201)
+        self.assertEqual(build_turnout(self.election.id), self.expected_turnout())
+
+        # Part of a ballot, then the last position on its own
+        self.assertEqual(cast_ballot(self.election, self.voters[1], choices[:2]).status_code, 201)
+        self.assertEqual(build_turnout(self.election.id), self.expected_turnout())
+        self.assertEqual(self.vote(self.voters[1], *choices[2]).status_code, 201)
+        turnout = build_turnout(self.election.id)
+        self.assertEqual(turnout, self.expected_turnout())
+        self.assertEqual((turnout['voters_started'], turnout['voters_completed']), (2, 2))
+
+    def test_rebuild(self):
+        choices = [(position, candidates[1]) for position, candidates in self.ballot]
+        cast_ballot(self.election, self.voters[0], choices)
+        cast_ballot(self.election, self.voters[1], choices[:1])
+        TurnoutTally.objects.filter(election=self.election).update(voters_started=0, voters_completed=7)
+        VoterProgress.objects.filter(election=self.election).delete()
+
+        rebuild_turnout([self.election.id])
+
+        self.assertEqual(build_turnout(self.election.id), self.expected_turnout())
+        self.assertEqual(
+            dict(VoterProgress.objects.filter(election=self.election).values_list('student_id', 'positions_voted')),
+            {self.voters[0].id: 3, self.voters[1].id: 1}
+        )
+        self.assertEqual(
+            set(EligibleVoter.objects.filter(election=self.election, has_voted=True).values_list('student_id', flat=True)),
+            {self.voters[0].id, self.voters[1].id}
+        )
+
+
+@override_settings(**TEST_SETTINGS)
+class ElectionExportTests(TestCase):
+    """
+    Finished elections stream their votes and results as CSV or NDJSON,
+    under WSGI and ASGI alike.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.election, self.ballot = create_election(positions=2, candidates=2)
+        for number in range(3):
+            voter = create_voter(self.election, f'voter{number}')
+            cast_ballot(self.election, voter, [(position, candidates[number % 2]) for position, candidates in self.ballot])
+        self.admin = User.objects.get(username='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def close(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            close_election(self.election)
+
+    def export(self, **params):
+        return self.client.get(f'/elections/{self.election.id}/export/', params)
+
+    def content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_votes_as_csv(self):
+        self.close()
+        response = self.export(dataset='votes', file_format='csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn(f'election-{self.election.id}-votes.csv', response['Content-Disposition'])
+        rows = list(csv.reader(StringIO(self.content(response))))
+        self.assertEqual(tuple(rows[0]), VOTE_FIELDS)
+        self.assertEqual(
+            [int(row[0]) for row in rows[1:]],
+            list(Vote.objects.filter(election=self.election).order_by('id').values_list('id', flat=True))
+        )
+        # Ballots stay anonymous
+        self.assertNotIn('voter0', self.content(self.export()))
+
+    def test_results_as_ndjson(self):
+        self.close()
+        response = self.export(dataset='results', file_format='ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual(set(rows[0]), set(RESULT_FIELDS))
+        self.assertEqual(
+            {row['candidate_id']: row['vote_count'] for row in rows},
+            {candidate.id: 2 - number for _, candidates in self.ballot for number, candidate in enumerate(candidates)}
+        )
+
+    def test_rejects_unfinished_elections_and_unknown_formats(self):
+        response = self.export()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Only closed elections can be exported'})
+        self.close()
+        self.assertEqual(self.export(file_format='xml').status_code, 400)
+        self.assertEqual(self.export(dataset='voters').status_code, 400)
+
+    async def test_streams_asynchronously_under_asgi(self):
+        await sync_to_async(self.close)()
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.admin).access_token))()
+        response = await AsyncClient().get(
+            f'/elections/{self.election.id}/export/',
+            {'dataset': 'votes', 'file_format': 'ndjson'},
+            headers={'Authorization': f'Bearer {token}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        expected = await sync_to_async(lambda: ''.join(stream_export(self.election.id, 'votes', 'ndjson')))()
+        self.assertEqual(content, expected)
+        self.assertEqual(len(content.splitlines()), 6)
+
+    async def test_async_export_is_read_in_chunks(self):
+        await sync_to_async(self.close)()
+        chunks = [chunk async for chunk in astream_export(self.election.id, 'votes', 'csv', lines_per_chunk=2)]
+        self.assertEqual([len(chunk.splitlines()) for chunk in chunks], [2, 2, 2, 1])
+        expected = await sync_to_async(lambda: ''.join(stream_export(self.election.id, 'votes', 'csv')))()
+        self.assertEqual(''.join(chunks), expected)
+
+
+@override_settings(**TEST_SETTINGS)
+class EligibilityRuleTests(TestCase):
+    """
+    Rules make every matching user eligible without EligibleVoter rows.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.election, self.ballot = create_election(positions=1)
+        self.student = User.objects.create(username='voter', student_id='CS2024-017')
+
+    def add_rule(self, election, rule_type, value, value_end=''):
+        with self.captureOnCommitCallbacks(execute=True):
+            return EligibilityRule.objects.create(
+                election=election, rule_type=rule_type, value=value, value_end=value_end
+            )
+
+    def test_rule_matching(self):
+        admin = User.objects.get(username='admin')
+        cases = [
+            (EligibilityRule.ROLE, 'student', '', True, False),
+            (EligibilityRule.ROLE, 'admin', '', False, True),
+            (EligibilityRule.STUDENT_ID_PREFIX, 'CS2024', '', True, False),
+            (EligibilityRule.STUDENT_ID_PREFIX, 'EE', '', False, False),
+            (EligibilityRule.STUDENT_ID_RANGE, 'CS2024-000', 'CS2024-099', True, False),
+            (EligibilityRule.STUDENT_ID_RANGE, 'CS2024-100', 'CS2024-199', False, False),
+        ]
+        for rule_type, value, value_end, student_matches, admin_matches in cases:
+            with self.subTest(rule_type=rule_type, value=value):
+                rule = EligibilityRule(rule_type=rule_type, value=value, value_end=value_end)
+                self.assertEqual(rule.matches(self.student), student_matches)
+                self.assertEqual(rule.matches(admin), admin_matches)
+                self.assertEqual(User.objects.filter(rule.user_filter(), id=self.student.id).exists(), student_matches)
+
+    def test_matches_are_cached_until_a_rule_changes(self):
+        other, _ = create_election(positions=1)
+        self.add_rule(self.election, EligibilityRule.STUDENT_ID_PREFIX, 'CS')
+        self.assertEqual(eligible_election_ids(self.student), {self.election.id})
+        with self.assertNumQueries(0):
+            self.assertEqual(eligible_election_ids(self.student), {self.election.id})
+
+        self.add_rule(other, EligibilityRule.STUDENT_ID_RANGE, 'CS2024-000', 'CS2024-099')
+        self.assertEqual(eligible_election_ids(self.student), {self.election.id, other.id})
+
+    def test_rule_eligible_student_can_list_and_vote(self):
+        client = APIClient()
+        client.force_authenticate(self.student)
+        self.assertEqual(client.get('/api/api/elections/').json(), [])
+
+        self.add_rule(self.election, EligibilityRule.STUDENT_ID_PREFIX, 'CS2024')
+        listed = client.get('/api/api/elections/').json()
+        self.assertEqual([election['id'] for election in listed], [self.election.id])
+
+        position, candidates = self.ballot[0]
+        self.assertEqual(cast_ballot(self.election, self.student, [(position, candidates[0])]).status_code, 201)
+        self.assertEqual(Vote.objects.get(student=self.student).candidate, candidates[0])
+
+
+@override_settings(**TEST_SETTINGS)
+class StudentImportTests(TestCase):
+    """
+    Roster imports create new students, update only those whose details
+    changed and skip rows they cannot save.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.election, _ = create_election(positions=1)
+
+    def import_csv(self, text, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'roster.csv')
+            with open(path, 'w', encoding='utf-8') as stream:
+                stream.write(text)
+            out, err = StringIO(), StringIO()
+            call_command('import_students', path, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_created_updated_unchanged_and_skipped_counts(self):
+        User.objects.create(username='alice', student_id='S0001', email='alice@example.com')
+        User.objects.create(username='bob', student_id='S0002', email='bob@example.com')
+        User.objects.create(username='taken', student_id='S0009')
+        rows = [
+            {'student_id': 'S0001', 'username': 'alice', 'email': 'alice@example.com'},
+            {'student_id': 'S0002', 'username': 'bob', 'email': 'bob@school.example'},
+            {'student_id': 'S0003', 'username': 'carol', 'email': ''},
+            {'student_id': 'S0004', 'username': 'taken', 'email': ''},
+            {'student_id': '', 'username': 'nobody', 'email': ''},
+        ]
+
+        stats = import_students(rows, election_id=self.election.id, batch_size=2)
+
+        self.assertEqual(
+            {key: stats[key] for key in ('rows', 'users_created', 'users_updated', 'users_unchanged', 'skipped')},
+            {'rows': 5, 'users_created': 1, 'users_updated': 1, 'users_unchanged': 1, 'skipped': 2}
+        )
+        self.assertEqual(User.objects.get(student_id='S0002').email, 'bob@school.example')
+        self.assertFalse(User.objects.filter(student_id='S0004').exists())
+        self.assertEqual(stats['eligible_added'], 3)
+        self.assertEqual(
+            set(EligibleVoter.objects.filter(election=self.election).values_list('student__student_id', flat=True)),
+            {'S0001', 'S0002', 'S0003'}
+        )
+
+    def test_conflicting_row_is_reported_and_skipped(self):
+        rows = [
+            {'student_id': 'S0001', 'username': 'alice', 'email': ''},
+            {'student_id': 'S0002', 'username': 'bob', 'email': ''},
+        ]
+        bulk_create = User.objects.bulk_create
+
+        def take_username(users, **kwargs):
+            # Another import claims bob between the check and the insert
+            if not User.objects.filter(username='bob').exists():
+                User.objects.create(username='bob', student_id='S0099')
+            return bulk_create(users, **kwargs)
+
+        with mock.patch.object(User.objects, 'bulk_create', side_effect=take_username):
+            stats = import_students(rows, election_id=self.election.id)
+
+        self.assertEqual((stats['users_created'], stats['skipped']), (1, 1))
+        self.assertEqual(len(stats['errors']), 1)
+        self.assertTrue(stats['errors'][0].startswith('Row 2: '))
+        self.assertEqual(User.objects.get(username='bob').student_id, 'S0099')
+        self.assertEqual(
+            list(EligibleVoter.objects.filter(election=self.election).values_list('student__student_id', flat=True)),
+            ['S0001']
+        )
+
+    def test_command_imports_a_csv(self):
+        out, err = self.import_csv(
+            'student_id,username,email\nS0001,alice,alice@example.com\nS0002\n',
+            election=self.election.id
+        )
+        self.assertIn('1 users created, 0 updated, 0 unchanged, 1 skipped, 1 eligible voters added', out)
+        self.assertEqual(err, '')
+
+    def test_command_rejects_a_malformed_csv(self):
+        with self.assertRaisesMessage(CommandError, 'CSV is missing column(s): email, username'):
+            self.import_csv('student_id,name\nS0001,alice\n')
+        self.assertFalse(User.objects.filter(student_id='S0001').exists())
+
+
+@override_settings(**TEST_SETTINGS)
+class AuditLogSearchTests(TestCase):
+    """
+    Each audit log filter narrows the newest-first list, pages stay stable
+    when entries share a timestamp, and invalid filters are rejected.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create(username='auditor', role=User.ADMIN, is_staff=True)
+        self.student = User.objects.create(username='voter', student_id='S0001')
+        self.now = timezone.now()
+        hour = timezone.timedelta(hours=1)
+        self.entries = AuditLog.objects.bulk_create([
+            AuditLog(user=self.student, action='cast_vote', details={'election_id': 1},
+                     ip_address='10.0.0.1', timestamp=self.now - 3 * hour),
+            AuditLog(user=self.student, action='cast_vote', details={'election_id': 2},
+                     ip_address='10.0.0.2', timestamp=self.now - 2 * hour),
+            AuditLog(user=self.admin, action='start_election', details={'election_id': 2},
+                     ip_address='10.0.0.1', timestamp=self.now - hour),
+            AuditLog(user=self.admin, action='login', details={}, timestamp=self.now),
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def search(self, **params):
+        response = self.client.get('/api/api/audit-logs/', params)
+        self.assertEqual(response.status_code, 200)
+        return [entry['id'] for entry in response.json()['results']]
+
+    def ids(self, *positions):
+        return [self.entries[position].id for position in positions]
+
+    def test_each_filter(self):
+        cases = [
+            ({}, [3, 2, 1, 0]),
+            ({'action': 'cast_vote'}, [1, 0]),
+            ({'user': self.student.id}, [1, 0]),
+            ({'ip': '10.0.0.1'}, [2, 0]),
+            ({'election': 2}, [2, 1]),
+            ({'since': (self.now - timezone.timedelta(hours=2)).isoformat()}, [3, 2, 1]),
+            ({'until': (self.now - timezone.timedelta(hours=2)).isoformat()}, [0]),
+            ({'action': 'cast_vote', 'election': 1}, [0]),
+        ]
+        for params, positions in cases:
+            with self.subTest(**params):
+                self.assertEqual(self.search(**params), self.ids(*positions))
+
+    def test_entries_sharing_a_timestamp_are_paged_once(self):
+        AuditLog.objects.bulk_create([
+            AuditLog(action='cast_vote', details={'number': number}, timestamp=self.now) for number in range(5)
+        ])
+        ids = []
+        url = '/api/api/audit-logs/?page_size=2'
+        while url:
+            page = self.client.get(url).json()
+            ids.extend(entry['id'] for entry in page['results'])
+            url = page['next']
+        self.assertEqual(ids, list(AuditLog.objects.order_by('-timestamp', '-id').values_list('id', flat=True)))
+
+    def test_invalid_filters_are_rejected(self):
+        for params, error in (
+            ({'user': 'voter'}, 'user must be a user ID'),
+            ({'ip': '10.0.0'}, 'ip must be an IPv4 or IPv6 address'),
+            ({'since': 'yesterday'}, 'since must be an ISO 8601 datetime'),
+            ({'election': 'x'}, 'election must be an election ID'),
+        ):
+            with self.subTest(**params):
+                response = self.client.get('/api/api/audit-logs/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': error})
+
+
+class AuditLogArchiveTests(TestCase):
+    """
+    Archived months can be searched and restored unchanged, and a file that
+    no longer matches its checksum is refused.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.archive_dir = directory.name
+        settings_override = override_settings(AUDIT_LOG={'BUFFERED': False, 'ARCHIVE_DIR': self.archive_dir})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create(username='voter', student_id='S0001')
+        self.period = month_start(timezone.now() - timezone.timedelta(days=120))
+        self.entries = AuditLog.objects.bulk_create([
+            AuditLog(user=self.user, action='cast_vote', details={'election_id': number % 2},
+                     ip_address='10.0.0.1', timestamp=self.period + timezone.timedelta(days=number))
+            for number in range(4)
+        ])
+
+    def fields(self, entries):
+        return sorted(
+            (entry.id, entry.user_id, entry.action, entry.details, entry.timestamp, entry.ip_address)
+            for entry in entries
+        )
+
+    def archive(self):
+        out, err = StringIO(), StringIO()
+        call_command('archive_audit_logs', '--keep-months', '2', stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_archive_query_restore_round_trip(self):
+        original = self.fields(AuditLog.objects.all())
+        out, _ = self.archive()
+        self.assertIn(f'Archived 4 entries of {self.period:%Y-%m}', out)
+        self.assertFalse(AuditLog.objects.exists())
+        archive = AuditLogArchive.objects.get(period_start=self.period)
+        self.assertEqual(archive.row_count, 4)
+
+        matches = list(search_archives(parse_audit_filters({'election': '1', 'user': str(self.user.id)})))
+        self.assertEqual([entry['id'] for entry in matches], [self.entries[1].id, self.entries[3].id])
+        since = (self.period + timezone.timedelta(days=40)).isoformat()
+        self.assertEqual(list(search_archives(parse_audit_filters({'since': since}))), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(restore_archive(archive), 4)
+        self.assertEqual(self.fields(AuditLog.objects.all()), original)
+        self.assertFalse(AuditLogArchive.objects.exists())
+        self.assertEqual(os.listdir(self.archive_dir), [])
+
+    def test_checksum_mismatch_is_refused(self):
+        self.archive()
+        archive = AuditLogArchive.objects.get()
+        with open(os.path.join(self.archive_dir, archive.path), 'ab') as stream:
+            stream.write(b'tampered')
+
+        with self.assertRaisesMessage(ValueError, 'does not match its checksum'):
+            list(search_archives({}))
+        with self.assertRaisesMessage(CommandError, 'does not match its checksum'):
+            call_command('restore_audit_archive', f'{self.period:%Y-%m}', stdout=StringIO())
+        self.assertFalse(AuditLog.objects.exists())
+        self.assertTrue(AuditLogArchive.objects.exists())
+
+    def test_archived_month_with_late_entries_is_skipped(self):
+        self.archive()
+        AuditLog.objects.create(action='login', timestamp=self.period + timezone.timedelta(days=5))
+        older = month_start(self.period - timezone.timedelta(days=1))
+        AuditLog.objects.create(action='login', timestamp=older)
+
+        out, err = self.archive()
+
+        self.assertIn(f'Skipping {self.period:%Y-%m}: it is already archived', err)
+        self.assertIn(f'Archived 1 entries of {older:%Y-%m}', out)
+        self.assertEqual(list(AuditLog.objects.values_list('action', flat=True)), ['login'])
+        self.assertEqual(AuditLogArchive.objects.get(period_start=self.period).row_count, 4)
+
+
+@override_settings(**TEST_SETTINGS)
+class ElectionDayBenchmarkCommandTests(TestCase):
+    """
+    The benchmark refuses to seed a database that may be production, and
+    removes what it seeded unless asked to keep it.
+    """
+    command = 'elections.management.commands.benchmark_election_day.ElectionDayBenchmark'
+
+    def setUp(self):
+        cache.clear()
+
+    def run_benchmark(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command(
+            'benchmark_election_day', '--students', '3', '--positions', '2', '--candidates', '2',
+            *args, stdout=out, stderr=err
+        )
+        return out.getvalue()
+
+    @override_settings(DEBUG=False)
+    def test_refuses_without_debug_or_force(self):
+        with mock.patch(self.command) as benchmark:
+            with self.assertRaisesMessage(CommandError, 'DEBUG is off'):
+                self.run_benchmark()
+        benchmark.assert_not_called()
+        self.assertFalse(Election.objects.exists())
+
+    @override_settings(DEBUG=False)
+    def test_force_runs_and_removes_the_seeded_election(self):
+        with mock.patch(self.command) as benchmark:
+            benchmark.return_value.run.return_value = {'votes': {'count': 3}}
+            out = self.run_benchmark('--force')
+        self.assertEqual(json.loads(out), {'votes': {'count': 3}})
+        self.assertFalse(Election.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+    @override_settings(DEBUG=True)
+    def test_seeded_rows_are_removed_when_the_run_fails(self):
+        with mock.patch(self.command) as benchmark:
+            benchmark.return_value.run.side_effect = RuntimeError('worker crashed')
+            with self.assertRaises(RuntimeError):
+                self.run_benchmark()
+        self.assertFalse(Election.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+    @override_settings(DEBUG=True)
+    def test_keep_leaves_the_seeded_election(self):
+        with mock.patch(self.command) as benchmark:
+            benchmark.return_value.run.return_value = {}
+            self.run_benchmark('--keep')
+        election = Election.objects.get()
+        self.assertEqual(EligibleVoter.objects.filter(election=election).count(), 3)
+        self.assertEqual(Candidate.objects.filter(position__election=election).count(), 4)
+
+    def test_remove_deletes_only_the_seeded_rows(self):
+        other, _ = create_election(positions=1)
+        seeded = seed_election(students=3, positions=2, candidates=2)
+        AuditLog.objects.bulk_create([
+            AuditLog(user_id=seeded.student_ids[0], action='cast_vote'),
+            AuditLog(user=other.created_by, action='login'),
+        ])
+
+        remove_seeded_election(seeded)
+
+        self.assertEqual(list(Election.objects.values_list('id', flat=True)), [other.id])
+        self.assertFalse(User.objects.filter(username__startswith=f'bench-{seeded.tag}').exists())
+        self.assertEqual(list(AuditLog.objects.values_list('action', flat=True)), ['login'])
+
+
+class AuditLogWriterTests(TransactionTestCase):
+    """
+    A failed batch is retried, then written entry by entry, so a bad entry
+    or a lost connection does not lose the rest of the batch.
+    """
+
+    def entries(self, *actions):
+        return [AuditLog(action=action, details={'election_id': 1}) for action in actions]
+
+    def test_failed_batch_is_retried_on_a_new_connection(self):
+        bulk_create = AuditLog.objects.bulk_create
+        attempts = []
+
+        def fail_once(*args, **kwargs):
+            attempts.append(args)
+            if len(attempts) == 1:
+                raise OperationalError('server closed the connection unexpectedly')
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=fail_once), \
+                self.assertLogs('elections.audit', 'WARNING'):
+            self.assertEqual(AuditLogWriter()._insert(self.entries('first', 'second')), [])
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(sorted(AuditLog.objects.values_list('action', flat=True)), ['first', 'second'])
+
+    def test_bad_entry_does_not_lose_the_batch(self):
+        save = AuditLog.save
+
+        def save_unless_bad(entry, *args, **kwargs):
+            if entry.action == 'bad':
+                raise IntegrityError('bad entry')
+            return save(entry, *args, **kwargs)
+
+        with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=DatabaseError('batch failed')), \
+                mock.patch.object(AuditLog, 'save', save_unless_bad), \
+                self.assertLogs('elections.audit', 'ERROR') as logs:
+            self.assertEqual(AuditLogWriter()._insert(self.entries('first', 'bad', 'last')), [])
+        self.assertEqual(sorted(AuditLog.objects.values_list('action', flat=True)), ['first', 'last'])
+        self.assertIn('bad', logs.output[0])
+
+    def test_entries_are_kept_while_the_database_is_unavailable(self):
+        writer = AuditLogWriter()
+        entries = self.entries('first', 'second')
+        unavailable = OperationalError('could not connect to server')
+        with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=unavailable), \
+                mock.patch.object(AuditLog, 'save', side_effect=unavailable), \
+                self.assertLogs('elections.audit', 'ERROR'):
+            self.assertEqual(writer._insert(entries), entries)
+        self.assertFalse(AuditLog.objects.exists())
+
+
+class QueryPlanTests(TestCase):
+    """
+    Every hot query is answered from an index; see check_query_plans.
+    """
+
+    def test_hot_queries_use_an_index(self):
+        for name, (plan, full_scans) in check_query_plans().items():
+            with self.subTest(query=name):
+                self.assertEqual(full_scans, [], f'{name} reads a whole table:\n{plan}')
+
+    def test_full_scan_is_detected(self):
+        # Titles are not indexed, so this must be reported
+        plan = explain(Election.objects.filter(title='Student Council'))
+        self.assertTrue(find_full_scans(plan), plan)
+
+
+@override_settings(**TEST_SETTINGS)
+class VotingWindowTests(TestCase):
+    """
+    Votes are only accepted while an election is active.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_votes_outside_the_voting_window_are_rejected(self):
+        for election_status in (Election.UPCOMING, Election.CLOSED):
+            with self.subTest(status=election_status):
+                election, ballot = create_election(positions=1, status=election_status)
+                position, candidates = ballot[0]
+                self.client.force_authenticate(create_voter(election, f'voter-{election_status}'))
+                for path, body in (
+                    ('/api/api/votes/', {
+                        'election': election.id, 'position': position.id, 'candidate': candidates[0].id
+                    }),
+                    ('/api/api/votes/ballot/', {
+                        'election': election.id, 'votes': [{'position': position.id, 'candidate': candidates[0].id}]
+                    }),
+                ):
+                    response = self.client.post(path, body, format='json')
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.json(), {'error': 'Can only vote in active elections'})
+                self.assertFalse(Vote.objects.filter(election=election).exists())
+
+
+@override_settings(**TEST_SETTINGS)
+class ElectionSchedulerTests(TestCase):
+    """
+    The scheduler starts and closes elections when they fall due, and each
+    transition applies once whoever triggers it.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now().replace(microsecond=0)
+        clock = mock.patch('elections.scheduler.timezone.now', return_value=self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.scheduler = ElectionScheduler()
+
+    def create_election(self, status, starts_in, ends_in):
+        election, _ = create_election(positions=1, status=status)
+        Election.objects.filter(id=election.id).update(
+            start_datetime=self.now + timezone.timedelta(minutes=starts_in),
+            end_datetime=self.now + timezone.timedelta(minutes=ends_in)
+        )
+        election.refresh_from_db()
+        return election
+
+    def run_due(self, minutes):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.scheduler.run_due(self.now + timezone.timedelta(minutes=minutes))
+
+    def test_load_schedules_pending_transitions(self):
+        upcoming = self.create_election(Election.UPCOMING, 10, 20)
+        active = self.create_election(Election.ACTIVE, -10, 5)
+        self.create_election(Election.CLOSED, -20, -10)
+        self.scheduler.load()
+        self.assertEqual(
+            sorted(self.scheduler._heap),
+            [
+                (active.end_datetime, 1, active.id, CLOSE),
+                (upcoming.start_datetime, 0, upcoming.id, START),
+                (upcoming.end_datetime, 1, upcoming.id, CLOSE),
+            ]
+        )
+        self.assertEqual(self.scheduler.next_due(), active.end_datetime)
+
+    def test_run_due_applies_transitions_in_order(self):
+        election = self.create_election(Election.UPCOMING, 10, 20)
+        self.scheduler.load()
+
+        self.assertEqual(self.run_due(9), [])
+        self.assertEqual(self.run_due(10), [(election.id, START)])
+        election.refresh_from_db()
+        self.assertEqual(election.status, Election.ACTIVE)
+        self.assertEqual(self.run_due(30), [(election.id, CLOSE)])
+        election.refresh_from_db()
+        self.assertEqual(election.status, Election.CLOSED)
+        self.assertTrue(ResultsSnapshot.objects.filter(election=election).exists())
+        self.assertEqual(
+            list(AuditLog.objects.order_by('timestamp', 'id').values_list('action', 'details__scheduled')),
+            [('start_election', True), ('end_election', True)]
+        )
+        self.assertIsNone(self.scheduler.next_due())
+
+    def test_start_and_end_at_the_same_moment_apply_in_order(self):
+        election = self.create_election(Election.UPCOMING, 10, 10)
+        self.scheduler.load()
+        self.assertEqual(self.run_due(10), [(election.id, START), (election.id, CLOSE)])
+
+    def test_moved_start_is_picked_up_by_reload(self):
+        election = self.create_election(Election.UPCOMING, 10, 20)
+        self.scheduler.load()
+        self.assertFalse(self.scheduler.reload_if_changed())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            election.start_datetime = self.now + timezone.timedelta(minutes=15)
+            election.save()
+        # The entry made stale by the edit is skipped
+        self.assertEqual(self.run_due(10), [])
+        self.assertTrue(self.scheduler.reload_if_changed())
+        self.assertFalse(self.scheduler.reload_if_changed())
+        self.assertEqual(self.run_due(15), [(election.id, START)])
+
+    def test_transitions_apply_once(self):
+        election = self.create_election(Election.UPCOMING, 0, 20)
+        stale = Election.objects.get(id=election.id)
+        self.scheduler.load()
+        self.assertEqual(self.run_due(0), [(election.id, START)])
+
+        # An admin acting on a copy loaded before the scheduler started it;
+        # the compare-and-set goes by the stored status, not the copy's
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertFalse(start_election(stale))
+            self.assertTrue(close_election(stale))
+            self.assertFalse(close_election(Election.objects.get(id=election.id)))
+        self.assertEqual(
+            list(AuditLog.objects.order_by('timestamp', 'id').values_list('action', flat=True)),
+            ['start_election', 'end_election']
+        )
+
+    def test_admin_status_change_goes_through_the_transition(self):
+        election = self.create_election(Election.UPCOMING, 10, 20)
+        admin_user = User.objects.get(username='admin')
+        request = RequestFactory().post('/admin/')
+        request.user = admin_user
+        model_admin = ElectionAdmin(Election, django_admin.site)
+        form = mock.Mock(changed_data=['title', 'status'], initial={'status': Election.UPCOMING})
+
+        election.title = 'Renamed'
+        election.status = Election.ACTIVE
+        with self.captureOnCommitCallbacks(execute=True):
+            model_admin.save_model(request, election, form, change=True)
+        election.refresh_from_db()
+        self.assertEqual((election.title, election.status), ('Renamed', Election.ACTIVE))
+        self.assertEqual(AuditLog.objects.get().action, 'start_election')
+
+        # The scheduler closed it after the form was loaded
+        Election.objects.filter(id=election.id).update(status=Election.CLOSED)
+        election.status = Election.CLOSED
+        form.initial = {'status': Election.ACTIVE}
+        with mock.patch.object(model_admin, 'message_user') as message_user:
+            model_admin.save_model(request, election, form, change=True)
+        message_user.assert_called_once()
+        self.assertEqual(AuditLog.objects.count(), 1)
+
+
+@override_settings(**TEST_SETTINGS)
+@skipUnlessDBFeature('has_select_for_update', 'test_db_allows_multiple_connections')
+class CloseDuringVoteTests(TransactionTestCase):
+    """
+    Closing an election waits for the votes already being cast, so its
+    frozen results include every vote it accepted.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_close_waits_for_a_vote_in_progress(self):
+        election, ballot = create_election(positions=1)
+        position, candidates = ballot[0]
+        student = create_voter(election)
+        locked, proceed, closed = threading.Event(), threading.Event(), threading.Event()
+
+        def vote():
+            try:
+                with transaction.atomic():
+                    self.assertTrue(lock_active_election(election.id))
+                    locked.set()
+                    proceed.wait(10)
+                    Vote.objects.create(
+                        election=election, position=position, candidate=candidates[0], student=student
+                    )
+                    increment_tally(election.id, position.id, candidates[0].id)
+            finally:
+                connection.close()
+
+        def close():
+            try:
+                close_election(Election.objects.get(id=election.id))
+                closed.set()
+            finally:
+                connection.close()
+
+        voter = threading.Thread(target=vote)
+        voter.start()
+        self.assertTrue(locked.wait(10))
+        closer = threading.Thread(target=close)
+        closer.start()
+        self.assertFalse(closed.wait(0.5), 'the election closed while a vote held its lock')
+        proceed.set()
+        voter.join()
+        closer.join()
+
+        self.assertTrue(closed.is_set())
+        results = json.loads(ResultsSnapshot.objects.get(election=election).results)
+        self.assertEqual(
+            {candidate['candidate_id']: candidate['vote_count'] for candidate in results['positions'][0]['candidates']},
+            {candidates[0].id: 1, candidates[1].id: 0}
+        )
+
+
+@override_settings(**TEST_SETTINGS)
+@override_settings(**TEST_SETTINGS)
+class ResultsSnapshotTests(TestCase):
+    """
+    Results are frozen by the close transition, never by a read, and the
+    snapshot is only dropped when a closed or archived election reopens.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.election, _ = create_election(positions=1)
+
+    def test_reading_closed_results_does_not_freeze(self):
+        Election.objects.filter(id=self.election.id).update(status=Election.CLOSED)
+        response = APIClient().get(f'/elections/{self.election.id}/results/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ResultsSnapshot.objects.exists())
+
+    def test_snapshot_survives_saves_until_reopened(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(close_election(self.election))
+        self.election.refresh_from_db()
+        self.assertTrue(ResultsSnapshot.objects.filter(election=self.election).exists())
+
+        self.election.title = 'Renamed'
+        self.election.save()
+        self.election.status = Election.ARCHIVED
+        self.election.save()
+        self.assertTrue(ResultsSnapshot.objects.filter(election=self.election).exists())
+
+        self.election.status = Election.ACTIVE
+        self.election.save()
+        self.assertFalse(ResultsSnapshot.objects.filter(election=self.election).exists())
+
+    def test_saving_open_election_skips_snapshot_delete(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.election.save(update_fields=['title'])
+            self.election.save()
+        self.assertFalse(any(
+            'DELETE' in query['sql'] and 'snapshot' in query['sql'] for query in queries.captured_queries
+        ))
+
+
+class TallyRebuildTests(TestCase):
+    """
+    rebuild_vote_tallies reports tallies that drifted from the votes and
+    rebuilds them, refreezing the results of closed elections.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.election, ballot = create_election(positions=2, candidates=2)
+        for number, choice in enumerate((0, 0, 1)):
+            response = cast_ballot(
+                self.election, create_voter(self.election, f'voter{number}'),
+                [(position, candidates[choice]) for position, candidates in ballot]
+            )
+            self.assertEqual(response.status_code, 201)
+        self.ballot = ballot
+
+    def introduce_drift(self):
+        first, second = self.ballot[0][1]
+        VoteTally.objects.filter(candidate=first).update(vote_count=7)
+        VoteTally.objects.filter(candidate=second).delete()
+        return first, second
+
+    def test_check_reports_drift_and_rebuild_fixes_it(self):
+        first, second = self.introduce_drift()
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_vote_tallies', check=True, stdout=out)
+        self.assertIn(f'candidate {first.id} tallied 7, counted 2', out.getvalue())
+        self.assertIn(f'candidate {second.id} tallied 0, counted 1', out.getvalue())
+
+        call_command('rebuild_vote_tallies', stdout=StringIO())
+        self.assertEqual(get_vote_counts([self.election.id]), count_votes([self.election.id]))
+        call_command('rebuild_vote_tallies', check=True, stdout=StringIO())
+
+    def test_rebuild_refreezes_closed_election(self):
+        first, second = self.introduce_drift()
+        Election.objects.filter(id=self.election.id).update(status=Election.CLOSED)
+        self.election.refresh_from_db()
+        freeze_results(self.election)
+
+        call_command('rebuild_vote_tallies', election=[self.election.id], stdout=StringIO())
+        positions = json.loads(ResultsSnapshot.objects.get(election=self.election).results)['positions']
+        frozen = {
+            candidate['candidate_id']: candidate['vote_count']
+            for position in positions for candidate in position['candidates']
+        }
+        self.assertEqual(frozen[first.id], 2)
+        self.assertEqual(frozen[second.id], 1)
+
+
+@override_settings(**TEST_SETTINGS)
+class LiveResultsConsumerTests(TransactionTestCase):
+    """
+    Subscribers get a snapshot on connect, then a delta per vote, each with
+    a higher seq than the frame before it.
+    """
+    application = URLRouter(websocket_urlpatterns)
+
+    def setUp(self):
+        cache.clear()
+        snapshot_frames._frames.clear()
+
+    async def connect(self, election):
+        communicator = WebsocketCommunicator(self.application, f'/ws/public/elections/{election.id}/live-results/')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_snapshot_then_sequenced_deltas(self):
+        election, ballot = await sync_to_async(create_election)(positions=2, candidates=2)
+        voters = [await sync_to_async(create_voter)(election, f'voter{number}') for number in range(2)]
+        communicator = await self.connect(election)
+
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual(snapshot['type'], 'snapshot')
+        self.assertEqual(len(snapshot['positions']), 2)
+        last_seq = snapshot['seq']
+
+        for voter in voters:
+            choices = [(position, candidates[0]) for position, candidates in ballot]
+            response = await sync_to_async(cast_ballot)(election, voter, choices)
+            self.assertEqual(response.status_code, 201)
+
+            delta = await communicator.receive_json_from()
+            self.assertEqual(delta['type'], 'delta')
+            self.assertGreater(delta['seq'], last_seq)
+            last_seq = delta['seq']
+            self.assertEqual(
+                sorted((change['candidate_id'], change['vote_count']) for change in delta['changes']),
+                sorted((candidate.id, voters.index(voter) + 1) for _, candidate in choices)
+            )
+        self.assertEqual(delta['turnout']['voters_completed'], 2)
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_subscribers_share_one_encoded_snapshot(self):
+        election, _ = await sync_to_async(create_election)()
+        with mock.patch('elections.consumers.build_election_results', wraps=build_election_results) as build:
+            communicators = await asyncio.gather(*(self.connect(election) for _ in range(3)))
+            frames = [await communicator.receive_from() for communicator in communicators]
+
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(len(set(frames)), 1)
+        self.assertEqual(json.loads(frames[0])['type'], 'snapshot')
+        for communicator in communicators:
+            await communicator.disconnect()
+
+
+class ResultsBroadcasterTests(SimpleTestCase):
+    """
+    Deltas are merged per election and sent once per tick, or sent at once
+    when coalescing is off or the channel layer is in process.
+    """
+
+    def setUp(self):
+        self.broadcaster = ResultsBroadcaster()
+        patcher = mock.patch('elections.broadcast.broadcast_results_delta')
+        self.broadcast = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def coalescing(self):
+        # A channel layer other processes can reach, with the background
+        # thread stubbed out so the test flushes by hand
+        return (
+            mock.patch('elections.broadcast.get_channel_layer', return_value=object()),
+            mock.patch.object(ResultsBroadcaster, '_run', lambda self: None)
+        )
+
+    def sent(self):
+        return sorted(
+            (election_id, sorted(candidate_ids))
+            for (election_id, candidate_ids), _ in self.broadcast.call_args_list
+        )
+
+    def test_votes_are_merged_per_election(self):
+        layer, run = self.coalescing()
+        with layer, run:
+            self.broadcaster.enqueue(1, [1, 2])
+            self.broadcaster.enqueue(1, [2, 3])
+            self.broadcaster.enqueue(2, [4])
+            self.broadcast.assert_not_called()
+            self.broadcaster.flush()
+        self.assertEqual(self.sent(), [(1, [1, 2, 3]), (2, [4])])
+        self.broadcaster.flush()
+        self.assertEqual(self.broadcast.call_count, 2)
+
+    def test_failed_delta_is_retried_on_the_next_tick(self):
+        self.broadcast.side_effect = [RuntimeError('channel layer unavailable'), None]
+        layer, run = self.coalescing()
+        with layer, run, self.assertLogs('elections.broadcast', 'ERROR'):
+            self.broadcaster.enqueue(1, [1])
+            self.broadcaster.flush()
+            self.broadcaster.enqueue(1, [2])
+            self.broadcaster.flush()
+        self.assertEqual(self.sent(), [(1, [1]), (1, [1, 2])])
+
+    def test_sent_immediately_with_in_process_layer(self):
+        with override_settings(CHANNEL_LAYERS=TEST_SETTINGS['CHANNEL_LAYERS']):
+            self.broadcaster.enqueue(1, [1, 2])
+        self.assertEqual(self.sent(), [(1, [1, 2])])
+
+    @override_settings(RESULTS_BROADCAST_INTERVAL=0)
+    def test_sent_immediately_without_coalescing(self):
+        layer, _ = self.coalescing()
+        with layer:
+            self.broadcaster.enqueue(1, [3])
+        self.assertEqual(self.sent(), [(1, [3])])
@@ -0,0 +1,139 @@
+from typing import Any, Dict, Iterable
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Sum
+
+from .eligibility import get_eligible_count
+from .models import EligibleVoter, Position, TurnoutTally, Vote, VoterProgress, VoteTally
+
+
+def record_voter_progress(election_id: int, student_id: int, positions: int = 1) -> None:
+    """
+    Count newly cast votes towards the voter's progress and the election's turnout.
+
+    Must be called inside the transaction that inserts the votes. The
+    voter's progress row is locked, so concurrent ballots of the same voter
+    cannot both count as their first or their last.
+    """
+    with transaction.atomic():
+        progress, _ = VoterProgress.objects.select_for_update().get_or_create(
+            election_id=election_id,
+            student_id=student_id
+        )
+    voted_before = progress.positions_voted
+    progress.positions_voted = voted_before + positions
+    progress.save(update_fields=['positions_voted'])
+
+    total_positions = Position.objects.filter(election_id=election_id).count()
+    started = int(voted_before == 0)
+    completed = int(voted_before < total_positions <= progress.positions_voted)
+    if started:
+        EligibleVoter.objects.filter(election_id=election_id, student_id=student_id).update(has_voted=True)
+    if started or completed:
+        increment_turnout(election_id, started, completed)
+
+
+def increment_turnout(election_id: int, started: int, completed: int) -> None:
+    """
+    Add voters to an election's turnout tally, creating it on first use.
+    """
+    updated = TurnoutTally.objects.filter(election_id=election_id).update(
+        voters_started=F('voters_started') + started,
+        voters_completed=F('voters_completed') + completed
+    )
+    if updated:
+        return
+
+    with transaction.atomic():
+        _, created = TurnoutTally.objects.get_or_create(
+            election_id=election_id,
+            defaults={'voters_started': started, 'voters_completed': completed}
+        )
+    if not created:
+        TurnoutTally.objects.filter(election_id=election_id).update(
+            voters_started=F('voters_started') + started,
+            voters_completed=F('voters_completed') + completed
+        )
+
+
+def get_turnout_counts(election_id: int) -> Dict[str, int]:
+    """
+    Return the voter-level turnout of an election with one primary key read.
+    """
+    tally = TurnoutTally.objects.filter(election_id=election_id).values(
+        'voters_started', 'voters_completed'
+    ).first() or {'voters_started': 0, 'voters_completed': 0}
+    return {'eligible_voters': get_eligible_count(election_id), **tally}
+
+
+def build_turnout(election_id: int) -> Dict[str, Any]:
+    """
+    Build the turnout payload of an election: voter-level counts plus the
+    number of voters who voted for each position.
+
+    Every voter votes at most once per position, so a position's
+    participation is the sum of its candidates' tallies.
+    """
+    participation = dict(
+        VoteTally.objects.filter(election_id=election_id)
+        .values('position_id').annotate(total=Sum('vote_count')).order_by()
+        .values_list('position_id', 'total')
+    )
+    return {
+        'election_id': election_id,
+        **get_turnout_counts(election_id),
+        'positions': [
+            {
+                'position_id': position_id,
+                'position_title': title,
+                'voters': participation.get(position_id) or 0
+            }
+            for position_id, title in Position.objects.filter(election_id=election_id).values_list('id', 'title')
+        ]
+    }
+
+
+@transaction.atomic
+def rebuild_turnout(election_ids: Iterable[int]) -> None:
+    """
+    Recompute voter progress, turnout tallies and has_voted flags from the raw votes.
+    """
+    election_ids = list(election_ids)
+    voted = (
+        Vote.objects.filter(election_id__in=election_ids)
+        .values('election_id', 'student_id').annotate(total=Count('id')).order_by()
+        .values_list('election_id', 'student_id', 'total')
+    )
+    total_positions = dict(
+        Position.objects.filter(election_id__in=election_ids)
+        .values('election_id').annotate(total=Count('id')).order_by()
+        .values_list('election_id', 'total')
+    )
+
+    progress = []
+    turnout = {
+        election_id: TurnoutTally(election_id=election_id)
+        for election_id in election_ids
+    }
+    for election_id, student_id, positions_voted in voted:
+        progress.append(VoterProgress(
+            election_id=election_id,
+            student_id=student_id,
+            positions_voted=positions_voted
+        ))
+        turnout[election_id].voters_started += 1
+        if positions_voted >= total_positions.get(election_id, 0):
+            turnout[election_id].voters_completed += 1
+
+    VoterProgress.objects.filter(election_id__in=election_ids).delete()
+    VoterProgress.objects.bulk_create(progress, batch_size=1000)
+    TurnoutTally.objects.filter(election_id__in=election_ids).delete()
+    TurnoutTally.objects.bulk_create(turnout.values())
+
+    EligibleVoter.objects.filter(election_id__in=election_ids).update(has_voted=False)
+    EligibleVoter.objects.filter(election_id__in=election_ids).filter(
+        Exists(VoterProgress.objects.filter(
+            election_id=OuterRef('election_id'),
+            student_id=OuterRef('student_id')
+        ))
+    ).update(has_voted=True)
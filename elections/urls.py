@@ -39,6 +39,11 @@ urlpatterns = [
     # User-specific endpoints (requires authentication)
     path('elections/<int:election_id>/with-vote-status/', views.ElectionWithVoteStatusView.as_view(), name='election-with-vote-status'),
     
+    # Admin-only endpoints
+    path('elections/<int:election_id>/turnout/', views.ElectionTurnoutView.as_view(), name='election-turnout'),
+    path('elections/<int:election_id>/export/', views.ElectionExportView.as_view(), name='election-export'),
+    path('profiling/requests/', views.RequestProfileView.as_view(), name='request-profiles'),
+    
     # API endpoints
     path('api/', include(router.urls)),
     path('api/', include(elections_router.urls)),
@@ -1,16 +1,74 @@
+import time
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .audit import audit_log_writer
 from .models import AuditLog
 
-def log_audit(user, action, details):
+def log_audit(user, action, details, strict=False, request=None):
     """
     Helper function to create audit log entries.
     
+    Entries are buffered and inserted in batches in the background, so the
+    request does not wait on the insert.
+    
     Args:
         user: The user performing the action
         action: The type of action performed
-        details: Additional details about the action
+        details: A dict describing the action; entries about an election
+            carry its 'election_id' so they can be searched by election
+        strict: Insert the entry before returning, for actions whose record
+            must survive a crash of the worker
+        request: The request that triggered the action, to record its IP address
+    """
+    audit_log_writer.write(
+        AuditLog(
+            user=user,
+            action=action,
+            details=details,
+            timestamp=timezone.now(),
+            ip_address=get_client_ip(request) if request is not None else None
+        ),
+        strict=strict
+    )
+
+def get_client_ip(request):
+    """
+    Return the IP address the request came from.
+
+    Only REMOTE_ADDR is trusted; forwarding headers can be set by the client.
+    """
+    return request.META.get('REMOTE_ADDR') or None
+
+def get_cache_version(key):
+    """
+    Return the counter stored under key in the shared cache, creating it if needed.
+
+    Counters start from the clock rather than 1, so a counter evicted from
+    the cache can never come back with a value something was already
+    cached under.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        version = cache.get(key)
+    return version
+
+def bump_cache_version(key):
+    """
+    Increment the counter stored under key in the shared cache and return it.
+    """
+    try:
+        return cache.incr(key)
+    except ValueError:
+        get_cache_version(key)
+        return cache.incr(key)
+
+def percentile(ordered, fraction):
+    """
+    Return the value at fraction (0 to 1) of a sorted, non-empty sequence.
+
+    Nearest rank, without interpolation, so the result is always one of the values.
     """
-    AuditLog.objects.create(
-        user=user,
-        action=action,
-        details=details
-    ) 
\ No newline at end of file
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
@@ -1,12 +1,14 @@
+import hashlib
+import json
+from urllib.parse import urlencode
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.utils import timezone
-from django.db.models import Count
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
 from django.contrib.auth import authenticate, logout as django_logout
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
@@ -16,18 +18,101 @@ from .serializers import (
     EligibleVoterSerializer, VoteSerializer, AuditLogSerializer, ElectionResultsSerializer,
     ElectionWithVoteStatusSerializer
 )
-from .permissions import IsAdminOrReadOnly, IsEligibleVoter
+from .permissions import IsAdminOrReadOnly, IsAdminRole, IsEligibleVoter
+from .eligibility import eligible_election_ids, get_any_eligibility_version, get_eligibility_version, is_eligible
 from .utils import log_audit
-from django.http import JsonResponse
+from .audit import filter_audit_logs
+from .broadcast import results_broadcaster
+from .pagination import AuditLogPagination, KeysetPagination, PublicElectionsPagination
+from .turnout import build_turnout, record_voter_progress
+from .scheduler import close_election, lock_active_election, start_election
+from .middleware import get_profiling_setting, request_profiles
+from .metrics import VOTES_CAST, observe_vote_request
+from .exports import EXPORT_DATASETS, EXPORT_FORMATS, EXPORTABLE_STATUSES, astream_export, stream_export
+from .results import (
+    build_positions_results, build_turnout_summaries, increment_tally, increment_tallies,
+    bump_results_version, compute_election_results, get_cached_results, get_final_snapshot,
+    get_results_version, get_public_results_version
+)
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django.shortcuts import redirect
 from django.contrib import messages
 
-# Handle channels import gracefully
-try:
-    from channels.layers import get_channel_layer
-except ImportError:
-    # Fallback for older versions
-    from channels import get_channel_layer
+def get_election_results(request, election_id):
+    """
+    Return the cached (version, status, payload) of an election's results.
+
+    Read once per request, so the ETag and the body describe the same version.
+    """
+    if not hasattr(request, '_election_results'):
+        version = get_results_version(election_id)
+        request._election_results = (version, *get_cached_results(
+            f'election_results:{election_id}',
+            version,
+            lambda: compute_election_results(election_id)
+        ))
+    return request._election_results
+
+def compute_turnout(election_id):
+    if not Election.objects.filter(id=election_id).exists():
+        return status.HTTP_404_NOT_FOUND, {'detail': 'Election not found'}
+    return status.HTTP_200_OK, build_turnout(election_id)
+
+def get_election_turnout(request, election_id):
+    """
+    Return the cached (version, status, payload) of an election's turnout.
+
+    Votes bump the results version and voter list changes the eligibility
+    version, so either invalidates the cached turnout.
+    """
+    if not hasattr(request, '_election_turnout'):
+        version = f'{get_results_version(election_id)}-{get_eligibility_version(election_id)}'
+        request._election_turnout = (version, *get_cached_results(
+            f'election_turnout:{election_id}',
+            version,
+            lambda: compute_turnout(election_id)
+        ))
+    return request._election_turnout
+
+# Only successful responses are tagged, so a client is never told an error is unchanged
+
+def election_results_etag(request, election_id):
+    version, status_code, _ = get_election_results(request, election_id)
+    if status_code != status.HTTP_200_OK:
+        return None
+    return f'{election_id}-{version}'
+
+def election_turnout_etag(request, election_id):
+    version, status_code, _ = get_election_turnout(request, election_id)
+    if status_code != status.HTTP_200_OK:
+        return None
+    return f'turnout-{election_id}-{version}'
+
+def public_elections_cache_key(request):
+    # Built only from the parameters a page depends on, normalized, so
+    # unknown or out-of-range parameters cannot create new cache entries.
+    # An invalid cursor raises NotFound before anything is cached.
+    paginator = PublicElectionsPagination()
+    cursor = paginator.decode_cursor(request)
+    key = ':'.join(map(str, (
+        request.query_params.get('view', 'full'),
+        paginator.get_page_size(request),
+        tuple(cursor) if cursor is not None else ''
+    )))
+    return hashlib.md5(key.encode()).hexdigest()
+
+def public_elections_version():
+    # Summary pages carry each election's eligible voter count, which
+    # changes with the voter lists rather than with the results
+    return f'{get_public_results_version()}-{get_any_eligibility_version()}'
+
+def public_elections_etag(request):
+    if request.GET.get('view', 'full') not in ('full', 'summary'):
+        return None
+    return f'public-{public_elections_version()}-{public_elections_cache_key(request)[:12]}'
 
 class LoginView(APIView):
     permission_classes = [permissions.AllowAny]
@@ -146,7 +231,7 @@ class LogoutView(APIView):
             token.blacklist()
             
             # Log the logout action
-            log_audit(request.user, 'logout', 'User logged out successfully')
+            log_audit(request.user, 'logout', {'message': 'User logged out successfully'}, request=request)
             
             return Response(
                 {'message': 'Successfully logged out'},
@@ -249,11 +334,12 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = KeysetPagination
 
     @extend_schema(
         tags=['users'],
         summary="List Users",
-        description="Get a list of all users (Admin only)",
+        description="Get a list of all users (Admin only). Pass page_size or cursor to page through the list newest first with keyset pagination.",
         responses={200: UserSerializer(many=True)}
     )
     def list(self, request, *args, **kwargs):
@@ -281,11 +367,12 @@ class ElectionViewSet(viewsets.ModelViewSet):
     queryset = Election.objects.all()
     serializer_class = ElectionSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = KeysetPagination
 
     @extend_schema(
         tags=['elections'],
         summary="List Elections",
-        description="Get a list of elections. Admins see all elections, students see only their eligible elections.",
+        description="Get a list of elections. Admins see all elections, students see only their eligible elections. Pass page_size or cursor to page through the list newest first with keyset pagination.",
         responses={200: ElectionSerializer(many=True)}
     )
     def list(self, request, *args, **kwargs):
@@ -312,16 +399,22 @@ class ElectionViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         if self.request.user.role == User.ADMIN:
             return Election.objects.all()
-        return Election.objects.filter(eligible_voters__student=self.request.user)
+        explicit = EligibleVoter.objects.filter(student=self.request.user).values('election_id')
+        return Election.objects.filter(
+            Q(id__in=explicit) | Q(id__in=eligible_election_ids(self.request.user))
+        )
 
     def perform_create(self, serializer):
         election = serializer.save(created_by=self.request.user)
-        log_audit(self.request.user, 'create_election', f'Created election: {election.title}')
+        log_audit(self.request.user, 'create_election', {
+            'message': f'Created election: {election.title}',
+            'election_id': election.id
+        }, strict=True, request=self.request)
 
     @extend_schema(
         tags=['elections'],
         summary="Start Election",
-        description="Start an election by changing its status from 'pending' to 'active' (Admin only)",
+        description="Start an election now by changing its status from 'upcoming' to 'active', ahead of its start time (Admin only)",
         responses={
             200: {
                 'type': 'object',
@@ -340,21 +433,18 @@ class ElectionViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def start(self, request, pk=None):
         election = self.get_object()
-        if election.status != 'pending':
+        # The scheduler may start it at the same moment; only one of them does
+        if not start_election(election, request.user, request):
             return Response(
-                {'error': 'Only pending elections can be started'},
+                {'error': 'Only upcoming elections can be started'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-
-        election.status = 'active'
-        election.save()
-        log_audit(request.user, 'start_election', f'Started election: {election.title}')
         return Response({'status': 'election started'})
 
     @extend_schema(
         tags=['elections'],
         summary="End Election",
-        description="End an election by changing its status from 'active' to 'completed' (Admin only)",
+        description="End an election now by changing its status from 'active' to 'closed', ahead of its end time (Admin only)",
         responses={
             200: {
                 'type': 'object',
@@ -373,15 +463,11 @@ class ElectionViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def end(self, request, pk=None):
         election = self.get_object()
-        if election.status != 'active':
+        if not close_election(election, request.user, request):
             return Response(
                 {'error': 'Only active elections can be ended'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-
-        election.status = 'completed'
-        election.save()
-        log_audit(request.user, 'end_election', f'Ended election: {election.title}')
         return Response({'status': 'election ended'})
 
 class PositionViewSet(viewsets.ModelViewSet):
@@ -544,11 +630,12 @@ class CandidateViewSet(viewsets.ModelViewSet):
 class VoteViewSet(viewsets.ModelViewSet):
     serializer_class = VoteSerializer
     permission_classes = [IsEligibleVoter]
+    pagination_class = KeysetPagination
 
     @extend_schema(
         tags=['voting'],
         summary="List User's Votes",
-        description="Get a list of votes cast by the authenticated user",
+        description="Get a list of votes cast by the authenticated user. Pass page_size or cursor to page through the list newest first with keyset pagination.",
         responses={200: VoteSerializer(many=True)}
     )
     def list(self, request, *args, **kwargs):
@@ -584,71 +671,275 @@ class VoteViewSet(viewsets.ModelViewSet):
                 'properties': {
                     'error': {'type': 'string', 'description': 'Error message'}
                 }
+            },
+            409: {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string', 'description': 'The user already voted for this position'}
+                }
             }
         }
     )
+    @observe_vote_request('vote')
     def create(self, request, *args, **kwargs):
-        election_id = request.data.get('election')
-        position_id = request.data.get('position')
-        candidate_id = request.data.get('candidate')
+        try:
+            election_id, position_id, candidate_id = (
+                int(request.data.get(field)) for field in ('election', 'position', 'candidate')
+            )
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'Invalid election, position, or candidate'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        # Check if user has already voted for this position in this election
-        existing_vote = Vote.objects.filter(
-            election_id=election_id,
+        # One query both checks that the candidate stands for this position in
+        # this election and fetches the names used in the audit log
+        candidate = Candidate.objects.filter(
+            id=candidate_id,
             position_id=position_id,
-            student=request.user
-        ).first()
+            position__election_id=election_id
+        ).values('name', 'position__title').first()
 
-        if existing_vote:
+        if candidate is None:
             return Response(
-                {'error': 'You have already voted for this position in this election'},
+                {'error': 'Invalid election, position, or candidate'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Create the vote
-        vote = Vote.objects.create(
-            election_id=election_id,
-            position_id=position_id,
-            candidate_id=candidate_id,
-            student=request.user
+        # Create the vote and update the candidate's tally in the same transaction.
+        # The unique (election, position, student) constraint rejects a second
+        # vote, including one racing this request.
+        try:
+            with transaction.atomic():
+                # Results are frozen when an election closes. The status is
+                # checked under a lock the close waits on, so no vote can
+                # commit after the freeze.
+                if not lock_active_election(election_id):
+                    return Response(
+                        {'error': 'Can only vote in active elections'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                vote = Vote.objects.create(
+                    election_id=election_id,
+                    position_id=position_id,
+                    candidate_id=candidate_id,
+                    student=request.user
+                )
+                increment_tally(election_id, position_id, candidate_id)
+                # Users vote position by position; turnout counts them once
+                # when they start and once when they have voted for every position
+                record_voter_progress(election_id, request.user.id)
+                transaction.on_commit(lambda: bump_results_version(election_id))
+                transaction.on_commit(lambda: VOTES_CAST.labels('vote').inc())
+        except IntegrityError:
+            return Response(
+                {'error': 'You have already voted for this position in this election'},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        # Log the vote
+        log_audit(request.user, 'cast_vote', {
+            'message': f"Voted for candidate {candidate['name']} in {candidate['position__title']}",
+            'election_id': election_id,
+            'position_id': position_id,
+            'candidate_id': candidate_id
+        }, request=request)
+
+        # Queue a real-time update once the vote is committed
+        transaction.on_commit(
+            lambda: results_broadcaster.enqueue(election_id, [candidate_id])
         )
 
-        # Note: We do NOT mark the entire election as voted
-        # Users can vote for multiple positions in the same election
-        # The has_voted flag in EligibleVoter is only used to track overall participation
+        serializer = self.get_serializer(vote)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        # Log the vote
-        log_audit(request.user, 'cast_vote', f'Voted for candidate {vote.candidate.name} in {vote.position.title}')
-
-        # Send real-time update
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            f'election_{election_id}',
-            {
-                'type': 'election_results_update',
-                'election_id': election_id
+    @extend_schema(
+        tags=['voting'],
+        summary="Cast a Ballot",
+        description="Cast votes for several positions of an election in one request (Students only, one vote per position). The ballot is accepted or rejected as a whole.",
+        request={
+            'application/json': {
+                'type': 'object',
+                'properties': {
+                    'election': {'type': 'integer', 'description': 'ID of the election'},
+                    'votes': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'position': {'type': 'integer', 'description': 'ID of the position'},
+                                'candidate': {'type': 'integer', 'description': 'ID of the chosen candidate'},
+                            },
+                            'required': ['position', 'candidate']
+                        }
+                    }
+                },
+                'required': ['election', 'votes']
             }
+        },
+        responses={
+            201: VoteSerializer(many=True),
+            400: {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string', 'description': 'Error message'}
+                }
+            },
+            409: {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string', 'description': 'The user already voted for one of the positions'}
+                }
+            }
+        },
+        examples=[
+            OpenApiExample(
+                'Ballot',
+                value={
+                    'election': 1,
+                    'votes': [
+                        {'position': 1, 'candidate': 2},
+                        {'position': 2, 'candidate': 5}
+                    ]
+                },
+                request_only=True
+            )
+        ]
+    )
+    @action(detail=False, methods=['post'])
+    @observe_vote_request('ballot')
+    def ballot(self, request):
+        try:
+            election_id = int(request.data.get('election'))
+            choices = [
+                (int(choice['position']), int(choice['candidate']))
+                for choice in request.data.get('votes')
+            ]
+        except (TypeError, ValueError, KeyError):
+            return Response(
+                {'error': 'A ballot needs an election and a list of votes, each with a position and a candidate'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        position_ids = [position_id for position_id, _ in choices]
+        if not choices or len(set(position_ids)) != len(position_ids):
+            return Response(
+                {'error': 'A ballot must contain at most one vote per position'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # One query validates every choice and fetches the names for the audit log
+        candidates = {
+            candidate['id']: candidate
+            for candidate in Candidate.objects.filter(
+                id__in=[candidate_id for _, candidate_id in choices],
+                position__election_id=election_id
+            ).values('id', 'position_id', 'name', 'position__title')
+        }
+        for position_id, candidate_id in choices:
+            candidate = candidates.get(candidate_id)
+            if candidate is None or candidate['position_id'] != position_id:
+                return Response(
+                    {'error': 'Invalid election, position, or candidate'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        # Insert every vote and update every tally in one transaction; a
+        # position the user already voted for rejects the whole ballot
+        try:
+            with transaction.atomic():
+                # Checked under the election lock, as for a single vote
+                if not lock_active_election(election_id):
+                    return Response(
+                        {'error': 'Can only vote in active elections'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                votes = Vote.objects.bulk_create([
+                    Vote(
+                        election_id=election_id,
+                        position_id=position_id,
+                        candidate_id=candidate_id,
+                        student=request.user
+                    )
+                    for position_id, candidate_id in choices
+                ])
+                increment_tallies(election_id, choices)
+                record_voter_progress(election_id, request.user.id, len(choices))
+                transaction.on_commit(lambda: bump_results_version(election_id))
+                transaction.on_commit(lambda: VOTES_CAST.labels('ballot').inc(len(choices)))
+        except IntegrityError:
+            return Response(
+                {'error': 'You have already voted for one of these positions in this election'},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        # Log the whole ballot as one entry
+        log_audit(request.user, 'cast_ballot', {
+            'message': 'Voted for ' + ', '.join(
+                f"candidate {candidates[candidate_id]['name']} in {candidates[candidate_id]['position__title']}"
+                for _, candidate_id in choices
+            ),
+            'election_id': election_id,
+            'votes': [
+                {'position_id': position_id, 'candidate_id': candidate_id}
+                for position_id, candidate_id in choices
+            ]
+        }, request=request)
+
+        # Queue one real-time update for the whole ballot
+        transaction.on_commit(
+            lambda: results_broadcaster.enqueue(election_id, [candidate_id for _, candidate_id in choices])
         )
 
-        serializer = self.get_serializer(vote)
+        serializer = self.get_serializer(votes, many=True)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def get_queryset(self):
         return Vote.objects.filter(student=self.request.user)
 
 class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = AuditLog.objects.all().order_by('-timestamp')
+    queryset = AuditLog.objects.select_related('user').order_by('-timestamp', '-id')
     serializer_class = AuditLogSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = AuditLogPagination
 
     @extend_schema(
         tags=['audit'],
         summary="List Audit Logs",
-        description="Get a list of audit log entries (Admin only)",
-        responses={200: AuditLogSerializer(many=True)}
+        description="Search audit log entries, newest first, with cursor pagination (Admin only)",
+        parameters=[
+            OpenApiParameter(name='action', location=OpenApiParameter.QUERY, required=False,
+                             type=OpenApiTypes.STR, description='Only entries with this action, e.g. cast_vote'),
+            OpenApiParameter(name='user', location=OpenApiParameter.QUERY, required=False,
+                             type=OpenApiTypes.INT, description='Only entries of this user ID'),
+            OpenApiParameter(name='ip', location=OpenApiParameter.QUERY, required=False,
+                             type=OpenApiTypes.IP4, description='Only entries from this IP address'),
+            OpenApiParameter(name='election', location=OpenApiParameter.QUERY, required=False,
+                             type=OpenApiTypes.INT, description='Only entries about this election ID'),
+            OpenApiParameter(name='since', location=OpenApiParameter.QUERY, required=False,
+                             type=OpenApiTypes.DATETIME, description='Only entries at or after this time'),
+            OpenApiParameter(name='until', location=OpenApiParameter.QUERY, required=False,
+                             type=OpenApiTypes.DATETIME, description='Only entries before this time'),
+        ],
+        responses={
+            200: AuditLogSerializer(many=True),
+            400: {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string', 'description': 'Error message'}
+                }
+            }
+        }
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        try:
+            queryset = filter_audit_logs(self.get_queryset(), request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @extend_schema(
         tags=['audit'],
@@ -668,7 +959,7 @@ class ElectionResultsView(APIView):
     @extend_schema(
         tags=['elections'],
         summary="Get Election Results",
-        description="Get real-time results for an active or completed election (Public endpoint - no authentication required)",
+        description="Get real-time results for an active, closed or archived election (Public endpoint - no authentication required)",
         parameters=[
             OpenApiParameter(
                 name='election_id',
@@ -722,65 +1013,98 @@ class ElectionResultsView(APIView):
             ),
             OpenApiExample(
                 'Election Not Active',
-                value={'error': 'Results are only available for active or completed elections'},
+                value={'error': 'Results are only available for active, closed or archived elections'},
                 status_codes=['400']
             )
         ]
     )
+    @method_decorator(condition(etag_func=election_results_etag))
     def get(self, request, election_id):
-        try:
-            election = Election.objects.get(id=election_id)
-            if election.status not in ['active', 'completed']:
-                return Response(
-                    {'error': 'Results are only available for active or completed elections'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            serializer = ElectionResultsSerializer(election)
-            return Response(serializer.data)
-        except Election.DoesNotExist:
-            return Response(
-                {'detail': 'Election not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
+        # Served from the cache until a vote or ballot change bumps the version
+        _, status_code, data = get_election_results(request, election_id)
+        if isinstance(data, str):
+            # Final results, already encoded by their snapshot
+            return HttpResponse(data, content_type='application/json')
+        return Response(data, status=status_code)
 
 class PublicElectionsView(APIView):
     """
-    Public endpoint to list active and completed elections for unauthenticated users
+    Public endpoint to list active and closed elections for unauthenticated users
     """
     permission_classes = [permissions.AllowAny]  # Public endpoint
     
     @extend_schema(
         tags=['elections'],
         summary="List Public Elections",
-        description="Get a list of active and completed elections with complete results data (Public endpoint - no authentication required)",
+        description="Get a cursor-paginated list of active and closed elections, newest first, with complete results data or, with ?view=summary, turnout totals only (Public endpoint - no authentication required)",
+        parameters=[
+            OpenApiParameter(
+                name='view',
+                location=OpenApiParameter.QUERY,
+                description="'full' (default) includes every position's results; 'summary' returns election metadata and turnout totals only",
+                required=False,
+                type=OpenApiTypes.STR,
+                enum=['full', 'summary']
+            ),
+            OpenApiParameter(
+                name='cursor',
+                location=OpenApiParameter.QUERY,
+                description='Pagination cursor taken from the next or previous link',
+                required=False,
+                type=OpenApiTypes.STR
+            ),
+            OpenApiParameter(
+                name='page_size',
+                location=OpenApiParameter.QUERY,
+                description='Number of elections per page (default 10, max 100)',
+                required=False,
+                type=OpenApiTypes.INT
+            )
+        ],
         responses={
             200: {
-                'type': 'array',
-                'items': {
-                    'type': 'object',
-                    'properties': {
-                        'id': {'type': 'integer', 'description': 'Election ID'},
-                        'title': {'type': 'string', 'description': 'Election title'},
-                        'description': {'type': 'string', 'description': 'Election description'},
-                        'status': {'type': 'string', 'description': 'Election status'},
-                        'start_datetime': {'type': 'string', 'format': 'date-time'},
-                        'end_datetime': {'type': 'string', 'format': 'date-time'},
-                        'positions': {
-                            'type': 'array',
-                            'items': {
-                                'type': 'object',
-                                'properties': {
-                                    'position_id': {'type': 'integer'},
-                                    'position_title': {'type': 'string'},
-                                    'candidates': {
-                                        'type': 'array',
-                                        'items': {
-                                            'type': 'object',
-                                            'properties': {
-                                                'candidate_id': {'type': 'integer'},
-                                                'candidate_name': {'type': 'string'},
-                                                'vote_count': {'type': 'integer'}
+                'type': 'object',
+                'properties': {
+                    'next': {'type': 'string', 'nullable': True, 'description': 'Link to the next page'},
+                    'previous': {'type': 'string', 'nullable': True, 'description': 'Link to the previous page'},
+                    'results': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'id': {'type': 'integer', 'description': 'Election ID'},
+                                'title': {'type': 'string', 'description': 'Election title'},
+                                'description': {'type': 'string', 'description': 'Election description'},
+                                'status': {'type': 'string', 'description': 'Election status'},
+                                'start_datetime': {'type': 'string', 'format': 'date-time'},
+                                'end_datetime': {'type': 'string', 'format': 'date-time'},
+                                'turnout': {
+                                    'type': 'object',
+                                    'description': 'Only in summary view',
+                                    'properties': {
+                                        'eligible_voters': {'type': 'integer'},
+                                        'voters': {'type': 'integer'},
+                                        'votes': {'type': 'integer'}
+                                    }
+                                },
+                                'positions': {
+                                    'type': 'array',
+                                    'description': 'Only in full view',
+                                    'items': {
+                                        'type': 'object',
+                                        'properties': {
+                                            'position_id': {'type': 'integer'},
+                                            'position_title': {'type': 'string'},
+                                            'candidates': {
+                                                'type': 'array',
+                                                'items': {
+                                                    'type': 'object',
+                                                    'properties': {
+                                                        'candidate_id': {'type': 'integer'},
+                                                        'candidate_name': {'type': 'string'},
+                                                        'vote_count': {'type': 'integer'}
+                                                    }
+                                                }
                                             }
                                         }
                                     }
@@ -789,51 +1113,148 @@ class PublicElectionsView(APIView):
                         }
                     }
                 }
+            },
+            400: {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string', 'description': 'Error message'}
+                }
             }
         },
         examples=[
             OpenApiExample(
                 'Public Elections with Results',
-                value=[
-                    {
-                        'id': 1,
-                        'title': 'Student Council Election 2024',
-                        'description': 'Annual student council election',
-                        'status': 'active',
-                        'start_datetime': '2024-03-01T09:00:00Z',
-                        'end_datetime': '2024-03-01T17:00:00Z',
-                        'positions': [
-                            {
-                                'position_id': 1,
-                                'position_title': 'President',
-                                'candidates': [
-                                    {
-                                        'candidate_id': 1,
-                                        'candidate_name': 'John Doe',
-                                        'vote_count': 45
-                                    },
-                                    {
-                                        'candidate_id': 2,
-                                        'candidate_name': 'Jane Smith',
-                                        'vote_count': 38
-                                    }
-                                ]
+                value={
+                    'next': 'http://example.com/elections/?cursor=cD0yMDI0LTAyLTE1',
+                    'previous': None,
+                    'results': [
+                        {
+                            'id': 1,
+                            'title': 'Student Council Election 2024',
+                            'description': 'Annual student council election',
+                            'status': 'active',
+                            'start_datetime': '2024-03-01T09:00:00Z',
+                            'end_datetime': '2024-03-01T17:00:00Z',
+                            'positions': [
+                                {
+                                    'position_id': 1,
+                                    'position_title': 'President',
+                                    'candidates': [
+                                        {
+                                            'candidate_id': 1,
+                                            'candidate_name': 'John Doe',
+                                            'vote_count': 45
+                                        },
+                                        {
+                                            'candidate_id': 2,
+                                            'candidate_name': 'Jane Smith',
+                                            'vote_count': 38
+                                        }
+                                    ]
+                                }
+                            ]
+                        }
+                    ]
+                },
+                status_codes=['200']
+            ),
+            OpenApiExample(
+                'Public Elections Summary',
+                value={
+                    'next': None,
+                    'previous': None,
+                    'results': [
+                        {
+                            'id': 1,
+                            'title': 'Student Council Election 2024',
+                            'description': 'Annual student council election',
+                            'status': 'active',
+                            'start_datetime': '2024-03-01T09:00:00Z',
+                            'end_datetime': '2024-03-01T17:00:00Z',
+                            'turnout': {
+                                'eligible_voters': 120,
+                                'voters': 83,
+                                'votes': 166
                             }
-                        ]
-                    }
-                ],
+                        }
+                    ]
+                },
                 status_codes=['200']
             )
         ]
     )
+    @method_decorator(condition(etag_func=public_elections_etag))
     def get(self, request):
-        # Get active and completed elections with full results data
-        elections = Election.objects.filter(
-            status__in=['active', 'completed']
+        view_mode = request.query_params.get('view', 'full')
+        if view_mode not in ('full', 'summary'):
+            return Response(
+                {'error': "view must be 'full' or 'summary'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Each page, page size and view mode is cached separately
+        results = get_cached_results(
+            f'public_elections:{public_elections_cache_key(request)}',
+            public_elections_version(),
+            lambda: self.compute_results(request, view_mode)
+        )
+        return Response(results)
+
+    def compute_results(self, request, view_mode):
+        # Get one page of active and closed elections, newest first
+        paginator = PublicElectionsPagination()
+        elections = paginator.paginate_queryset(
+            Election.objects.filter(status__in=[Election.ACTIVE, Election.CLOSED]).select_related('results_snapshot'),
+            request,
+            view=self
         )
+        # The page is cached for every request with the same cache key, so
+        # its links carry only the normalized parameters the key is built from
+        query = {}
+        if view_mode != 'full':
+            query['view'] = view_mode
+        if paginator.page_size != PublicElectionsPagination.page_size:
+            query['page_size'] = paginator.page_size
+        paginator.base_url = request.build_absolute_uri(
+            f'{request.path}?{urlencode(query)}' if query else request.path
+        )
+        # Closed elections are read from their snapshots, fetched with the page
+        snapshots = {}
+        for election in elections:
+            snapshot = get_final_snapshot(election)
+            if snapshot is not None:
+                snapshots[election.id] = snapshot
+        live_ids = [election.id for election in elections if election.id not in snapshots]
+
+        if view_mode == 'summary':
+            turnout_by_election = build_turnout_summaries(live_ids)
+            for election_id, snapshot in snapshots.items():
+                turnout_by_election[election_id] = json.loads(snapshot.turnout)
+            results = [
+                {
+                    'id': election.id,
+                    'title': election.title,
+                    'description': election.description,
+                    'status': election.status,
+                    'start_datetime': election.start_datetime,
+                    'end_datetime': election.end_datetime,
+                    'turnout': turnout_by_election[election.id]
+                }
+                for election in elections
+            ]
+            return paginator.get_paginated_response(results).data
+        
+        # Build every live results tree in one pass instead of once per election
+        positions_by_election = build_positions_results(live_ids)
+        for election_id, snapshot in snapshots.items():
+            positions_by_election[election_id] = json.loads(snapshot.results)['positions']
         
         # Use ElectionResultsSerializer to get complete data including positions, candidates, and vote counts
-        serializer = ElectionResultsSerializer(elections, many=True)
+        serializer = ElectionResultsSerializer(
+            elections,
+            many=True,
+            context={'positions_by_election': positions_by_election}
+        )
         
         # Add additional election metadata to each result
         results = []
@@ -849,7 +1270,216 @@ class PublicElectionsView(APIView):
             }
             results.append(result)
         
-        return Response(results)
+        return paginator.get_paginated_response(results).data
+
+class ElectionTurnoutView(APIView):
+    """
+    Live turnout of an election, read from the maintained turnout tallies
+    """
+    permission_classes = [IsAdminRole]
+
+    @extend_schema(
+        tags=['elections'],
+        summary="Get Election Turnout",
+        description="Get the number of eligible voters, voters who have started and finished voting, and voters per position (Admin only)",
+        parameters=[
+            OpenApiParameter(
+                name='election_id',
+                location=OpenApiParameter.PATH,
+                description='ID of the election',
+                required=True,
+                type=OpenApiTypes.INT
+            )
+        ],
+        responses={
+            200: {
+                'type': 'object',
+                'properties': {
+                    'election_id': {'type': 'integer'},
+                    'eligible_voters': {'type': 'integer'},
+                    'voters_started': {'type': 'integer', 'description': 'Voters who voted for at least one position'},
+                    'voters_completed': {'type': 'integer', 'description': 'Voters who voted for every position'},
+                    'positions': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'position_id': {'type': 'integer'},
+                                'position_title': {'type': 'string'},
+                                'voters': {'type': 'integer'}
+                            }
+                        }
+                    }
+                }
+            },
+            404: {
+                'type': 'object',
+                'properties': {
+                    'detail': {'type': 'string', 'description': 'Election not found'}
+                }
+            }
+        },
+        examples=[
+            OpenApiExample(
+                'Turnout',
+                value={
+                    'election_id': 1,
+                    'eligible_voters': 1200,
+                    'voters_started': 431,
+                    'voters_completed': 402,
+                    'positions': [
+                        {'position_id': 1, 'position_title': 'President', 'voters': 429},
+                        {'position_id': 2, 'position_title': 'Secretary', 'voters': 405}
+                    ]
+                },
+                status_codes=['200']
+            )
+        ]
+    )
+    @method_decorator(condition(etag_func=election_turnout_etag))
+    def get(self, request, election_id):
+        _, status_code, data = get_election_turnout(request, election_id)
+        return Response(data, status=status_code)
+
+class ElectionExportView(APIView):
+    """
+    Streams the votes or results of a finished election for auditors
+    """
+    permission_classes = [IsAdminRole]
+
+    @extend_schema(
+        tags=['elections'],
+        summary="Export Election Votes or Results",
+        description="Stream every vote (without voter identities) or the per-candidate results of a closed election as CSV or NDJSON (Admin only)",
+        parameters=[
+            OpenApiParameter(
+                name='election_id',
+                location=OpenApiParameter.PATH,
+                description='ID of the election',
+                required=True,
+                type=OpenApiTypes.INT
+            ),
+            OpenApiParameter(
+                name='dataset',
+                location=OpenApiParameter.QUERY,
+                description="'votes' (default) for one row per vote, 'results' for one row per candidate",
+                required=False,
+                type=OpenApiTypes.STR,
+                enum=list(EXPORT_DATASETS)
+            ),
+            OpenApiParameter(
+                name='file_format',
+                location=OpenApiParameter.QUERY,
+                description="'csv' (default) or 'ndjson'",
+                required=False,
+                type=OpenApiTypes.STR,
+                enum=list(EXPORT_FORMATS)
+            )
+        ],
+        responses={
+            (200, 'text/csv'): OpenApiTypes.STR,
+            (200, 'application/x-ndjson'): OpenApiTypes.STR,
+            400: {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string', 'description': 'Error message'}
+                }
+            },
+            404: {
+                'type': 'object',
+                'properties': {
+                    'detail': {'type': 'string', 'description': 'Election not found'}
+                }
+            }
+        }
+    )
+    def get(self, request, election_id):
+        # 'format' is reserved by DRF for renderer selection
+        dataset = request.query_params.get('dataset', 'votes')
+        export_format = request.query_params.get('file_format', 'csv')
+        if dataset not in EXPORT_DATASETS or export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': "dataset must be 'votes' or 'results' and file_format 'csv' or 'ndjson'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            election = Election.objects.get(id=election_id)
+        except Election.DoesNotExist:
+            return Response({'detail': 'Election not found'}, status=status.HTTP_404_NOT_FOUND)
+        if election.status not in EXPORTABLE_STATUSES:
+            return Response(
+                {'error': 'Only closed elections can be exported'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        log_audit(request.user, 'export_election', {
+            'message': f'Exported {dataset} of election: {election.title}',
+            'election_id': election.id,
+            'dataset': dataset,
+            'file_format': export_format
+        }, request=request)
+
+        # Each server streams only the iterator kind it consumes lazily
+        if isinstance(request._request, ASGIRequest):
+            content = astream_export(election.id, dataset, export_format)
+        else:
+            content = stream_export(election.id, dataset, export_format)
+        response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[export_format])
+        response['Content-Disposition'] = (
+            f'attachment; filename="election-{election.id}-{dataset}.{export_format}"'
+        )
+        return response
+
+class RequestProfileView(APIView):
+    """
+    Per-view request profiles collected by RequestProfilingMiddleware in this process
+    """
+    permission_classes = [IsAdminRole]
+
+    @extend_schema(
+        tags=['monitoring'],
+        summary="Get Request Profiles",
+        description="Get the query count, SQL time, wall time and response size percentiles of every view served by this worker process, busiest first (Admin only). Profiling is enabled with REQUEST_PROFILING=True.",
+        responses={
+            200: {
+                'type': 'object',
+                'properties': {
+                    'enabled': {'type': 'boolean'},
+                    'views': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'view': {'type': 'string'},
+                                'requests': {'type': 'integer', 'description': 'Requests since the last reset'},
+                                'window': {'type': 'integer', 'description': 'Recent requests the percentiles are computed from'},
+                                'queries': {'type': 'object', 'description': 'mean, p50, p95, p99 and max'},
+                                'sql_ms': {'type': 'object'},
+                                'wall_ms': {'type': 'object'},
+                                'response_bytes': {'type': 'object'}
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    )
+    def get(self, request):
+        return Response({
+            'enabled': get_profiling_setting('ENABLED'),
+            'views': request_profiles.snapshot()
+        })
+
+    @extend_schema(
+        tags=['monitoring'],
+        summary="Reset Request Profiles",
+        description="Discard the request profiles collected by this worker process (Admin only)",
+        responses={204: None}
+    )
+    def delete(self, request):
+        request_profiles.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 class ElectionWithVoteStatusView(APIView):
     """
@@ -933,19 +1563,22 @@ class ElectionWithVoteStatusView(APIView):
     )
     def get(self, request, election_id):
         try:
-            election = Election.objects.get(id=election_id)
+            # Prefetch the whole ballot so serializing it adds no per-position queries
+            election = Election.objects.select_related('created_by').prefetch_related(
+                'positions__candidates'
+            ).get(id=election_id)
             
             # Check if user is eligible for this election
-            if not EligibleVoter.objects.filter(
-                election=election,
-                student=request.user
-            ).exists():
+            if not is_eligible(request.user, election.id):
                 return Response(
                     {'error': 'You are not eligible to vote in this election'},
                     status=status.HTTP_403_FORBIDDEN
                 )
             
-            serializer = ElectionWithVoteStatusSerializer(election, context={'request': request})
+            serializer = ElectionWithVoteStatusSerializer(
+                election,
+                context={'request': request, 'user_is_eligible': True}
+            )
             return Response(serializer.data)
             
         except Election.DoesNotExist: